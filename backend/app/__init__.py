@@ -9,37 +9,42 @@ import os
 mongo = PyMongo()
 
 def create_app():
+    # Index builds, tag seeding and migrations run from bootstrap.py and
+    # run_migrations.py; Firebase and Cloudinary initialize on first use.
+    # Worker boot is only imports plus app construction.
+    from app.utils.startup_timing import StartupTimer
+    timer = StartupTimer()
+    
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    # Fast JSON encoding for every jsonify() and request.get_json()
+    from app.utils.serialization import OrjsonProvider
+    app.json = OrjsonProvider(app)
+    
+    # Per-endpoint request size limits for uploads
+    from app.utils.file_handler import UploadRequest
+    app.request_class = UploadRequest
+    
     # Initialize MongoDB
-    mongo.init_app(app)
+    mongo.init_app(
+        app,
+        maxPoolSize=app.config['MONGO_MAX_POOL_SIZE'],
+        minPoolSize=app.config['MONGO_MIN_POOL_SIZE'],
+        waitQueueTimeoutMS=app.config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+        connectTimeoutMS=app.config['MONGO_CONNECT_TIMEOUT_MS'],
+        serverSelectionTimeoutMS=app.config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+        compressors=app.config['MONGO_COMPRESSORS']
+    )
     
-    # Initialize Firebase with app context
-    from app.middleware.auth import init_firebase
-    init_firebase(app)
+    # Timed out queries answer 503 instead of a generic error
+    from app.middleware.error_handler import register_db_error_handlers
+    register_db_error_handlers(app)
+    timer.mark('config')
     
     # Disable strict slashes to handle URLs with or without trailing slash
     app.url_map.strict_slashes = False
     
-    # Create indexes for efficient searching
-    with app.app_context():
-        # Index for tag fields
-        mongo.db.photos.create_index([
-            ('tags.bird_name', 1),
-            ('tags.city', 1),
-            ('tags.location', 1),
-            ('tags.motion', 1),
-            ('tags.catch', 1),
-            ('tags.date', 1)
-        ])
-        # Index for creation date
-        mongo.db.photos.create_index('created_at')
-        
-        # Run database migrations
-        from app.utils.db_migrate import run_migrations
-        run_migrations()
-    
     # Register blueprints
     from app.routes.photo_routes import photo_bp
     from app.routes.tag_routes import tag_bp
@@ -48,6 +53,7 @@ def create_app():
     app.register_blueprint(photo_bp, url_prefix='/api/photos')
     app.register_blueprint(tag_bp, url_prefix='/api/tags')
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    timer.mark('blueprints')
     
     # Configure CORS for all routes under /api
     CORS(app, resources={
@@ -58,23 +64,11 @@ def create_app():
                 "https://birds.naturetrail.co.in"
             ],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["X-Next-Cursor"]
         }
     })
-    
-    # Initialize default tags with display names if not exists
-    with app.app_context():
-        default_tags = [
-            {'name': 'date_clicked', 'display_name': 'Date & Time Clicked', 'values': []},
-            {'name': 'date_uploaded', 'display_name': 'Date & Time Uploaded', 'values': []}
-        ]
-        
-        for tag in default_tags:
-            mongo.db.tags.update_one(
-                {'name': tag['name']},
-                {'$setOnInsert': tag},
-                upsert=True
-            )
+    timer.mark('cors')
     
     # Configure logging
     if not os.path.exists('logs'):
@@ -92,5 +86,7 @@ def create_app():
     app.logger.addHandler(file_handler)
     app.logger.setLevel(logging.INFO)
     app.logger.info('Bird Gallery startup')
+    timer.mark('logging')
+    timer.report(app.logger, app.config['STARTUP_BUDGET_MS'])
     
     return app
\ No newline at end of file
@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 import json
+import tempfile
 
 load_dotenv()
 
@@ -13,11 +14,127 @@ class Config:
     FIVEMERR_API_URL = 'https://api.fivemerr.com/v1/media/images'
     FIREBASE_CONFIG = json.loads(os.getenv('FIREBASE_CONFIG'))
     
+    # MongoDB connection pool, per process
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    # Wire compression, in order of preference (snappy needs python-snappy)
+    MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', 'zstd,zlib')
+    
+    # Public read endpoints may read from secondaries, except for a while
+    # after a write so a new ETag is never paired with stale data
+    MONGO_PUBLIC_READ_PREFERENCE = os.getenv('MONGO_PUBLIC_READ_PREFERENCE', 'secondaryPreferred')
+    MONGO_REPLICATION_GRACE = float(os.getenv('MONGO_REPLICATION_GRACE', 10))  # seconds
+    
+    # Server-side time budgets; queries running longer are killed
+    LIST_MAX_TIME_MS = int(os.getenv('LIST_MAX_TIME_MS', 10000))
+    SEARCH_MAX_TIME_MS = int(os.getenv('SEARCH_MAX_TIME_MS', 5000))
+    STATS_MAX_TIME_MS = int(os.getenv('STATS_MAX_TIME_MS', 5000))
+    LOOKUP_MAX_TIME_MS = int(os.getenv('LOOKUP_MAX_TIME_MS', 2000))
+    
+    # Free-text /photos/query ranks only this many of the newest matching photos
+    QUERY_MAX_CANDIDATES = int(os.getenv('QUERY_MAX_CANDIDATES', 1000))
+    
+    # In-process indexes (query vocabulary, similarity tree) are rebuilt in the
+    # background after photo writes, at most once per interval
+    INDEX_REFRESH_INTERVAL = int(os.getenv('INDEX_REFRESH_INTERVAL', 30))  # seconds
+    
+    # Default Hamming distance between dHashes for /photos/<id>/similar (0-16)
+    SIMILAR_DEFAULT_DISTANCE = int(os.getenv('SIMILAR_DEFAULT_DISTANCE', 10))  # bits
+    
+    # Search radius of /photos/near
+    NEAR_DEFAULT_RADIUS = float(os.getenv('NEAR_DEFAULT_RADIUS', 5000))  # meters
+    NEAR_MAX_RADIUS = float(os.getenv('NEAR_MAX_RADIUS', 500000))  # meters
+    
+    # Local scratch space for uploads while they are being processed
+    UPLOAD_SPOOL_DIR = os.getenv(
+        'UPLOAD_SPOOL_DIR',
+        os.path.join(tempfile.gettempdir(), 'bird_gallery_spool')
+    )
+    
+    # Background upload pipeline: worker threads, extra queued uploads, job retention
+    UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', 4))
+    UPLOAD_QUEUE_SIZE = int(os.getenv('UPLOAD_QUEUE_SIZE', 32))
+    UPLOAD_JOB_TTL = int(os.getenv('UPLOAD_JOB_TTL', 24 * 3600))  # seconds
+    
+    # Batch uploads: total request size, files per request, parallel storage pushes
+    BATCH_MAX_CONTENT_LENGTH = int(os.getenv('BATCH_MAX_CONTENT_LENGTH', 512 * 1024 * 1024))
+    BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 500))
+    BATCH_UPLOAD_CONCURRENCY = int(os.getenv('BATCH_UPLOAD_CONCURRENCY', 8))
+    
+    # Outgoing HTTP (storage services, image downloads)
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))  # seconds
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))  # seconds
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+    HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', 0.5))  # seconds
+    HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', 8))  # seconds
+    
+    # Value indexes of this many tags are kept in memory per process
+    TAG_INDEX_CACHE_SIZE = int(os.getenv('TAG_INDEX_CACHE_SIZE', 256))
+    
+    # Verified token cache (entries also expire with the token). User documents
+    # are cached with their token: changes made through UserService apply
+    # within VERSION_CACHE_TTL, direct edits in MongoDB within AUTH_USER_CACHE_TTL
+    AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', 1024))
+    AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', 300))  # seconds
+    AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 30))  # seconds
+    
+    # Read endpoints: version counters are re-read from MongoDB at most this
+    # often, and rendered responses are cached per version (0 disables)
+    VERSION_CACHE_TTL = float(os.getenv('VERSION_CACHE_TTL', 2))  # seconds
+    RESPONSE_CACHE_BYTES = int(os.getenv('RESPONSE_CACHE_BYTES', 16 * 1024 * 1024))
+    READ_CACHE_MAX_AGE = int(os.getenv('READ_CACHE_MAX_AGE', 0))  # seconds, browsers revalidate after it
+    
     # Cloudinary settings
     CLOUDINARY_CLOUD_NAME = os.getenv('CLOUDINARY_CLOUD_NAME')
     CLOUDINARY_API_KEY = os.getenv('CLOUDINARY_API_KEY')
     CLOUDINARY_API_SECRET = os.getenv('CLOUDINARY_API_SECRET')
     CLOUDINARY_FOLDER = os.getenv('CLOUDINARY_FOLDER', 'bird_gallery')
+    # Larger files are uploaded in chunks (Cloudinary requires chunks of at least 5MB)
+    CLOUDINARY_LARGE_UPLOAD_THRESHOLD = int(os.getenv('CLOUDINARY_LARGE_UPLOAD_THRESHOLD', 8 * 1024 * 1024))
+    CLOUDINARY_CHUNK_SIZE = int(os.getenv('CLOUDINARY_CHUNK_SIZE', 6 * 1024 * 1024))
+    
+    # Browser/CDN cache lifetime of resized image derivatives
+    IMAGE_CACHE_MAX_AGE = int(os.getenv('IMAGE_CACHE_MAX_AGE', 7 * 24 * 3600))  # seconds
+    
+    # In-memory cache of downloaded originals, bounded by total size
+    IMAGE_MEMORY_CACHE_BYTES = int(os.getenv('IMAGE_MEMORY_CACHE_BYTES', 64 * 1024 * 1024))
+    IMAGE_MEMORY_CACHE_TTL = int(os.getenv('IMAGE_MEMORY_CACHE_TTL', 600))  # seconds
+    
+    # Disk cache of rendered derivatives; least recently served files are
+    # deleted once it grows past this size
+    IMAGE_DISK_CACHE_BYTES = int(os.getenv('IMAGE_DISK_CACHE_BYTES', 1024 * 1024 * 1024))
+    
+    # Thumbnails rendered in the background right after each upload
+    THUMBNAIL_WIDTHS = [int(w) for w in os.getenv('THUMBNAIL_WIDTHS', '320,640,1024').split(',')]
+    THUMBNAIL_FORMAT = os.getenv('THUMBNAIL_FORMAT', 'webp')
+    THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+    
+    # Origin of the API as clients see it (e.g. https://api.example.com), used
+    # to build absolute URLs at read time; defaults to the request's host,
+    # which is http:// behind a TLS-terminating proxy
+    PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL', '')
+    
+    # Local disk storage backend, for self-hosting and offline runs
+    LOCAL_STORAGE_DIR = os.getenv(
+        'LOCAL_STORAGE_DIR',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'storage')
+    )
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+    
+    # Worker boot time above this is logged as a warning
+    STARTUP_BUDGET_MS = int(os.getenv('STARTUP_BUDGET_MS', 1500))
+    
+    # Threads copying images during storage migrations (run_migrations.py)
+    MIGRATION_CONCURRENCY = int(os.getenv('MIGRATION_CONCURRENCY', 4))
+    # Documents per bulk_write round trip in document migrations
+    MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 1000))
+    # A run's claim on a migration, extended at every checkpoint; a crashed
+    # run's claim lapses after this and the next deploy takes the migration over
+    MIGRATION_CLAIM_TTL = int(os.getenv('MIGRATION_CLAIM_TTL', 30 * 60))  # seconds
     
-    # Default image service (can be 'fivemerr' or 'cloudinary')
+    # Default image service (can be 'fivemerr', 'cloudinary' or 'local')
     DEFAULT_IMAGE_SERVICE = os.getenv('DEFAULT_IMAGE_SERVICE', 'cloudinary')
\ No newline at end of file
@@ -1,18 +1,40 @@
+import threading
 from functools import wraps
 from flask import request, jsonify, current_app
 import firebase_admin
 from firebase_admin import credentials, auth
 from app import mongo
+from app.services.user_service import USERS_VERSION
+from app.utils.collection_version import get_versions
 from .error_handler import handle_auth_errors
+from .token_cache import TokenCache
 
 _firebase_app = None
+_firebase_lock = threading.Lock()
+_token_cache = None
+
+def get_token_cache():
+    """Per-process cache of verified tokens, sized from the app config"""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache(
+            max_size=current_app.config['AUTH_CACHE_SIZE'],
+            max_ttl=current_app.config['AUTH_CACHE_TTL'],
+            user_ttl=current_app.config['AUTH_USER_CACHE_TTL']
+        )
+    return _token_cache
 
 def init_firebase(app):
+    """
+    Initialize the Firebase app once per process, on the first token to verify
+    """
     global _firebase_app
     if not _firebase_app:
-        with app.app_context():
-            cred = credentials.Certificate(app.config['FIREBASE_CONFIG'])
-            _firebase_app = firebase_admin.initialize_app(cred)
+        with _firebase_lock:
+            if not _firebase_app:
+                with app.app_context():
+                    cred = credentials.Certificate(app.config['FIREBASE_CONFIG'])
+                    _firebase_app = firebase_admin.initialize_app(cred)
     return _firebase_app
 
 @handle_auth_errors
@@ -25,16 +47,29 @@ def require_auth(f):
 
         try:
             token = auth_header.split('Bearer ')[1]
-            decoded_token = auth.verify_id_token(token)
+            token_cache = get_token_cache()
+            users_version = get_versions([USERS_VERSION])[0]
+            
+            cached = token_cache.get(token, users_version)
+            if cached is None:
+                init_firebase(current_app._get_current_object())
+                decoded_token = auth.verify_id_token(token)
+                token_cache.set(token, decoded_token)
+                user = None
+            else:
+                decoded_token, user = cached
             
-            user = mongo.db.users.find_one({'email': decoded_token['email']})
-            if not user:
-                user = {
-                    'email': decoded_token['email'],
-                    'role': 'viewer',
-                    'user_id': decoded_token['uid']
-                }
-                mongo.db.users.insert_one(user)
+            # Re-read once the cached copy expires or a user write bumps the version
+            if user is None:
+                user = mongo.db.users.find_one({'email': decoded_token['email']})
+                if not user:
+                    user = {
+                        'email': decoded_token['email'],
+                        'role': 'viewer',
+                        'user_id': decoded_token['uid']
+                    }
+                    mongo.db.users.insert_one(user)
+                token_cache.set_user(token, user, users_version)
             
             request.user = user
             return f(*args, **kwargs)
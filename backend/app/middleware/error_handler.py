@@ -1,6 +1,10 @@
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, request
 from firebase_admin.auth import InvalidIdTokenError, ExpiredIdTokenError
+from pymongo.errors import ExecutionTimeout, WaitQueueTimeoutError
+
+# A query over its maxTimeMS budget, or no free connection in the pool
+DB_TIMEOUT_ERRORS = (ExecutionTimeout, WaitQueueTimeoutError)
 
 def handle_auth_errors(f):
     @wraps(f)
@@ -13,4 +17,12 @@ def handle_auth_errors(f):
             return jsonify({'error': 'Authentication token has expired'}), 401
         except Exception as e:
             return jsonify({'error': str(e)}), 500
-    return decorated_function 
\ No newline at end of file
+    return decorated_function
+
+def register_db_error_handlers(app):
+    def handle_db_timeout(e):
+        app.logger.warning(f"Database timeout on {request.path}: {str(e)}")
+        return jsonify({'error': 'The request took too long, please try again'}), 503
+
+    for error in DB_TIMEOUT_ERRORS:
+        app.register_error_handler(error, handle_db_timeout) 
\ No newline at end of file
@@ -0,0 +1,72 @@
+import hashlib
+import time
+from app.utils.lru_cache import LRUCache
+
+class TokenCache:
+    """
+    Bounded in-process cache of verified ID tokens and their users.
+
+    Entries are keyed by a hash of the token (the raw token is never stored),
+    expire with the token's `exp` claim or after max_ttl seconds, whichever
+    comes first, and are evicted least-recently-used once max_size is reached.
+    The user document is kept with the token for at most user_ttl seconds,
+    and only while the `users` version it was read at is current, so role
+    changes made through UserService apply at once.
+    """
+
+    def __init__(self, max_size=1024, max_ttl=300, user_ttl=30):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.user_ttl = user_ttl
+        self._entries = LRUCache(max_bytes=max_size, sizeof=lambda entry: 1)
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token, users_version=None):
+        """
+        Return (decoded claims, user document) of a cached token, or None.
+        The user is None if it was not cached, has expired or was read at
+        another users_version.
+        """
+        entry = self._entries.get(self._key(token))
+        if entry is None:
+            return None
+
+        # Callers get their own copies so request handlers cannot mutate the cache
+        user = None
+        cached_user = entry['user']
+        if cached_user is not None:
+            version, expires_at, document = cached_user
+            if version == users_version and expires_at > time.monotonic():
+                user = dict(document)
+        return dict(entry['decoded_token']), user
+
+    def set(self, token, decoded_token):
+        ttl = min(decoded_token.get('exp', 0) - time.time(), self.max_ttl)
+        if ttl > 0:
+            self._entries.set(
+                self._key(token),
+                {'decoded_token': dict(decoded_token), 'user': None},
+                ttl
+            )
+
+    def set_user(self, token, user, users_version):
+        """Keep the user document read for a cached token"""
+        entry = self._entries.peek(self._key(token))
+        if entry is not None and self.user_ttl > 0:
+            entry['user'] = (users_version, time.monotonic() + self.user_ttl, dict(user))
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        stats = self._entries.stats()
+        return {
+            'size': stats['entries'],
+            'max_size': self.max_size,
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'hit_rate': stats['hit_rate']
+        }
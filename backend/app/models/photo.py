@@ -1,13 +1,29 @@
 from datetime import datetime
 from bson import ObjectId
+from app.utils.search import (
+    SEARCH_TAGS_FIELD, SEARCH_TERMS_FIELD, DATE_TAG_FORMAT,
+    build_search_tags, build_search_terms, parse_date_tag
+)
+from app.utils.image_hash import CONTENT_HASH_FIELD, DHASH_FIELD
+from app.utils.exif import TAKEN_AT_FIELD, LOCATION_FIELD, CAMERA_FIELD
 
 class Photo:
-    def __init__(self, filename, tags, photo_id=None, fivemerr_data=None, storage=None):
+    __slots__ = (
+        'id', 'filename', 'tags', 'created_at', 'storage', 'content_hash', 'dhash',
+        'taken_at', 'location', 'camera'
+    )
+
+    def __init__(self, filename, tags, photo_id=None, fivemerr_data=None, storage=None,
+                 content_hash=None, dhash=None, metadata=None):
         self.id = photo_id or str(ObjectId())
         self.filename = filename
         self.tags = tags
         self.created_at = datetime.utcnow()
         
+        # Exact and perceptual hashes of the original, for duplicate detection
+        self.content_hash = content_hash
+        self.dhash = dhash
+        
         # Support both the new storage format and legacy fivemerr_data format
         self.storage = storage or {}
         
@@ -20,16 +36,29 @@ class Photo:
                 'size': fivemerr_data.get('size')
             }
         
-        # Ensure dates are properly formatted with time
-        if 'date_clicked' in self.tags:
-            try:
-                # Parse the datetime string (YYYY-MM-DDTHH:mm)
-                datetime.strptime(self.tags['date_clicked'], '%Y-%m-%dT%H:%M')
-            except ValueError:
-                self.tags['date_clicked'] = datetime.utcnow().strftime('%Y-%m-%dT%H:%M')
+        # Capture metadata read from the EXIF of the original
+        metadata = metadata or {}
+        self.location = metadata.get(LOCATION_FIELD)
+        self.camera = metadata.get(CAMERA_FIELD)
+        exif_taken_at = metadata.get(TAKEN_AT_FIELD)
+        
+        # taken_at mirrors date_clicked (YYYY-MM-DDTHH:mm) as a datetime
+        self.taken_at = parse_date_tag(self.tags.get('date_clicked'))
+        if self.taken_at is None and exif_taken_at:
+            # A missing or malformed date_clicked is filled from the camera's clock
+            self.taken_at = exif_taken_at
+            self.tags['date_clicked'] = exif_taken_at.strftime(DATE_TAG_FORMAT)
+        elif self.taken_at is not None and exif_taken_at and \
+                exif_taken_at.replace(second=0, microsecond=0) == self.taken_at:
+            # Same minute as the tag: keep the seconds recorded by the camera
+            self.taken_at = exif_taken_at
+        elif 'date_clicked' in self.tags and self.taken_at is None:
+            # Without EXIF a malformed date still falls back to the upload time,
+            # but taken_at stays empty so date ranges never mistake it for the capture time
+            self.tags['date_clicked'] = datetime.utcnow().strftime(DATE_TAG_FORMAT)
                 
         if 'date_uploaded' not in self.tags:
-            self.tags['date_uploaded'] = datetime.utcnow().strftime('%Y-%m-%dT%H:%M')
+            self.tags['date_uploaded'] = datetime.utcnow().strftime(DATE_TAG_FORMAT)
     
     def to_dict(self):
         result = {
@@ -42,9 +71,27 @@ class Photo:
         # Always include storage info in the consistent format
         if self.storage:
             result['storage'] = self.storage
+        
+        if self.taken_at:
+            result[TAKEN_AT_FIELD] = self.taken_at
+        if self.location:
+            result[LOCATION_FIELD] = self.location
+        if self.camera:
+            result[CAMERA_FIELD] = self.camera
             
         return result
     
+    def to_document(self):
+        """Document stored in MongoDB, including the derived search fields"""
+        document = self.to_dict()
+        document[SEARCH_TAGS_FIELD] = build_search_tags(self.tags)
+        document[SEARCH_TERMS_FIELD] = build_search_terms(self.tags)
+        if self.content_hash:
+            document[CONTENT_HASH_FIELD] = self.content_hash
+        if self.dhash:
+            document[DHASH_FIELD] = self.dhash
+        return document
+    
     @staticmethod
     def from_dict(data):
         # Handle data coming from the database in different formats
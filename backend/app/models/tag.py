@@ -1,4 +1,6 @@
 class TagValue:
+    __slots__ = ('value', 'parent_info')
+
     def __init__(self, value, parent_info=None):
         self.value = value
         # Only set parent_info if it's not empty
@@ -20,6 +22,8 @@ class TagValue:
         )
 
 class Tag:
+    __slots__ = ('name', 'values')
+
     def __init__(self, name, values=None):
         self.name = name.lower().replace(' ', '_')
         self.values = [
@@ -39,4 +43,30 @@ class Tag:
             TagValue.from_dict(v) if isinstance(v, dict) else TagValue(v) 
             for v in data.get('values', [])
         ]
-        return Tag(name=data['name'], values=values) 
\ No newline at end of file
+        return Tag(name=data['name'], values=values)
+    
+    @staticmethod
+    def serialize(data):
+        """
+        Same output as Tag.from_dict(data).to_dict(), built straight from the
+        raw document. Values already in canonical form are passed through
+        without copying, so large vocabularies allocate almost nothing.
+        """
+        return {
+            'name': data['name'].lower().replace(' ', '_'),
+            'values': [_serialize_value(v) for v in data.get('values', [])]
+        }
+
+def _serialize_value(value):
+    if not isinstance(value, dict):
+        return {'value': value}
+    
+    parent_info = value.get('parent_info')
+    # {'value': ...} or {'value': ..., 'parent_info': {...non-empty}}
+    if 'value' in value and len(value) == (2 if parent_info else 1):
+        return value
+    
+    base = {'value': value['value']}
+    if parent_info:
+        base['parent_info'] = parent_info
+    return base
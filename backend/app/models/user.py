@@ -1,4 +1,6 @@
 class User:
+    __slots__ = ('email', 'role', 'user_id')
+
     def __init__(self, email, role='viewer', user_id=None):
         self.email = email
         self.role = role  # 'admin' or 'viewer'
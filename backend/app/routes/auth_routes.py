@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request
 from app import mongo
-from app.middleware.auth import require_auth
+from app.middleware.auth import require_auth, require_admin, get_token_cache
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -12,4 +12,11 @@ def get_current_user():
         'email': request.user['email'],
         'role': request.user['role'],
         'isAdmin': request.user['role'] == 'admin'
-    }), 200 
\ No newline at end of file
+    }), 200
+
+@auth_bp.route('/cache-stats', methods=['GET'])
+@require_auth
+@require_admin
+def get_auth_cache_stats():
+    """Get hit/miss counters of this worker's verified token cache"""
+    return jsonify(get_token_cache().stats()), 200
@@ -1,45 +1,41 @@
 import os
-from flask import Blueprint, current_app, request, jsonify, Response
+import json
+from flask import (
+    Blueprint, current_app, request, jsonify, Response, stream_with_context, send_file, url_for
+)
 from werkzeug.utils import secure_filename
+from bson import ObjectId
 from app import mongo
-from app.models.photo import Photo
-from app.utils.file_handler import allowed_file
-from app.services.fivemerr_service import FivemerrService
-from app.services.cloudinary_service import CloudinaryService
+from app.utils.file_handler import allowed_file, spool_upload, remove_spooled
+from app.utils.search import (
+    build_search_tags, build_search_terms, build_search_pipeline, build_search_conditions,
+    choose_index, explain_search, tokenize, parse_date_tag
+)
+from app.utils.tag_stats import (
+    build_stats_pipeline, group_stats, read_tag_stats, apply_tag_stats_delta
+)
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE, parse_limit, parse_projection, cursor_filter, encode_cursor,
+    encode_offset_cursor, decode_offset_cursor, encode_score_cursor, decode_score_cursor
+)
+from app.utils.term_index import MAX_QUERY_TERMS, get_term_index, build_query_pipeline
+from app.services.storage_backend import get_backend, available_backends
+from app.services.image_service import ImageService, DERIVATIVE_FORMATS
+from app.services.upload_service import UploadService, UploadQueueFull
+from app.utils.exif import TAKEN_AT_FIELD, LOCATION_FIELD
+from app.utils.image_hash import (
+    DHASH_FIELD, MAX_SIMILAR_DISTANCE, file_sha256, get_similarity_index
+)
 from app.middleware.auth import require_auth, require_admin
-import requests
-from io import BytesIO
-from PIL import Image, ImageOps
-import hashlib
-import time
-import functools
-import os.path
-from pathlib import Path
-import threading
-import mimetypes
+from app.middleware.error_handler import DB_TIMEOUT_ERRORS
+from app.utils.http_client import get_http_metrics
+from app.utils.serialization import dumps, public_url, serialize_photo, with_public_urls
+from app.utils.db_reads import public_collection
+from app.utils.collection_version import bump_version
+from app.utils.response_cache import conditional_response, response_cache_stats
 
 photo_bp = Blueprint('photos', __name__)
 
-# Create a simple in-memory cache for recently accessed images
-_image_cache = {}
-_cache_lock = threading.Lock()
-_MAX_CACHE_SIZE = 50  # Maximum number of items in cache
-
-# Cache directory for storing optimized images on disk
-CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache')
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR, exist_ok=True)
-
-# Function to manage the in-memory cache
-def manage_cache():
-    with _cache_lock:
-        if len(_image_cache) > _MAX_CACHE_SIZE:
-            # Remove oldest items (based on access time)
-            items = sorted(_image_cache.items(), key=lambda x: x[1]['last_access'])
-            # Keep only the most recent half
-            for key, _ in items[:len(items)//2]:
-                del _image_cache[key]
-
 @photo_bp.route('/', methods=['POST'])
 @require_auth
 @require_admin  # Only admins can upload
@@ -54,54 +50,248 @@ def upload_photo():
     if not allowed_file(file.filename):
         return jsonify({'error': 'File type not allowed'}), 400
     
+    # Determine which service to use (default from config or from request)
+    service = request.form.get('service', current_app.config['DEFAULT_IMAGE_SERVICE'])
+    if service not in available_backends():
+        return jsonify({'error': f'Unknown storage service "{service}"'}), 400
+    
+    tags = request.form.to_dict()
+    # Remove service parameter from tags
+    if 'service' in tags:
+        del tags['service']
+    
+    # Spool the file locally; the storage push happens in the background
+    original_path = spool_upload(file)
+    
     try:
-        # Determine which service to use (default from config or from request)
-        service = request.form.get('service', current_app.config['DEFAULT_IMAGE_SERVICE'])
+        # Exact duplicates are rejected before anything is sent to storage
+        content_hash = file_sha256(original_path)
+        duplicate = UploadService.find_duplicates([content_hash]).get(content_hash)
+        if duplicate:
+            remove_spooled(original_path)
+            return jsonify({'error': 'Photo already uploaded', 'duplicate_of': duplicate}), 409
         
-        # Upload to selected service
-        if service == 'cloudinary':
-            upload_response = CloudinaryService.upload_image(file)
-            storage_service = 'cloudinary'
-        else:
-            upload_response = FivemerrService.upload_image(file)
-            storage_service = 'fivemerr'
-        
-        tags = request.form.to_dict()
-        # Remove service parameter from tags
-        if 'service' in tags:
-            del tags['service']
-        
-        # Create a new photo document with consistent storage format
-        # Both services return the same format: {'url': url, 'id': id, 'size': size}
-        photo = Photo(
-            filename=secure_filename(file.filename), 
-            tags=tags,
-            storage={
-                'service': storage_service,
-                'url': upload_response['url'],
-                'id': upload_response['id'],
-                'size': upload_response['size']
-            }
+        photo_id = str(ObjectId())
+        job_id = UploadService.submit_job(
+            original_path,
+            secure_filename(file.filename),
+            tags,
+            service,
+            photo_id,
+            url_for('photos.get_photo_image', photo_id=photo_id),
+            content_hash
         )
         
-        # Save to MongoDB
-        mongo.db.photos.insert_one(photo.to_dict())
-        
         return jsonify({
-            'message': 'Photo uploaded successfully',
-            'photo_id': photo.id,
-            'url': upload_response['url'],
-            'service': storage_service
-        }), 201
+            'message': 'Photo upload accepted',
+            'job_id': job_id,
+            'photo_id': photo_id,
+            'status_url': public_url(url_for('photos.get_upload_job', job_id=job_id))
+        }), 202
         
+    except UploadQueueFull:
+        remove_spooled(original_path)
+        return jsonify({'error': 'Too many uploads in progress, try again shortly'}), 503, {'Retry-After': '5'}
     except Exception as e:
+        remove_spooled(original_path)
         current_app.logger.error(f"Upload error: {str(e)}")
         return jsonify({'error': 'Failed to upload photo'}), 500
 
+@photo_bp.route('/batch', methods=['POST'])
+@require_auth
+@require_admin  # Only admins can upload
+def upload_batch():
+    """
+    Upload many photos in one request
+    Form data:
+        photos      - the files, one form field per file
+        file_tags   - optional JSON with tags for individual files, either a
+                      list aligned with the files or an object keyed by filename
+        service     - optional storage service
+        parallelism - optional number of concurrent storage pushes
+        Every other field is a tag shared by all files.
+    Returns one result per file, in upload order. Files identical to an
+    existing photo, or to an earlier file of the batch, are skipped with
+    status "duplicate".
+    """
+    files = request.files.getlist('photos')
+    if not files:
+        return jsonify({'error': 'No photos provided'}), 400
+    if len(files) > current_app.config['BATCH_MAX_FILES']:
+        return jsonify({'error': f"At most {current_app.config['BATCH_MAX_FILES']} photos per batch"}), 400
+    
+    shared_tags = request.form.to_dict()
+    service = shared_tags.pop('service', current_app.config['DEFAULT_IMAGE_SERVICE'])
+    if service not in available_backends():
+        return jsonify({'error': f'Unknown storage service "{service}"'}), 400
+    
+    try:
+        file_tags = json.loads(shared_tags.pop('file_tags', None) or '{}')
+        parallelism = int(shared_tags.pop('parallelism', current_app.config['BATCH_UPLOAD_CONCURRENCY']))
+    except ValueError:
+        return jsonify({'error': 'file_tags must be JSON and parallelism an integer'}), 400
+    if not isinstance(file_tags, (list, dict)):
+        return jsonify({'error': 'file_tags must be a JSON list or object'}), 400
+    parallelism = max(1, min(parallelism, current_app.config['BATCH_UPLOAD_CONCURRENCY']))
+    
+    results = [None] * len(files)
+    items = []
+    item_positions = []
+    
+    try:
+        for position, file in enumerate(files):
+            filename = secure_filename(file.filename or '')
+            if not filename or not allowed_file(filename):
+                results[position] = {'filename': file.filename, 'status': 'failed', 'error': 'File type not allowed'}
+                continue
+            
+            original_path = spool_upload(file)
+            if os.path.getsize(original_path) > current_app.config['MAX_CONTENT_LENGTH']:
+                remove_spooled(original_path)
+                results[position] = {'filename': filename, 'status': 'failed', 'error': 'File too large'}
+                continue
+            
+            # Per-file tags override the shared ones
+            tags = dict(shared_tags)
+            if isinstance(file_tags, list):
+                tags.update(file_tags[position] if position < len(file_tags) else {})
+            else:
+                tags.update(file_tags.get(file.filename) or file_tags.get(filename) or {})
+            
+            photo_id = str(ObjectId())
+            items.append({
+                'original_path': original_path,
+                'filename': filename,
+                'tags': tags,
+                'photo_id': photo_id,
+                'image_path': url_for('photos.get_photo_image', photo_id=photo_id),
+                'content_hash': file_sha256(original_path)
+            })
+            item_positions.append(position)
+        
+        # Drop exact duplicates before any storage push, with one lookup for the batch
+        seen = UploadService.find_duplicates([item['content_hash'] for item in items])
+        unique_items = []
+        unique_positions = []
+        for position, item in zip(item_positions, items):
+            duplicate = seen.get(item['content_hash'])
+            if duplicate:
+                remove_spooled(item['original_path'])
+                results[position] = {'filename': item['filename'], 'status': 'duplicate', 'duplicate_of': duplicate}
+                continue
+            seen[item['content_hash']] = item['photo_id']
+            unique_items.append(item)
+            unique_positions.append(position)
+        items, item_positions = unique_items, unique_positions
+        
+        if items:
+            for position, result in zip(item_positions, UploadService.store_batch(items, service, parallelism)):
+                results[position] = result
+        
+    except Exception as e:
+        for item in items:
+            remove_spooled(item['original_path'])
+        current_app.logger.error(f"Batch upload error: {str(e)}")
+        return jsonify({'error': 'Failed to upload photos'}), 500
+    
+    created = sum(1 for result in results if result['status'] == 'created')
+    duplicates = sum(1 for result in results if result['status'] == 'duplicate')
+    return jsonify({
+        'created': created,
+        'duplicates': duplicates,
+        'failed': len(results) - created - duplicates,
+        'results': results
+    }), 201 if created == len(results) else 207
+
+@photo_bp.route('/jobs/<job_id>', methods=['GET'])
+@require_auth
+@require_admin
+def get_upload_job(job_id):
+    """Get the status of a queued upload: queued, processing, done, duplicate or failed"""
+    job = UploadService.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    job['job_id'] = job.pop('_id')
+    # Jobs run outside any request, so local images are recorded by path
+    if job.get('url', '').startswith('/'):
+        job['url'] = public_url(job['url'])
+    return jsonify(job), 200
+
+def _serialize_photo(photo, projected=False):
+    """Convert a photo document to its JSON representation"""
+    if projected:
+        # Projected documents are partial, so pass them through as-is
+        photo['_id'] = str(photo['_id'])
+        if photo.get('storage'):
+            photo['storage'] = with_public_urls(photo['storage'])
+        return photo
+    return serialize_photo(photo)
+
+def _stream_json_array(photos, projected):
+    """Yield a JSON array one document at a time"""
+    yield b'['
+    for index, photo in enumerate(photos):
+        if index:
+            yield b','
+        yield dumps(_serialize_photo(photo, projected))
+    yield b']'
+
+def _stream_ndjson(photos, projected):
+    """Yield one JSON document per line"""
+    for photo in photos:
+        yield dumps(_serialize_photo(photo, projected)) + b'\n'
+
 @photo_bp.route('/', methods=['GET'])
+@conditional_response('photos', store=False)  # Streamed, so never stored
 def get_photos():
-    photos = list(mongo.db.photos.find())
-    return jsonify([Photo.from_dict(photo).to_dict() for photo in photos]), 200 
+    """
+    List photos, newest first.
+
+    Query parameters (all optional):
+        limit   - page size; enables keyset pagination
+        cursor  - value of the X-Next-Cursor header from the previous page
+        fields  - comma separated projection, e.g. "storage.url,tags.bird_name"
+        format  - "json" (default) or "ndjson"
+
+    Without limit/cursor the whole collection is streamed as a JSON array,
+    so the response shape stays the same for existing clients.
+    """
+    output_format = request.args.get('format', 'json')
+    if output_format not in ('json', 'ndjson'):
+        return jsonify({'error': 'format must be "json" or "ndjson"'}), 400
+
+    try:
+        projection = parse_projection(request.args.get('fields'))
+        paginated = 'limit' in request.args or 'cursor' in request.args
+        limit = parse_limit(request.args.get('limit', DEFAULT_PAGE_SIZE)) if paginated else None
+        query = cursor_filter(request.args['cursor']) if request.args.get('cursor') else {}
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    cursor = public_collection('photos').find(
+        query, projection, max_time_ms=current_app.config['LIST_MAX_TIME_MS']
+    ).sort([('created_at', -1), ('_id', -1)])
+    headers = {}
+
+    if paginated:
+        # Fetch one extra document to know whether another page exists
+        photos = list(cursor.limit(limit + 1))
+        if len(photos) > limit:
+            photos = photos[:limit]
+            headers['X-Next-Cursor'] = encode_cursor(photos[-1])
+    else:
+        photos = cursor.batch_size(DEFAULT_PAGE_SIZE)
+
+    projected = projection is not None
+    if output_format == 'ndjson':
+        body = _stream_ndjson(photos, projected)
+        mimetype = 'application/x-ndjson'
+    else:
+        body = _stream_json_array(photos, projected)
+        mimetype = 'application/json'
+
+    return Response(stream_with_context(body), status=200, mimetype=mimetype, headers=headers)
 
 @photo_bp.route('/search', methods=['POST'])
 def search_photos():
@@ -114,99 +304,210 @@ def search_photos():
             "city": ["New York"],
             "motion": ["still"]
         },
-        "date_range": {                         # Optional date filter
-            "start": "2024-01-01",
-            "end": "2024-12-31"
+        "match": "exact",                       # Optional, "exact" or "prefix"
+        "date_ranges": {                        # Optional date filters
+            "date_clicked": {
+                "start": "2024-01-01",
+                "end": "2024-12-31"
+            }
         }
     }
+    Matching is case-insensitive and served from the search_tags index.
     """
     search_criteria = request.get_json()
     
     if not search_criteria:
         return jsonify({'error': 'No search criteria provided'}), 400
 
-    pipeline = []
-    match_conditions = []
-    
-    # Handle tag-based filters
-    if 'filters' in search_criteria:
-        for tag_name, values in search_criteria['filters'].items():
-            if values:
-                match_conditions.append({
-                    f'tags.{tag_name}': {
-                        '$regex': f'^{values[0]}',
-                        '$options': 'i'
-                    }
-                })
-    
-    # Handle date ranges for both date fields
-    if 'date_ranges' in search_criteria:
-        for field, date_range in search_criteria['date_ranges'].items():
-            date_conditions = {}
-            
-            if 'start' in date_range and date_range['start']:
-                date_conditions['$gte'] = date_range['start']
-            if 'end' in date_range and date_range['end']:
-                date_conditions['$lte'] = date_range['end']
-                
-            if date_conditions:
-                match_conditions.append({
-                    f'tags.{field}': date_conditions
-                })
-    
-    # Add match stage if we have any conditions
-    if match_conditions:
-        pipeline.append({
-            '$match': {'$and': match_conditions}
-        })
-    
-    # Add sorting by date
-    pipeline.append({
-        '$sort': {'created_at': -1}
-    })
+    try:
+        pipeline, index_hint = build_search_pipeline(search_criteria)
+    except (ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid search criteria: {str(e)}'}), 400
     
     try:
-        photos = list(mongo.db.photos.aggregate(pipeline))
-        return jsonify([Photo.from_dict(photo).to_dict() for photo in photos]), 200
+        photos = list(public_collection('photos').aggregate(
+            pipeline, hint=index_hint, maxTimeMS=current_app.config['SEARCH_MAX_TIME_MS']
+        ))
+        return jsonify([serialize_photo(photo) for photo in photos]), 200
+    except DB_TIMEOUT_ERRORS:
+        raise
     except Exception as e:
         return jsonify({'error': f'Search failed: {str(e)}'}), 500
 
-@photo_bp.route('/stats', methods=['GET'])
+@photo_bp.route('/search/explain', methods=['POST'])
+@require_auth
+@require_admin
+def explain_search_photos():
+    """
+    Get the query plan of a search: the index hint and the stages and
+    indexes of the winning plan. Takes the same body as /search.
+    """
+    search_criteria = request.get_json(silent=True)
+    if not search_criteria:
+        return jsonify({'error': 'No search criteria provided'}), 400
+
+    try:
+        return jsonify(explain_search(mongo.db.photos, search_criteria)), 200
+    except (ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid search criteria: {str(e)}'}), 400
+
+@photo_bp.route('/query', methods=['GET'])
+@conditional_response('photos')
+def query_photos():
+    """
+    Free-text search across the values of all tags at once
+    Query parameters:
+        q       - words to search for, e.g. "red kite pune"; every word must
+                  match a word of some tag value, exactly, as a prefix or
+                  with a typo
+        limit   - page size (default 50)
+        cursor  - value of the X-Next-Cursor header from the previous page
+    Results are ranked by match quality (exact > prefix > fuzzy), then newest
+    first. Only the QUERY_MAX_CANDIDATES newest matching photos are ranked.
+    """
+    words = tokenize(request.args.get('q', ''))[:MAX_QUERY_TERMS]
+    if not words:
+        return jsonify({'error': 'q must contain at least one word'}), 400
+
+    try:
+        limit = parse_limit(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        after = decode_score_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    term_index = get_term_index()
+    expansions = [term_index.expand(word) for word in words]
+    # A word matching nothing in the vocabulary cannot match any photo
+    if not all(any(expansion.values()) for expansion in expansions):
+        return jsonify([]), 200
+
+    # Fetch one extra document to know whether another page exists
+    pipeline, index_hint = build_query_pipeline(
+        expansions, limit + 1, current_app.config['QUERY_MAX_CANDIDATES'], after
+    )
+    photos = list(public_collection('photos').aggregate(
+        pipeline, hint=index_hint, maxTimeMS=current_app.config['SEARCH_MAX_TIME_MS']
+    ))
+
+    headers = {}
+    if len(photos) > limit:
+        photos = photos[:limit]
+        headers['X-Next-Cursor'] = encode_score_cursor(photos[-1])
+
+    return jsonify([serialize_photo(photo) for photo in photos]), 200, headers
+
+@photo_bp.route('/query/suggest', methods=['GET'])
+@conditional_response('photos')
+def suggest_query():
+    """
+    Autocomplete for /query: the most common tag values containing the typed
+    words, the last one as a prefix
+    Query parameters:
+        q       - the text typed so far
+        limit   - number of suggestions (default 10, at most 50)
+    Returns [{"tag": "bird_name", "value": "Black Kite", "count": 12}, ...]
+    """
+    try:
+        limit = min(parse_limit(request.args.get('limit', 10)), 50)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(get_term_index().suggest(request.args.get('q', ''), limit)), 200
+
+@photo_bp.route('/near', methods=['GET'])
+@conditional_response('photos')
+def get_photos_near():
+    """
+    Photos taken near a point, closest first, from the GPS position in their EXIF
+    Query parameters:
+        lat, lng - the point, in decimal degrees
+        radius   - search radius in meters (default NEAR_DEFAULT_RADIUS,
+                   at most NEAR_MAX_RADIUS)
+        limit    - page size (default 50)
+        cursor   - value of the X-Next-Cursor header from the previous page
+    Each photo carries its "distance" from the point in meters.
+    """
+    try:
+        latitude = float(request.args['lat'])
+        longitude = float(request.args['lng'])
+        radius = float(request.args.get('radius', current_app.config['NEAR_DEFAULT_RADIUS']))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lng are required, and lat, lng and radius must be numbers'}), 400
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return jsonify({'error': 'lat must be within [-90, 90] and lng within [-180, 180]'}), 400
+    if not 0 < radius <= current_app.config['NEAR_MAX_RADIUS']:
+        return jsonify({'error': f"radius must be positive and at most {current_app.config['NEAR_MAX_RADIUS']:g} meters"}), 400
+
+    try:
+        limit = parse_limit(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        offset = decode_offset_cursor(request.args['cursor']) if request.args.get('cursor') else 0
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # $geoNear walks the 2dsphere index outwards from the point
+    pipeline = [
+        {'$geoNear': {
+            'near': {'type': 'Point', 'coordinates': [longitude, latitude]},
+            'key': LOCATION_FIELD,
+            'distanceField': '_distance',
+            'maxDistance': radius,
+            'spherical': True
+        }},
+        {'$skip': offset},
+        # Fetch one extra document to know whether another page exists
+        {'$limit': limit + 1}
+    ]
+    photos = list(public_collection('photos').aggregate(
+        pipeline, maxTimeMS=current_app.config['SEARCH_MAX_TIME_MS']
+    ))
+
+    headers = {}
+    if len(photos) > limit:
+        photos = photos[:limit]
+        headers['X-Next-Cursor'] = encode_offset_cursor(offset + limit)
+
+    return jsonify([
+        dict(serialize_photo(photo), distance=round(photo['_distance'], 1))
+        for photo in photos
+    ]), 200, headers
+
+@photo_bp.route('/stats', methods=['GET', 'POST'])
+@conditional_response('photos', 'tags')
 def get_photo_stats():
     """
     Get statistics about photos for each tag value
     Returns counts of photos for each tag value
+
+    An optional body with the same "filters"/"date_ranges" as /search
+    restricts the counts to the matching photos (faceted counts).
     """
+    search_criteria = request.get_json(silent=True) or {}
+
     try:
-        # Get all tags first
-        tags = list(mongo.db.tags.find())
-        
-        stats = {}
-        for tag in tags:
-            tag_name = tag['name']
-            # Count photos for each value of this tag
-            pipeline = [
-                {
-                    '$group': {
-                        '_id': f'$tags.{tag_name}',
-                        'count': {'$sum': 1}
-                    }
-                },
-                {
-                    '$match': {
-                        '_id': {'$ne': None}
-                    }
-                }
-            ]
-            
-            value_counts = list(mongo.db.photos.aggregate(pipeline))
-            stats[tag_name] = {
-                item['_id']: item['count'] 
-                for item in value_counts
-            }
+        conditions = build_search_conditions(search_criteria)
+    except (ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid filters: {str(e)}'}), 400
+
+    try:
+        max_time_ms = current_app.config['STATS_MAX_TIME_MS']
+        tags = public_collection('tags', depends_on=('photos', 'tags'))
+        tag_names = [tag['name'] for tag in tags.find({}, {'name': 1}, max_time_ms=max_time_ms)]
+
+        # Unfiltered stats come straight from the materialized view
+        if not conditions:
+            return jsonify(read_tag_stats(tag_names, max_time_ms)), 200
+
+        # Count every tag value in one pass over the matching photos
+        value_counts = public_collection('photos', depends_on=('photos', 'tags')).aggregate(
+            build_stats_pipeline(tag_names, conditions),
+            hint=choose_index(conditions),
+            maxTimeMS=max_time_ms
+        )
         
-        return jsonify(stats), 200
+        return jsonify(group_stats(tag_names, value_counts)), 200
     
+    except DB_TIMEOUT_ERRORS:
+        raise
     except Exception as e:
         return jsonify({'error': f'Failed to get stats: {str(e)}'}), 500 
 
@@ -227,17 +528,14 @@ def delete_photo(photo_id):
             
             if storage_id:
                 try:
-                    if storage_service == 'cloudinary':
-                        CloudinaryService.delete_image(storage_id)
-                    else:
-                        FivemerrService.delete_image(storage_id)
+                    get_backend(storage_service).delete_image(storage_id)
                 except Exception as e:
                     current_app.logger.error(f"Failed to delete from {storage_service}: {str(e)}")
                     # Continue with database deletion even if service deletion fails
         # For backward compatibility with old data structure
         elif 'fivemerr_data' in photo and 'id' in photo['fivemerr_data']:
             try:
-                FivemerrService.delete_image(photo['fivemerr_data']['id'])
+                get_backend('fivemerr').delete_image(photo['fivemerr_data']['id'])
             except Exception as e:
                 current_app.logger.error(f"Failed to delete from Fivemerr: {str(e)}")
                 
@@ -246,6 +544,9 @@ def delete_photo(photo_id):
         
         if result.deleted_count == 0:
             return jsonify({'error': 'Failed to delete photo'}), 500
+        
+        apply_tag_stats_delta(old_tags=photo.get('tags'))
+        bump_version('photos')
             
         return jsonify({'message': 'Photo deleted successfully'}), 200
         
@@ -258,27 +559,193 @@ def delete_photo(photo_id):
 @require_admin  # Only admins can edit
 def update_photo(photo_id):
     try:
-        # Get the update data
-        data = request.get_json()
+        # Get the update data: the photo's new tags, as a JSON object
+        data = request.get_json(silent=True)
         if not data:
             return jsonify({'error': 'No update data provided'}), 400
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Update data must be a JSON object of tags'}), 400
 
         # Find the photo first
         photo = mongo.db.photos.find_one({'_id': photo_id})
         if not photo:
             return jsonify({'error': 'Photo not found'}), 404
 
+        update = {'$set': {
+            'tags': data,
+            'search_tags': build_search_tags(data),
+            'search_terms': build_search_terms(data)
+        }}
+        
+        # Keep taken_at in step with date_clicked, with the EXIF seconds if the minute is unchanged
+        taken_at = parse_date_tag(data.get('date_clicked'))
+        current = photo.get(TAKEN_AT_FIELD)
+        if taken_at and current and current.replace(second=0, microsecond=0) == taken_at:
+            taken_at = current
+        if taken_at:
+            update['$set'][TAKEN_AT_FIELD] = taken_at
+        else:
+            update['$unset'] = {TAKEN_AT_FIELD: ''}
+        
         # Update the tags
-        result = mongo.db.photos.update_one(
-            {'_id': photo_id},
-            {'$set': {'tags': data}}
-        )
+        result = mongo.db.photos.update_one({'_id': photo_id}, update)
         
         if result.matched_count == 0:
             return jsonify({'error': 'Photo not found'}), 404
+        
+        apply_tag_stats_delta(old_tags=photo.get('tags'), new_tags=data)
+        bump_version('photos')
             
         return jsonify({'message': 'Photo updated successfully'}), 200
         
     except Exception as e:
         current_app.logger.error(f"Update error: {str(e)}")
-        return jsonify({'error': 'Failed to update photo'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to update photo'}), 500
+
+@photo_bp.route('/<photo_id>/similar', methods=['GET'])
+@conditional_response('photos')
+def get_similar_photos(photo_id):
+    """
+    Find near-duplicates of a photo: re-encodes, resizes, crops and burst shots
+    Query parameters:
+        distance - largest Hamming distance between perceptual hashes
+                   (0-16, default SIMILAR_DEFAULT_DISTANCE); 0 finds only
+                   visually identical photos
+        limit    - number of results (default 50)
+    Returns the matching photos, closest first, each with its "distance".
+    """
+    try:
+        distance = int(request.args.get('distance', current_app.config['SIMILAR_DEFAULT_DISTANCE']))
+    except ValueError:
+        return jsonify({'error': 'distance must be an integer'}), 400
+    if not 0 <= distance <= MAX_SIMILAR_DISTANCE:
+        return jsonify({'error': f'distance must be between 0 and {MAX_SIMILAR_DISTANCE}'}), 400
+
+    try:
+        limit = parse_limit(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    photo = public_collection('photos').find_one(
+        {'_id': photo_id}, {DHASH_FIELD: 1},
+        max_time_ms=current_app.config['LOOKUP_MAX_TIME_MS']
+    )
+    if not photo:
+        return jsonify({'error': 'Photo not found'}), 404
+    if not photo.get(DHASH_FIELD):
+        return jsonify({'error': 'Photo has no perceptual hash yet'}), 404
+
+    matches = sorted(
+        (match_distance, match_id)
+        for match_distance, match_id in get_similarity_index().search(int(photo[DHASH_FIELD], 16), distance)
+        if match_id != photo_id
+    )[:limit]
+    if not matches:
+        return jsonify([]), 200
+
+    documents = {
+        document['_id']: document
+        for document in public_collection('photos').find(
+            {'_id': {'$in': [match_id for _, match_id in matches]}},
+            max_time_ms=current_app.config['LOOKUP_MAX_TIME_MS']
+        )
+    }
+    # Photos deleted since the index was built are skipped
+    return jsonify([
+        dict(serialize_photo(documents[match_id]), distance=match_distance)
+        for match_distance, match_id in matches
+        if match_id in documents
+    ]), 200
+
+@photo_bp.route('/<photo_id>/image', methods=['GET'])
+def get_photo_image(photo_id):
+    """
+    Serve a resized derivative of a photo
+    Query parameters:
+        w   - target width in pixels, snapped up to the nearest of THUMBNAIL_WIDTHS
+        fmt - "webp" or "jpeg"; negotiated from the Accept header if omitted
+    """
+    try:
+        width = ImageService.snap_width(int(request.args.get('w', 640)))
+    except ValueError:
+        return jsonify({'error': 'w must be an integer'}), 400
+
+    fmt = request.args.get('fmt')
+    if fmt is None:
+        fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    if fmt not in DERIVATIVE_FORMATS:
+        return jsonify({'error': f'fmt must be one of: {", ".join(DERIVATIVE_FORMATS)}'}), 400
+
+    photo = public_collection('photos').find_one(
+        {'_id': photo_id}, {'storage': 1, 'url': 1},
+        max_time_ms=current_app.config['LOOKUP_MAX_TIME_MS']
+    )
+    if not photo:
+        return jsonify({'error': 'Photo not found'}), 404
+
+    storage = photo.get('storage', {})
+    source_url = storage.get('url') or photo.get('url')
+    if not source_url:
+        return jsonify({'error': 'Photo has no image'}), 404
+
+    try:
+        # Images kept on this machine are read from disk instead of over HTTP
+        local_path = None
+        if storage.get('id'):
+            local_path = get_backend(storage.get('service', 'fivemerr')).local_path(storage['id'])
+        path, key = ImageService.get_derivative(source_url, width, fmt, local_path)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 502
+
+    response = send_file(
+        path,
+        mimetype=DERIVATIVE_FORMATS[fmt][1],
+        etag=key,
+        max_age=current_app.config['IMAGE_CACHE_MAX_AGE'],
+        conditional=True
+    )
+    if 'fmt' not in request.args:
+        response.vary.add('Accept')
+    return response
+
+@photo_bp.route('/files/<image_id>', methods=['GET'])
+def get_local_file(image_id):
+    """
+    Serve an original stored by the local storage backend.
+    send_file handles Range requests and uses the server's sendfile support
+    (or X-Sendfile with USE_X_SENDFILE) to stream the file.
+    """
+    try:
+        path = get_backend('local').local_path(image_id)
+    except ValueError:
+        return jsonify({'error': 'Image not found'}), 404
+
+    if not os.path.isfile(path):
+        return jsonify({'error': 'Image not found'}), 404
+
+    return send_file(
+        path,
+        max_age=current_app.config['IMAGE_CACHE_MAX_AGE'],
+        conditional=True
+    )
+
+@photo_bp.route('/cache-stats', methods=['GET'])
+@require_auth
+@require_admin
+def get_image_cache_stats():
+    """Get hit/miss/eviction counters of this worker's image cache"""
+    return jsonify(ImageService.cache_stats()), 200
+
+@photo_bp.route('/http-stats', methods=['GET'])
+@require_auth
+@require_admin
+def get_http_stats():
+    """Get per-host call counts and latencies of this worker's outgoing HTTP calls"""
+    return jsonify(get_http_metrics()), 200
+
+@photo_bp.route('/response-cache-stats', methods=['GET'])
+@require_auth
+@require_admin
+def get_response_cache_stats():
+    """Get hit/miss/eviction counters of this worker's read response cache"""
+    return jsonify(response_cache_stats()), 200
@@ -1,7 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from app import mongo
 from app.models.tag import Tag
 from app.middleware.auth import require_auth, require_admin
+from app.utils.collection_version import bump_version
+from app.utils.response_cache import conditional_response
+from app.utils.tag_index import get_tag_index
+from app.utils.db_reads import public_collection
 
 tag_bp = Blueprint('tags', __name__)
 
@@ -24,17 +28,19 @@ def create_tag():
     
     tag = Tag(name=tag_name, values=data.get('values', []))
     mongo.db.tags.insert_one(tag.to_dict())
+    bump_version('tags')
     
     return jsonify({'message': 'Tag created successfully'}), 201
 
 @tag_bp.route('/', methods=['GET'])
+@conditional_response('tags')
 def get_tags():
-    # Debug logging
-    tags = list(mongo.db.tags.find({
-        'name': {'$nin': ['date_clicked', 'date_uploaded']}
-    }))
-    # print(f"Retrieved tags: {tags}")
-    return jsonify([Tag.from_dict(tag).to_dict() for tag in tags]), 200
+    tags = public_collection('tags').find(
+        {'name': {'$nin': ['date_clicked', 'date_uploaded']}},
+        {'_id': 0, 'name': 1, 'values': 1},
+        max_time_ms=current_app.config['LOOKUP_MAX_TIME_MS']
+    )
+    return jsonify([Tag.serialize(tag) for tag in tags]), 200
 
 @tag_bp.route('/<tag_name>/values', methods=['POST'])
 @require_auth
@@ -52,30 +58,22 @@ def add_tag_value(tag_name):
         return jsonify({'error': 'Value cannot be empty'}), 400
     
     # First check if the tag exists
-    tag = mongo.db.tags.find_one({'name': tag_name})
-    if not tag:
+    tag_index = get_tag_index(tag_name)
+    if tag_index is None:
         return jsonify({'error': f'Tag "{tag_name}" not found'}), 404
     
     # Check if value already exists
-    existing_value = any(
-        (v['value'] if isinstance(v, dict) else v) == value 
-        for v in tag.get('values', [])
-    )
-    if existing_value:
+    if tag_index.contains(value):
         return jsonify({'error': 'Value already exists'}), 400
     
     # If parent_info is provided, verify parent values exist
     if parent_info:
         for parent_tag, parent_value in parent_info.items():
-            parent = mongo.db.tags.find_one({'name': parent_tag})
-            if not parent:
+            parent_index = get_tag_index(parent_tag)
+            if parent_index is None:
                 return jsonify({'error': f'Parent tag "{parent_tag}" not found'}), 404
             
-            parent_values = [
-                v['value'] if isinstance(v, dict) else v 
-                for v in parent.get('values', [])
-            ]
-            if parent_value not in parent_values:
+            if not parent_index.contains(parent_value):
                 return jsonify({'error': f'Parent value "{parent_value}" not found in tag "{parent_tag}"'}), 404
     
     # Create the new value object
@@ -83,37 +81,31 @@ def add_tag_value(tag_name):
     if parent_info:  # Only add parent_info if it exists
         new_value['parent_info'] = parent_info
     
+    # The filter repeats the duplicate check atomically, since another
+    # worker's index may not have seen a value added moments ago
     result = mongo.db.tags.update_one(
-        {'name': tag_name},
-        {'$addToSet': {'values': new_value}}
+        {'name': tag_name, 'values': {'$ne': value}, 'values.value': {'$ne': value}},
+        {'$push': {'values': new_value}}
     )
+    if result.matched_count == 0:
+        return jsonify({'error': 'Value already exists'}), 400
+    
+    bump_version('tags')
     
     return jsonify({'message': 'Value added successfully'}), 200
 
 @tag_bp.route('/<tag_name>/values/filtered', methods=['POST'])
+@conditional_response('tags')
 def get_filtered_values(tag_name):
     """Get values filtered by parent values"""
     data = request.get_json()
     parent_filters = data.get('parent_filters', {})
     
-    tag = mongo.db.tags.find_one({'name': tag_name})
-    if not tag:
+    tag_index = get_tag_index(tag_name)
+    if tag_index is None:
         return jsonify({'error': 'Tag not found'}), 404
     
-    values = tag.get('values', [])
-    
-    if parent_filters:
-        filtered_values = [
-            v['value'] for v in values
-            if isinstance(v, dict) and
-            all(v.get('parent_info', {}).get(p_tag) == p_value 
-                for p_tag, p_value in parent_filters.items())
-        ]
-    else:
-        filtered_values = [v['value'] if isinstance(v, str) else v['value'] 
-                         for v in values]
-    
-    return jsonify(filtered_values), 200
+    return jsonify(tag_index.children(parent_filters)), 200
 
 @tag_bp.route('/<tag_name>', methods=['DELETE'])
 @require_auth
@@ -128,6 +120,7 @@ def delete_tag(tag_name):
     if result.deleted_count == 0:
         return jsonify({'error': 'Tag not found'}), 404
     
+    bump_version('tags')
     return jsonify({'message': 'Tag deleted successfully'}), 200
 
 @tag_bp.route('/<tag_name>/values', methods=['DELETE'])
@@ -166,4 +159,5 @@ def delete_tag_value(tag_name):
     if result.modified_count == 0:
         return jsonify({'error': 'Value not found'}), 404
     
+    bump_version('tags')
     return jsonify({'message': 'Value deleted successfully'}), 200 
\ No newline at end of file
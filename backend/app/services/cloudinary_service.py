@@ -1,34 +1,72 @@
+import os
+import threading
 import cloudinary
 import cloudinary.uploader
 from flask import current_app
+from app.services.storage_backend import StorageBackend, register_backend
+
+# Cloudinary's client config is process-global, so it is set up only once
+_configured = False
+_config_lock = threading.Lock()
+
+@register_backend
+class CloudinaryService(StorageBackend):
+    name = 'cloudinary'
 
-class CloudinaryService:
     @staticmethod
     def initialize():
         """
-        Initialize Cloudinary with configuration from the app
+        Initialize Cloudinary with configuration from the app, once per process
         """
-        cloudinary.config(
-            cloud_name=current_app.config['CLOUDINARY_CLOUD_NAME'],
-            api_key=current_app.config['CLOUDINARY_API_KEY'],
-            api_secret=current_app.config['CLOUDINARY_API_SECRET'],
-            secure=True
-        )
+        global _configured
+        if _configured:
+            return
+
+        with _config_lock:
+            if not _configured:
+                cloudinary.config(
+                    cloud_name=current_app.config['CLOUDINARY_CLOUD_NAME'],
+                    api_key=current_app.config['CLOUDINARY_API_KEY'],
+                    api_secret=current_app.config['CLOUDINARY_API_SECRET'],
+                    secure=True
+                )
+                _configured = True
+
+    @staticmethod
+    def _stream_size(stream):
+        """Size in bytes of a seekable stream, leaving its position unchanged"""
+        position = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(position)
+        return size
 
     @staticmethod
     def upload_image(file_data):
         """
         Upload image to Cloudinary
+        Files above CLOUDINARY_LARGE_UPLOAD_THRESHOLD are sent in chunks of
+        CLOUDINARY_CHUNK_SIZE, so memory use does not grow with the file size.
         """
         try:
             # Make sure Cloudinary is initialized
             CloudinaryService.initialize()
             
-            # Upload to cloudinary
-            result = cloudinary.uploader.upload(
-                file_data,
-                folder=current_app.config.get('CLOUDINARY_FOLDER', 'bird_gallery')
-            )
+            folder = current_app.config.get('CLOUDINARY_FOLDER', 'bird_gallery')
+            # Werkzeug FileStorage wraps the actual stream
+            stream = getattr(file_data, 'stream', file_data)
+            
+            if CloudinaryService._stream_size(stream) > current_app.config['CLOUDINARY_LARGE_UPLOAD_THRESHOLD']:
+                result = cloudinary.uploader.upload_large(
+                    stream,
+                    folder=folder,
+                    resource_type='image',
+                    chunk_size=current_app.config['CLOUDINARY_CHUNK_SIZE'],
+                    filename=getattr(file_data, 'filename', None) or 'upload'
+                )
+            else:
+                # Upload to cloudinary
+                result = cloudinary.uploader.upload(file_data, folder=folder)
             
             # Return formatted response similar to Fivemerr for compatibility
             return {
@@ -40,7 +78,7 @@ class CloudinaryService:
         except Exception as e:
             current_app.logger.error(f"Cloudinary upload error: {str(e)}")
             raise Exception("Failed to upload image to Cloudinary")
-    
+
     @staticmethod
     def delete_image(public_id):
         """
@@ -1,8 +1,13 @@
 import requests
 from flask import current_app
 import mimetypes
+from app.utils import http_client
+from app.services.storage_backend import StorageBackend, register_backend
+
+@register_backend
+class FivemerrService(StorageBackend):
+    name = 'fivemerr'
 
-class FivemerrService:
     @staticmethod
     def upload_image(file_data):
         """
@@ -23,7 +28,7 @@ class FivemerrService:
             }
             
             # Make the request to Fivemerr
-            response = requests.post(
+            response = http_client.post(
                 current_app.config['FIVEMERR_API_URL'],
                 files=files,
                 headers=headers
@@ -58,7 +63,7 @@ class FivemerrService:
             }
             
             # Make the delete request to Fivemerr
-            response = requests.delete(
+            response = http_client.delete(
                 f"{current_app.config['FIVEMERR_API_URL']}/{image_id}",
                 headers=headers
             )
@@ -0,0 +1,298 @@
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode
+from PIL import Image, ImageOps
+from flask import current_app
+from app.utils import http_client
+from app.utils.lru_cache import LRUCache, SingleFlight
+from app.utils.file_handler import remove_spooled
+from app.utils.cooperative import run_cpu_bound
+
+# Cache directory for storing optimized images on disk
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache')
+if not os.path.exists(CACHE_DIR):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+# In-memory cache of recently fetched originals, so that rendering several
+# widths of the same photo downloads it only once (created on first use)
+_original_cache = None
+
+# Concurrent requests for the same missing derivative render it only once
+_renders = SingleFlight()
+
+# Background pool rendering thumbnails of new uploads (created on first use)
+_thumbnail_executor = None
+
+# Pruning deletes derivatives until the disk cache is back under this share of its cap
+_DISK_CACHE_LOW_WATER = 0.9
+
+# Estimated size of the disk cache (per process; every prune rescans it)
+_disk_usage = None
+_disk_lock = threading.Lock()
+_prune_lock = threading.Lock()
+
+# Output format -> (Pillow format, mimetype, file extension, save options)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', 'image/webp', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+
+# Bump when the rendering changes so stale derivatives are not served
+_RENDER_VERSION = 1
+
+def _get_original_cache():
+    global _original_cache
+    if _original_cache is None:
+        _original_cache = LRUCache(
+            max_bytes=current_app.config['IMAGE_MEMORY_CACHE_BYTES'],
+            default_ttl=current_app.config['IMAGE_MEMORY_CACHE_TTL']
+        )
+    return _original_cache
+
+def _get_thumbnail_executor():
+    global _thumbnail_executor
+    if _thumbnail_executor is None:
+        _thumbnail_executor = ThreadPoolExecutor(
+            max_workers=current_app.config['THUMBNAIL_WORKERS'],
+            thread_name_prefix='thumbnails'
+        )
+    return _thumbnail_executor
+
+class ImageService:
+    @staticmethod
+    def snap_width(width):
+        """
+        Round a requested width up to the nearest of THUMBNAIL_WIDTHS, or
+        down to the largest, so clients can only request the widths that
+        are rendered for every upload anyway
+        """
+        widths = sorted(current_app.config['THUMBNAIL_WIDTHS'])
+        for candidate in widths:
+            if width <= candidate:
+                return candidate
+        return widths[-1]
+
+    @staticmethod
+    def derivative_key(source_url, width, fmt):
+        """
+        Content address of a derivative: the hash of its source and rendering
+        parameters. It doubles as the strong ETag of the response.
+        """
+        identity = f'{source_url}|{width}|{fmt}|{_RENDER_VERSION}'
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def derivative_path(key, fmt):
+        """
+        Location of a derivative on disk, sharded by the first byte of its key
+        """
+        extension = DERIVATIVE_FORMATS[fmt][2]
+        return os.path.join(CACHE_DIR, key[:2], f'{key}.{extension}')
+
+    @staticmethod
+    def fetch_original(source_url):
+        """
+        Download an original image, reusing a recent download if possible
+        """
+        def download():
+            response = http_client.get(source_url)
+            response.raise_for_status()
+            return response.content
+
+        return _get_original_cache().get_or_load(source_url, download)
+
+    @staticmethod
+    def render_derivative(original, width, fmt):
+        """
+        Resize an image (bytes or a file path) to the given width (never
+        upscaling), apply its EXIF orientation and encode it in the requested format
+        """
+        pil_format, _, _, save_options = DERIVATIVE_FORMATS[fmt]
+        if isinstance(original, (bytes, bytearray)):
+            original = BytesIO(original)
+
+        with Image.open(original) as image:
+            # Let the JPEG decoder downscale while decoding when it can
+            image.draft('RGB', (width, width))
+            image = ImageOps.exif_transpose(image)
+
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+
+            if pil_format == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            elif image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+            output = BytesIO()
+            image.save(output, pil_format, **save_options)
+            return output.getvalue()
+
+    @staticmethod
+    def get_derivative(source_url, width, fmt, local_path=None):
+        """
+        Return (path, key) of a derivative, rendering and caching it on disk
+        on first use. The original is read from local_path when given,
+        otherwise downloaded from source_url.
+        """
+        key = ImageService.derivative_key(source_url, width, fmt)
+        path = ImageService.derivative_path(key, fmt)
+
+        try:
+            # Mark the file as recently used for the disk cache cleanup
+            os.utime(path)
+        except FileNotFoundError:
+            load_original = (lambda: local_path) if local_path else (
+                lambda: ImageService.fetch_original(source_url)
+            )
+            _renders.do(key, lambda: ImageService._render_to_disk(load_original, width, fmt, path))
+
+        return path, key
+
+    @staticmethod
+    def _render_to_disk(load_original, width, fmt, path):
+        # A concurrent flight may have finished while this one was queued
+        if os.path.exists(path):
+            return
+
+        try:
+            # Fetching may do network I/O; only the decoding is offloaded
+            data = run_cpu_bound(ImageService.render_derivative, load_original(), width, fmt)
+        except Exception as e:
+            current_app.logger.error(f"Image derivative error: {str(e)}")
+            raise Exception("Failed to render image derivative")
+
+        # Write to a temporary file first so readers never see partial files
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        ImageService._account_disk_usage(len(data))
+
+    @staticmethod
+    def _scan_disk_cache():
+        """(path, size, mtime) of every derivative in the disk cache"""
+        entries = []
+        for shard in os.scandir(CACHE_DIR):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    @staticmethod
+    def _account_disk_usage(size):
+        """
+        Add a new derivative to the disk usage estimate and start a prune on
+        the background pool once it exceeds IMAGE_DISK_CACHE_BYTES
+        """
+        global _disk_usage
+        max_bytes = current_app.config['IMAGE_DISK_CACHE_BYTES']
+        with _disk_lock:
+            if _disk_usage is None:
+                _disk_usage = sum(entry[1] for entry in ImageService._scan_disk_cache())
+            else:
+                _disk_usage += size
+            over = _disk_usage > max_bytes
+
+        if over:
+            _get_thumbnail_executor().submit(ImageService.prune_disk_cache, max_bytes)
+
+    @staticmethod
+    def prune_disk_cache(max_bytes):
+        """
+        Delete the least recently served derivatives (oldest mtime first)
+        until the disk cache is under _DISK_CACHE_LOW_WATER of max_bytes.
+        The headroom keeps prunes, which rescan the cache, infrequent.
+        Returns the number of files deleted.
+        """
+        global _disk_usage
+        # One prune at a time; later requests are covered by the running one
+        if not _prune_lock.acquire(blocking=False):
+            return 0
+        try:
+            entries = ImageService._scan_disk_cache()
+            total = sum(entry[1] for entry in entries)
+            target = max_bytes * _DISK_CACHE_LOW_WATER
+            deleted = 0
+            for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                deleted += 1
+
+            with _disk_lock:
+                _disk_usage = total
+            return deleted
+        finally:
+            _prune_lock.release()
+
+    @staticmethod
+    def build_variants(image_path, source_url):
+        """
+        Describe the thumbnail ladder of a photo: one entry per width of
+        THUMBNAIL_WIDTHS with its derivative path and cache key.
+        image_path is the path of the photo's image endpoint; absolute URLs
+        are added when the photo is served (see with_public_urls).
+        """
+        fmt = current_app.config['THUMBNAIL_FORMAT']
+        return [
+            {
+                'width': width,
+                'format': fmt,
+                'key': ImageService.derivative_key(source_url, width, fmt),
+                'path': f"{image_path}?{urlencode({'w': width, 'fmt': fmt})}"
+            }
+            for width in sorted(set(current_app.config['THUMBNAIL_WIDTHS']))
+        ]
+
+    @staticmethod
+    def pregenerate_variants(original_path, source_url, variants):
+        """
+        Render the given variants into the disk cache on the background pool,
+        reading the original from a local copy instead of the CDN.
+        The local copy is deleted once all variants are rendered.
+        """
+        app = current_app._get_current_object()
+
+        def render_all():
+            with app.app_context():
+                try:
+                    for variant in variants:
+                        path = ImageService.derivative_path(variant['key'], variant['format'])
+                        _renders.do(variant['key'], lambda: ImageService._render_to_disk(
+                            lambda: original_path, variant['width'], variant['format'], path
+                        ))
+                except Exception as e:
+                    app.logger.error(f"Thumbnail generation error: {str(e)}")
+                finally:
+                    remove_spooled(original_path)
+
+        return _get_thumbnail_executor().submit(render_all)
+
+    @staticmethod
+    def cache_stats():
+        """
+        Hit/miss/eviction counters of the in-memory originals cache, and the
+        estimated size of the disk cache
+        """
+        return dict(
+            _get_original_cache().stats(),
+            disk_bytes=_disk_usage,
+            disk_max_bytes=current_app.config['IMAGE_DISK_CACHE_BYTES']
+        )
@@ -0,0 +1,68 @@
+import os
+import shutil
+import uuid
+from flask import current_app
+from app.services.storage_backend import StorageBackend, register_backend
+
+# Path of the endpoint serving stored files (photos.get_local_file)
+FILES_PATH = '/api/photos/files'
+
+@register_backend
+class LocalStorageService(StorageBackend):
+    """
+    Stores images on the local disk under LOCAL_STORAGE_DIR. They are served
+    by the /api/photos/files/<id> endpoint, so the app can run fully offline.
+    Photos store that path; the URL is built when they are served.
+    """
+    name = 'local'
+
+    @staticmethod
+    def _path(image_id):
+        # Ids are generated by upload_image; reject anything else
+        if os.path.basename(image_id) != image_id or image_id.startswith('.'):
+            raise ValueError('Invalid image id')
+        return os.path.join(current_app.config['LOCAL_STORAGE_DIR'], image_id[:2], image_id)
+
+    @staticmethod
+    def upload_image(file_data):
+        """
+        Copy an image into local storage
+        """
+        try:
+            filename = getattr(file_data, 'filename', None) or ''
+            extension = os.path.splitext(filename)[1].lower()
+            image_id = f'{uuid.uuid4().hex}{extension}'
+            path = LocalStorageService._path(image_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Copy in chunks; FileStorage wraps the actual stream
+            stream = getattr(file_data, 'stream', file_data)
+            with open(path, 'wb') as f:
+                shutil.copyfileobj(stream, f)
+
+            return {
+                'url': f'{FILES_PATH}/{image_id}',
+                'id': image_id,
+                'size': os.path.getsize(path)
+            }
+
+        except Exception as e:
+            current_app.logger.error(f"Local storage upload error: {str(e)}")
+            raise Exception("Failed to store image locally")
+
+    @staticmethod
+    def delete_image(image_id):
+        """
+        Delete an image from local storage
+        """
+        try:
+            os.remove(LocalStorageService._path(image_id))
+            return True
+
+        except Exception as e:
+            current_app.logger.error(f"Local storage delete error: {str(e)}")
+            raise Exception("Failed to delete image from local storage")
+
+    @staticmethod
+    def local_path(image_id):
+        return LocalStorageService._path(image_id)
@@ -0,0 +1,61 @@
+import inspect
+from abc import ABC, abstractmethod
+
+class StorageBackend(ABC):
+    """
+    Interface of an image storage service.
+
+    Backends are registered under the name stored in a photo's
+    storage.service field, so code that uploads or deletes images looks the
+    backend up instead of branching on service names.
+    """
+    name = None
+
+    @staticmethod
+    @abstractmethod
+    def upload_image(file_data):
+        """
+        Store an uploaded file and return {'url': url, 'id': id, 'size': size}.
+        The url may be a path on this API, made absolute when the photo is
+        served (see with_public_urls).
+        """
+
+    @staticmethod
+    @abstractmethod
+    def delete_image(image_id):
+        """Delete a stored image"""
+
+    @staticmethod
+    def local_path(image_id):
+        """Path of the image on local disk, or None if it is stored remotely"""
+        return None
+
+_backends = {}
+
+def register_backend(backend):
+    """Class decorator adding a StorageBackend to the registry"""
+    # Backends are used as classes, never instantiated, so ABC cannot catch a missing method
+    if inspect.isabstract(backend):
+        missing = ', '.join(sorted(backend.__abstractmethods__))
+        raise TypeError(f'Storage backend {backend.__name__} does not implement {missing}')
+    _backends[backend.name] = backend
+    return backend
+
+def _load_builtin_backends():
+    # Importing the modules registers their backends
+    from app.services import cloudinary_service, fivemerr_service, local_storage_service  # noqa: F401
+
+def get_backend(name):
+    """
+    Return the backend registered for a storage.service value
+    """
+    _load_builtin_backends()
+    try:
+        return _backends[name]
+    except KeyError:
+        raise ValueError(f'Unknown storage service "{name}"')
+
+def available_backends():
+    """Names of all registered storage services"""
+    _load_builtin_backends()
+    return sorted(_backends)
@@ -0,0 +1,401 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from werkzeug.datastructures import FileStorage
+from app import mongo
+from app.models.photo import Photo
+from app.services.storage_backend import get_backend
+from app.services.image_service import ImageService
+from app.utils.file_handler import remove_spooled
+from app.utils.tag_stats import apply_tag_stats_delta, apply_tag_stats_deltas
+from app.utils.collection_version import bump_version
+from app.utils.cooperative import run_cpu_bound
+from app.utils.image_hash import CONTENT_HASH_FIELD, compute_dhash
+from app.utils.exif import read_exif
+from app.utils.serialization import with_public_urls
+
+# Background pool pushing spooled uploads to storage (created on first use)
+_upload_executor = None
+_upload_slots = None
+_executor_lock = threading.Lock()
+
+class UploadQueueFull(Exception):
+    """Raised when the upload queue has no free slot"""
+
+class DuplicatePhoto(Exception):
+    """Raised when an upload is byte-identical to an existing photo"""
+
+    def __init__(self, photo_id):
+        super().__init__(f'Duplicate of photo {photo_id}')
+        self.photo_id = photo_id
+
+def _get_upload_executor():
+    global _upload_executor, _upload_slots
+    with _executor_lock:
+        if _upload_executor is None:
+            workers = current_app.config['UPLOAD_WORKERS']
+            _upload_executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='uploads'
+            )
+            # Running plus waiting jobs are bounded so the spool cannot grow without limit
+            _upload_slots = threading.BoundedSemaphore(
+                workers + current_app.config['UPLOAD_QUEUE_SIZE']
+            )
+    return _upload_executor, _upload_slots
+
+class UploadService:
+    @staticmethod
+    def find_duplicates(content_hashes):
+        """
+        Map each of the given SHA-256 digests that is already stored to the
+        id of its photo
+        """
+        content_hashes = list({h for h in content_hashes if h})
+        if not content_hashes:
+            return {}
+        return {
+            photo[CONTENT_HASH_FIELD]: photo['_id']
+            for photo in mongo.db.photos.find(
+                {CONTENT_HASH_FIELD: {'$in': content_hashes}},
+                {CONTENT_HASH_FIELD: 1}
+            )
+        }
+
+    @staticmethod
+    def perceptual_hash(original_path, filename):
+        """
+        dHash of a spooled upload, or None if it cannot be decoded.
+        A missing hash only hides the photo from similarity lookups, so it
+        never fails the upload.
+        """
+        try:
+            return run_cpu_bound(compute_dhash, original_path)
+        except Exception as e:
+            current_app.logger.warning(f"Perceptual hash failed for {filename}: {str(e)}")
+            return None
+
+    @staticmethod
+    def read_metadata(original_path, filename):
+        """
+        EXIF capture metadata of a spooled upload (see read_exif); empty if
+        it cannot be read, which never fails the upload
+        """
+        try:
+            return read_exif(original_path)
+        except Exception as e:
+            current_app.logger.warning(f"EXIF extraction failed for {filename}: {str(e)}")
+            return {}
+
+    @staticmethod
+    def push_to_storage(file, service):
+        """
+        Upload a file to the selected storage service.
+        Returns (storage_service, upload_response).
+        """
+        return service, get_backend(service).upload_image(file)
+
+    @staticmethod
+    def push_spooled(original_path, filename, service):
+        """
+        Upload a spooled file to the selected storage service.
+        Returns (storage_service, upload_response).
+        """
+        with open(original_path, 'rb') as stream:
+            return UploadService.push_to_storage(
+                FileStorage(stream=stream, filename=filename),
+                service
+            )
+
+    @staticmethod
+    def build_photo(filename, tags, photo_id, image_path, storage_service, upload_response,
+                    content_hash=None, dhash=None, metadata=None):
+        """
+        Create the Photo for an uploaded file, including its thumbnail variants
+        and the capture metadata read from its EXIF
+        """
+        # Create a new photo document with consistent storage format
+        # Both services return the same format: {'url': url, 'id': id, 'size': size}
+        photo = Photo(
+            filename=filename,
+            tags=tags,
+            photo_id=photo_id,
+            storage={
+                'service': storage_service,
+                'url': upload_response['url'],
+                'id': upload_response['id'],
+                'size': upload_response['size']
+            },
+            content_hash=content_hash,
+            dhash=dhash,
+            metadata=metadata
+        )
+
+        # Thumbnail URLs are known up front; the files are rendered in the background
+        photo.storage['variants'] = ImageService.build_variants(image_path, upload_response['url'])
+        return photo
+
+    @staticmethod
+    def discard_upload(photo):
+        """
+        Delete the stored image of a photo that could not be saved, so it
+        does not linger unreferenced on the storage service
+        """
+        try:
+            get_backend(photo.storage['service']).delete_image(photo.storage['id'])
+        except Exception as e:
+            current_app.logger.error(f"Failed to delete unsaved upload {photo.storage['url']}: {str(e)}")
+
+    @staticmethod
+    def store_photo(original_path, filename, tags, service, photo_id, image_path, content_hash=None):
+        """
+        Push a spooled upload to storage, save its photo document and start
+        its thumbnails. The spooled file is removed once thumbnails are done.
+        Raises DuplicatePhoto, without calling the storage service, if a
+        photo with the same content_hash was saved since the upload was queued,
+        or after deleting the pushed image if a concurrent upload saved one
+        first. Any other failure also deletes the pushed image, unless the
+        photo may have been saved. Returns the saved Photo.
+        """
+        photo = None
+        keep_upload = False
+        try:
+            duplicate = UploadService.find_duplicates([content_hash]).get(content_hash)
+            if duplicate:
+                raise DuplicatePhoto(duplicate)
+
+            dhash = UploadService.perceptual_hash(original_path, filename)
+            metadata = UploadService.read_metadata(original_path, filename)
+            storage_service, upload_response = UploadService.push_spooled(
+                original_path, filename, service
+            )
+            photo = UploadService.build_photo(
+                filename, tags, photo_id, image_path, storage_service, upload_response,
+                content_hash=content_hash, dhash=dhash, metadata=metadata
+            )
+
+            # Save to MongoDB; the unique content_hash index rejects the
+            # loser of two concurrent uploads that both passed the check above
+            try:
+                mongo.db.photos.insert_one(photo.to_document())
+            except DuplicateKeyError:
+                raise DuplicatePhoto(UploadService.find_duplicates([content_hash]).get(content_hash))
+            except PyMongoError as e:
+                # The insert may have been applied before the error
+                try:
+                    saved = mongo.db.photos.find_one({'_id': photo.id}, {'_id': 1}) is not None
+                except PyMongoError:
+                    # An image a saved photo may reference must stay on the storage service
+                    current_app.logger.error(f"Cannot tell whether photo {photo.id} was saved, keeping its upload")
+                    keep_upload = True
+                    raise e
+                if not saved:
+                    raise
+                current_app.logger.warning(f"Photo {photo.id} was saved despite an insert error: {str(e)}")
+            apply_tag_stats_delta(new_tags=photo.tags)
+            bump_version('photos')
+        except Exception:
+            remove_spooled(original_path)
+            if photo is not None and not keep_upload:
+                UploadService.discard_upload(photo)
+            raise
+
+        ImageService.pregenerate_variants(original_path, photo.storage['url'], photo.storage['variants'])
+        return photo
+
+    @staticmethod
+    def store_batch(items, service, parallelism):
+        """
+        Upload many spooled files concurrently and save them with one insert_many.
+        Each item is a dict with original_path, filename, tags, photo_id,
+        image_path and content_hash.
+        Returns one result dict per item, in the same order.
+        """
+        app = current_app._get_current_object()
+
+        def push(item):
+            with app.app_context():
+                dhash = UploadService.perceptual_hash(item['original_path'], item['filename'])
+                metadata = UploadService.read_metadata(item['original_path'], item['filename'])
+                return dhash, metadata, UploadService.push_spooled(item['original_path'], item['filename'], service)
+
+        results = [{'filename': item['filename']} for item in items]
+        photos = {}
+
+        # Storage pushes are network bound, so run up to `parallelism` at once
+        with ThreadPoolExecutor(max_workers=max(1, parallelism), thread_name_prefix='batch') as pool:
+            futures = [pool.submit(push, item) for item in items]
+            for index, (item, future) in enumerate(zip(items, futures)):
+                try:
+                    dhash, metadata, (storage_service, upload_response) = future.result()
+                    photos[index] = UploadService.build_photo(
+                        item['filename'], item['tags'], item['photo_id'], item['image_path'],
+                        storage_service, upload_response,
+                        content_hash=item.get('content_hash'), dhash=dhash, metadata=metadata
+                    )
+                except Exception as e:
+                    current_app.logger.error(f"Batch upload error for {item['filename']}: {str(e)}")
+                    results[index].update({'status': 'failed', 'error': 'Failed to upload photo'})
+
+        # Save every successful upload in one round trip
+        if photos:
+            indexes = list(photos)
+            unsaved = []
+            duplicates = []
+            discard = True
+            try:
+                mongo.db.photos.insert_many(
+                    [photos[i].to_document() for i in indexes],
+                    ordered=False
+                )
+            except BulkWriteError as e:
+                for error in e.details.get('writeErrors', []):
+                    index = indexes[error['index']]
+                    if error.get('code') == 11000:
+                        duplicates.append(index)
+                        continue
+                    unsaved.append(index)
+                    current_app.logger.error(f"Batch insert error for {items[index]['filename']}: {error.get('errmsg')}")
+            except PyMongoError as e:
+                # Unordered inserts may have saved part of the batch before the error
+                current_app.logger.error(f"Batch insert error: {str(e)}")
+                try:
+                    saved = {
+                        photo['_id'] for photo in mongo.db.photos.find(
+                            {'_id': {'$in': [photos[i].id for i in indexes]}}, {'_id': 1}
+                        )
+                    }
+                    unsaved = [i for i in indexes if photos[i].id not in saved]
+                except PyMongoError as e:
+                    # Images that may be referenced by saved photos must stay on the storage service
+                    current_app.logger.error(f"Cannot tell which batch photos were saved, keeping their uploads: {str(e)}")
+                    unsaved = indexes
+                    discard = False
+
+            # Unique key violations are mostly a concurrent upload of the same
+            # image, saved since the batch was checked for duplicates
+            if duplicates:
+                try:
+                    saved = UploadService.find_duplicates([photos[i].content_hash for i in duplicates])
+                except PyMongoError as e:
+                    current_app.logger.error(f"Batch duplicate lookup error: {str(e)}")
+                    saved = {}
+                for index in duplicates:
+                    photo = photos[index]
+                    duplicate = saved.get(photo.content_hash)
+                    if duplicate and duplicate != photo.id:
+                        photos.pop(index)
+                        results[index].update({'status': 'duplicate', 'duplicate_of': duplicate})
+                        UploadService.discard_upload(photo)
+                    else:
+                        unsaved.append(index)
+                        current_app.logger.error(f"Batch insert error for {items[index]['filename']}: duplicate key")
+            
+            for index in unsaved:
+                results[index].update({'status': 'failed', 'error': 'Failed to save photo'})
+                photo = photos.pop(index)
+                if discard:
+                    UploadService.discard_upload(photo)
+
+        apply_tag_stats_deltas([(None, photo.tags) for photo in photos.values()])
+        if photos:
+            bump_version('photos')
+
+        for index, item in enumerate(items):
+            photo = photos.get(index)
+            if photo is None:
+                remove_spooled(item['original_path'])
+                continue
+
+            ImageService.pregenerate_variants(
+                item['original_path'], photo.storage['url'], photo.storage['variants']
+            )
+            storage = with_public_urls(photo.storage)
+            results[index].update({
+                'status': 'created',
+                'photo_id': photo.id,
+                'url': storage['url'],
+                'service': storage['service'],
+                'variants': storage['variants']
+            })
+
+        return results
+
+    @staticmethod
+    def submit_job(original_path, filename, tags, service, photo_id, image_path, content_hash=None):
+        """
+        Queue a spooled upload for the background pool and record its job.
+        Returns the job id; raises UploadQueueFull if no slot is free.
+        If the job cannot be queued, its slot is freed and the spooled file
+        removed before the error is raised.
+        """
+        executor, slots = _get_upload_executor()
+        if not slots.acquire(blocking=False):
+            raise UploadQueueFull('Upload queue is full')
+
+        job_id = uuid.uuid4().hex
+        app = current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                try:
+                    UploadService._run_job(
+                        job_id, original_path, filename, tags, service, photo_id, image_path,
+                        content_hash
+                    )
+                finally:
+                    slots.release()
+
+        try:
+            now = datetime.utcnow()
+            mongo.db.upload_jobs.insert_one({
+                '_id': job_id,
+                'status': 'queued',
+                'filename': filename,
+                'photo_id': photo_id,
+                'created_at': now,
+                'updated_at': now
+            })
+            executor.submit(run)
+        except Exception:
+            slots.release()
+            remove_spooled(original_path)
+            raise
+        return job_id
+
+    @staticmethod
+    def _run_job(job_id, original_path, filename, tags, service, photo_id, image_path, content_hash=None):
+        try:
+            UploadService._update_job(job_id, status='processing')
+            photo = UploadService.store_photo(
+                original_path, filename, tags, service, photo_id, image_path, content_hash
+            )
+        except DuplicatePhoto as e:
+            UploadService._update_job(job_id, status='duplicate', duplicate_of=e.photo_id)
+            return
+        except Exception as e:
+            current_app.logger.error(f"Upload job {job_id} error: {str(e)}")
+            # store_photo removes the spooled file itself, but never ran if the job update failed
+            remove_spooled(original_path)
+            UploadService._update_job(job_id, status='failed', error='Failed to upload photo')
+            return
+
+        UploadService._update_job(
+            job_id,
+            status='done',
+            url=photo.storage['url'],
+            service=photo.storage['service']
+        )
+
+    @staticmethod
+    def _update_job(job_id, **fields):
+        fields['updated_at'] = datetime.utcnow()
+        mongo.db.upload_jobs.update_one({'_id': job_id}, {'$set': fields})
+
+    @staticmethod
+    def get_job(job_id):
+        """Return the job document, or None if it does not exist"""
+        return mongo.db.upload_jobs.find_one({'_id': job_id})
@@ -0,0 +1,22 @@
+from app import mongo
+from app.utils.collection_version import bump_version
+
+# Bumped on every user write, so workers drop the user documents they cache
+# with verified tokens (see require_auth)
+USERS_VERSION = 'users'
+
+ROLES = ('admin', 'viewer')
+
+class UserService:
+    @staticmethod
+    def set_role(email, role):
+        """
+        Change the role of a user. Returns False if no user has this email.
+        """
+        if role not in ROLES:
+            raise ValueError(f'Unknown role "{role}", expected one of {", ".join(ROLES)}')
+
+        result = mongo.db.users.update_one({'email': email}, {'$set': {'role': role}})
+        bump_version(USERS_VERSION)
+        return result.matched_count > 0
+
@@ -0,0 +1,95 @@
+from flask import current_app
+from pymongo.errors import DuplicateKeyError
+from app import mongo
+from app.utils.search import (
+    SEARCH_TAGS_INDEX, TAGS_INDEX, CREATED_AT_INDEX, SEARCH_TERMS_INDEX,
+    TAKEN_AT_INDEX, LOCATION_INDEX
+)
+from app.utils.image_hash import (
+    CONTENT_HASH_FIELD, DHASH_FIELD, CONTENT_HASH_INDEX, LEGACY_CONTENT_HASH_INDEX, DHASH_INDEX
+)
+from app.utils.collection_version import bump_version
+
+USERS_EMAIL_INDEX = 'email_1'
+
+DEFAULT_TAGS = [
+    {'name': 'date_clicked', 'display_name': 'Date & Time Clicked', 'values': []},
+    {'name': 'date_uploaded', 'display_name': 'Date & Time Uploaded', 'values': []}
+]
+
+def create_content_hash_index():
+    """
+    Unique index on the SHA-256 of the originals, so two concurrent uploads
+    of the same image cannot both be saved. Photos without a hash (not yet
+    migrated) are left out of it. Replaces the non-unique index of earlier
+    deploys; raises DuplicateKeyError while duplicates are still stored
+    (see migrate_unique_content_hashes).
+    """
+    if LEGACY_CONTENT_HASH_INDEX in mongo.db.photos.index_information():
+        mongo.db.photos.drop_index(LEGACY_CONTENT_HASH_INDEX)
+    mongo.db.photos.create_index(
+        CONTENT_HASH_FIELD,
+        name=CONTENT_HASH_INDEX,
+        unique=True,
+        partialFilterExpression={CONTENT_HASH_FIELD: {'$type': 'string'}}
+    )
+
+def create_indexes():
+    """
+    Create the indexes the queries rely on (search hints name them).
+    create_index is a no-op for indexes that already exist.
+    """
+    # Wildcard indexes cover every tag, including ones added by admins:
+    # normalized values for filters, raw values for date ranges
+    mongo.db.photos.create_index([('search_tags.$**', 1)], name=SEARCH_TAGS_INDEX)
+    mongo.db.photos.create_index([('tags.$**', 1)], name=TAGS_INDEX)
+    # Index for creation date, doubling as the keyset pagination order
+    mongo.db.photos.create_index(
+        [('created_at', -1), ('_id', -1)],
+        name=CREATED_AT_INDEX
+    )
+    # Free-text queries: any word of any tag, newest first
+    mongo.db.photos.create_index(
+        [('search_terms', 1), ('created_at', -1), ('_id', -1)],
+        name=SEARCH_TERMS_INDEX
+    )
+    # date_clicked ranges scan the capture time
+    mongo.db.photos.create_index(
+        [('taken_at', -1), ('_id', -1)],
+        name=TAKEN_AT_INDEX
+    )
+    # "Photos near here" queries on the EXIF GPS position
+    mongo.db.photos.create_index([('location', '2dsphere')], name=LOCATION_INDEX)
+    # Exact duplicate checks on upload and perceptual hash lookups
+    try:
+        create_content_hash_index()
+    except DuplicateKeyError:
+        current_app.logger.warning("Duplicate photos are stored, the content hash index is left to the migrations")
+    mongo.db.photos.create_index(DHASH_FIELD, name=DHASH_INDEX)
+    # Users are looked up by email on every authenticated request
+    mongo.db.users.create_index('email', name=USERS_EMAIL_INDEX)
+    # Finished upload jobs are only kept for a while
+    mongo.db.upload_jobs.create_index(
+        'created_at',
+        expireAfterSeconds=current_app.config['UPLOAD_JOB_TTL']
+    )
+
+def seed_default_tags():
+    """
+    Initialize default tags with display names if not exists
+    """
+    for tag in DEFAULT_TAGS:
+        mongo.db.tags.update_one(
+            {'name': tag['name']},
+            {'$setOnInsert': tag},
+            upsert=True
+        )
+    bump_version('tags')
+
+def bootstrap():
+    """
+    One-off schema setup, run once per deploy rather than on every worker boot
+    """
+    create_indexes()
+    seed_default_tags()
+    current_app.logger.info("Bootstrap complete: indexes and default tags are in place")
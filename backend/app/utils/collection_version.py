@@ -0,0 +1,68 @@
+import threading
+import time
+from flask import current_app
+from pymongo import ReturnDocument
+from app import mongo
+
+# One counter per collection, bumped on every write that changes what
+# the read endpoints return
+VERSIONS_COLLECTION = 'collection_versions'
+
+# Per-process copy of the counters: name -> (version, fetched_at, bumped_at)
+_versions = {}
+_versions_lock = threading.Lock()
+
+def get_versions(names):
+    """
+    Return the current versions of the given collections as a tuple.
+    Counters are re-read from MongoDB at most every VERSION_CACHE_TTL
+    seconds; writes made by this process are visible immediately.
+    """
+    _refresh(names)
+    with _versions_lock:
+        return tuple(_versions[name][0] for name in names)
+
+def written_within(names, seconds):
+    """
+    True if any of the given collections was written in the last `seconds`
+    (as far as this process knows, see get_versions)
+    """
+    _refresh(names)
+    cutoff = time.time() - seconds
+    with _versions_lock:
+        return any(_versions[name][2] > cutoff for name in names)
+
+def _refresh(names):
+    ttl = current_app.config['VERSION_CACHE_TTL']
+    now = time.monotonic()
+
+    with _versions_lock:
+        stale = [name for name in names if name not in _versions or _versions[name][1] + ttl <= now]
+
+    if stale:
+        found = {
+            doc['_id']: doc
+            for doc in mongo.db[VERSIONS_COLLECTION].find({'_id': {'$in': stale}})
+        }
+        with _versions_lock:
+            for name in stale:
+                doc = found.get(name, {})
+                _versions[name] = (doc.get('version', 0), now, doc.get('bumped_at', 0.0))
+
+def bump_version(*names):
+    """
+    Increment the versions of the given collections after a write.
+    Failures are logged rather than raised so they never fail the write itself.
+    """
+    for name in names:
+        try:
+            doc = mongo.db[VERSIONS_COLLECTION].find_one_and_update(
+                {'_id': name},
+                {'$inc': {'version': 1}, '$set': {'bumped_at': time.time()}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            with _versions_lock:
+                _versions[name] = (doc['version'], time.monotonic(), doc['bumped_at'])
+        except Exception as e:
+            current_app.logger.error(f"Failed to bump {name} version: {str(e)}")
@@ -0,0 +1,24 @@
+def is_cooperative():
+    """
+    True when the process runs under gevent with patched threading
+    (gevent_run.py or gunicorn -k gevent)
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+def run_cpu_bound(fn, *args, **kwargs):
+    """
+    Run CPU-heavy work without stalling other requests.
+
+    Under gevent every request is a greenlet on one OS thread, so image
+    decoding would block them all; the work is handed to gevent's native
+    thread pool instead (GEVENT_THREADPOOL_SIZE). Otherwise it runs inline.
+    fn must not do network I/O or use the app context.
+    """
+    if is_cooperative():
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
@@ -1,44 +1,220 @@
 from flask import current_app
 import logging
-import requests
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from io import BytesIO
+from urllib.parse import urlsplit
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from werkzeug.datastructures import FileStorage
 from app import mongo
-from app.services.cloudinary_service import CloudinaryService
+from app.utils import http_client
+from app.services.storage_backend import get_backend
+from app.services.image_service import ImageService
+from app.utils.search import (
+    SEARCH_TAGS_FIELD, SEARCH_TERMS_FIELD, DATE_TAG_FORMAT,
+    build_search_tags, build_search_terms, parse_date_tag
+)
+from app.utils.tag_stats import rebuild_tag_stats
+from app.utils.image_hash import (
+    CONTENT_HASH_FIELD, DHASH_FIELD, DUPLICATE_OF_FIELD, bytes_sha256, compute_dhash
+)
+from app.utils.bootstrap import create_content_hash_index
+from app.utils.exif import TAKEN_AT_FIELD, LOCATION_FIELD, CAMERA_FIELD, read_exif
+from app.utils.collection_version import bump_version
 
-def migrate_photo_storage_format():
+def _log_progress(label, processed, started):
+    elapsed = time.perf_counter() - started
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    current_app.logger.info(f"{label}: {processed} documents in {elapsed:.1f}s ({rate:.0f} docs/s)")
+
+def _bulk_write(collection, operations, label):
+    """
+    Apply update operations in one unordered bulk_write.
+    Returns (modified, indexes of the failed operations); failed writes are
+    logged, not raised.
+    """
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        return result.modified_count, []
+    except BulkWriteError as e:
+        write_errors = e.details.get('writeErrors', [])
+        for error in write_errors[:10]:
+            current_app.logger.error(f"{label}: write failed: {error.get('errmsg')}")
+        return e.details.get('nModified', 0), [error['index'] for error in write_errors]
+
+def bulk_update(collection, query, build_update, projection=None, batch_size=None, label='Migration'):
+    """
+    Rewrite the documents matching query in unordered bulk_write batches of
+    MIGRATION_BATCH_SIZE, one round trip per batch instead of per document.
+    build_update(document) returns the update for one document, or None to
+    leave it unchanged. Progress and throughput are logged after each batch.
+    """
+    batch_size = batch_size or current_app.config['MIGRATION_BATCH_SIZE']
+    started = time.perf_counter()
+    processed = 0
+    modified = 0
+    failed = 0
+    operations = []
+    
+    for document in collection.find(query, projection).batch_size(batch_size):
+        processed += 1
+        update = build_update(document)
+        if update:
+            operations.append(UpdateOne({'_id': document['_id']}, update))
+        
+        if len(operations) >= batch_size:
+            batch_modified, batch_failed = _bulk_write(collection, operations, label)
+            modified += batch_modified
+            failed += len(batch_failed)
+            operations = []
+            _log_progress(label, processed, started)
+    
+    if operations:
+        batch_modified, batch_failed = _bulk_write(collection, operations, label)
+        modified += batch_modified
+        failed += len(batch_failed)
+    _log_progress(label, processed, started)
+    
+    return {
+        'success_count': modified,
+        'error_count': failed
+    }
+
+# Returned by a parallel_update operation builder for photos that need no change
+UNCHANGED = object()
+
+def parallel_update(query, build_operation, projection=None, label='Migration', context=None):
+    """
+    Rewrite the photos matching query with per-document work that does I/O,
+    such as downloading originals.
+    
+    build_operation(photo) runs on a pool of MIGRATION_CONCURRENCY threads and
+    returns an UpdateOne, UNCHANGED, or None on failure. Photos are processed in _id
+    order; each batch goes out as one bulk write, after which its last _id
+    is saved as the checkpoint, so an interrupted run resumes after it
+    instead of starting over. The ids of failed photos are saved with the
+    checkpoint, and a resumed run retries them first, so a crash never
+    hides earlier failures.
+    """
+    checkpoint = context.checkpoint if context else None
+    retry_ids = set(context.failed_ids) if context else set()
+    pending_retry_ids = set(retry_ids)
+    if checkpoint is not None:
+        current_app.logger.info(
+            f"{label}: resuming after photo {checkpoint}, retrying {len(retry_ids)} failed photos"
+        )
+        query = {'$and': [query, {'$or': [
+            {'_id': {'$gt': checkpoint}},
+            {'_id': {'$in': list(retry_ids)}}
+        ]}]}
+    
+    concurrency = current_app.config['MIGRATION_CONCURRENCY']
+    batch_size = concurrency * 4
+    photos = mongo.db.photos.find(query, projection).sort('_id', 1).batch_size(batch_size)
+    
+    app = current_app._get_current_object()
+    
+    def run_one(photo):
+        with app.app_context():
+            return build_operation(photo)
+    
+    started = time.perf_counter()
+    processed = 0
+    update_count = 0
+    error_count = 0
+    
+    def run_batch(pool, batch):
+        # Documents are processed in parallel; their updates go out as one bulk write
+        results = list(pool.map(run_one, batch))
+        failed_ids = [photo['_id'] for photo, op in zip(batch, results) if op is None]
+        written = [(photo, op) for photo, op in zip(batch, results) if op is not None and op is not UNCHANGED]
+        modified, failed_writes = _bulk_write(
+            mongo.db.photos, [op for _, op in written], label
+        ) if written else (0, [])
+        failed_ids.extend(written[index][0]['_id'] for index in failed_writes)
+        
+        if context:
+            # Retried photos sort before the checkpoint, so a batch ending
+            # with one must not move the checkpoint back
+            last_id = batch[-1]['_id']
+            processed_ids = [photo['_id'] for photo in batch]
+            pending_retry_ids.difference_update(processed_ids)
+            context.save_checkpoint(
+                checkpoint if last_id in retry_ids else last_id,
+                processed_ids,
+                failed_ids
+            )
+        return modified, len(failed_ids)
+    
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='migration') as pool:
+        batch = []
+        for photo in photos:
+            batch.append(photo)
+            if len(batch) < batch_size:
+                continue
+            
+            modified, failed = run_batch(pool, batch)
+            update_count += modified
+            error_count += failed
+            processed += len(batch)
+            _log_progress(label, processed, started)
+            batch = []
+        
+        if batch:
+            modified, failed = run_batch(pool, batch)
+            update_count += modified
+            error_count += failed
+            processed += len(batch)
+            _log_progress(label, processed, started)
+    
+    if context and pending_retry_ids:
+        # Failed photos the query no longer matches need no retry
+        context.forget_failures(pending_retry_ids)
+    
+    return {
+        'success_count': update_count,
+        'error_count': error_count
+    }
+
+def migrate_photo_storage_format(context=None):
     """
     Migration utility to convert photos from the old format to the new consistent storage format.
     This ensures all photos use the same structure regardless of the service used (Fivemerr or Cloudinary).
+    
+    The transform only moves fields, so it runs server-side as a single
+    pipeline update instead of reading every document.
     """
     try:
-        # Query for photos with old format (having url, fivemerr_id, and size at the root level)
-        old_format_photos = mongo.db.photos.find({
-            'url': {'$exists': True},
-            'storage': {'$exists': False}
-        })
-        
-        update_count = 0
-        for photo in old_format_photos:
-            # Create new storage structure
-            storage = {
-                'service': 'fivemerr',  # Default to fivemerr for legacy data
-                'url': photo.get('url'),
-                'id': photo.get('fivemerr_id'),
-                'size': photo.get('size')
-            }
-            
-            # Update document with new structure
-            result = mongo.db.photos.update_one(
-                {'_id': photo['_id']},
+        started = time.perf_counter()
+        
+        # Photos with old format have url, fivemerr_id, and size at the root level
+        result = mongo.db.photos.update_many(
+            {
+                'url': {'$exists': True},
+                'storage': {'$exists': False}
+            },
+            [
                 {
-                    '$set': {'storage': storage},
-                    '$unset': {'url': "", 'fivemerr_id': "", 'size': ""}
-                }
-            )
-            
-            if result.modified_count > 0:
-                update_count += 1
+                    '$set': {
+                        'storage': {
+                            'service': 'fivemerr',  # Default to fivemerr for legacy data
+                            'url': {'$ifNull': ['$url', None]},
+                            'id': {'$ifNull': ['$fivemerr_id', None]},
+                            'size': {'$ifNull': ['$size', None]}
+                        }
+                    }
+                },
+                {'$unset': ['url', 'fivemerr_id', 'size']}
+            ]
+        )
         
+        update_count = result.modified_count
+        _log_progress('Storage format migration', update_count, started)
         current_app.logger.info(f"Migration complete: Updated {update_count} photos to new storage format")
         return update_count
         
@@ -46,110 +222,664 @@ def migrate_photo_storage_format():
         current_app.logger.error(f"Migration error: {str(e)}")
         raise e
 
-def migrate_fivemerr_to_cloudinary():
+def _read_original(source_backend, photo, source_url):
+    """Read an image's bytes from local disk or over HTTP"""
+    storage_id = photo.get('storage', {}).get('id')
+    local_path = source_backend.local_path(storage_id) if storage_id else None
+    if local_path:
+        with open(local_path, 'rb') as f:
+            return f.read()
+
+    response = http_client.get(source_url)
+    if response.status_code != 200:
+        return None
+    return response.content
+
+def _migrate_photo_storage(photo, source_service, target_service):
     """
-    Migration utility to move images from Fivemerr to Cloudinary.
+    Copy one photo's image between backends.
+    Returns the update pointing the photo at its copy, or None on failure.
+    """
+    source_backend = get_backend(source_service)
+    target_backend = get_backend(target_service)
+    
+    try:
+        # Get the source URL (either from storage or root level)
+        source_url = photo.get('storage', {}).get('url') or photo.get('url')
+        
+        if not source_url:
+            current_app.logger.error(f"No URL found for photo {photo['_id']}")
+            return None
+
+        # Download image from the source service
+        content = _read_original(source_backend, photo, source_url)
+        if content is None:
+            current_app.logger.error(f"Failed to download image for photo {photo['_id']}")
+            return None
+
+        # Upload to the target service; backends read the file name (e.g. for the extension)
+        filename = photo.get('filename') or os.path.basename(urlsplit(source_url).path) or f"{photo['_id']}.jpg"
+        upload_response = target_backend.upload_image(
+            FileStorage(stream=BytesIO(content), filename=filename)
+        )
+
+        # Prepare new storage object
+        new_storage = {
+            'service': target_service,
+            'url': upload_response['url'],
+            'id': upload_response['id'],
+            'size': upload_response['size'],
+            'old_url': source_url  # Preserve the old URL
+        }
+        
+        # Thumbnails stay valid; only their cache keys follow the new URL
+        variants = photo.get('storage', {}).get('variants')
+        if variants:
+            new_storage['variants'] = [
+                dict(variant, key=ImageService.derivative_key(
+                    upload_response['url'], variant['width'], variant['format']
+                ))
+                for variant in variants
+            ]
+
+        current_app.logger.info(f"Copied photo {photo['_id']} to {target_service}")
+        return UpdateOne(
+            {'_id': photo['_id']},
+            {
+                '$set': {'storage': new_storage},
+                # Remove old fields if they exist
+                '$unset': {'url': "", 'fivemerr_id': "", 'size': ""}
+            }
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"Error migrating photo {photo['_id']}: {str(e)}")
+        return None
+
+def migrate_storage(source_service, target_service, context=None):
+    """
+    Migration utility to move images between storage backends.
     This will:
-    1. Find all photos using Fivemerr
-    2. Download each image from Fivemerr
-    3. Upload to Cloudinary
+    1. Find all photos stored with the source service, in _id order
+    2. Download each image from the source service
+    3. Upload it to the target service
     4. Update the storage object while preserving the old URL
+    
+    Copies run in parallel and resume from a checkpoint (see parallel_update).
     """
     try:
-        # Initialize Cloudinary
-        CloudinaryService.initialize()
+        # Fail early on unknown services
+        get_backend(source_service)
+        get_backend(target_service)
         
-        # Find all photos using Fivemerr
-        fivemerr_photos = mongo.db.photos.find({
-            '$or': [
-                {'storage.service': 'fivemerr'},
-                # Also check for old format photos
-                {
-                    'url': {'$exists': True},
-                    'storage': {'$exists': False}
+        query = {'storage.service': source_service}
+        if source_service == 'fivemerr':
+            # Also check for old format photos, which were all on Fivemerr
+            query = {
+                '$or': [
+                    query,
+                    {
+                        'url': {'$exists': True},
+                        'storage': {'$exists': False}
+                    }
+                ]
+            }
+        
+        result = parallel_update(
+            query,
+            lambda photo: _migrate_photo_storage(photo, source_service, target_service),
+            label='Storage migration',
+            context=context
+        )
+        update_count, error_count = result['success_count'], result['error_count']
+        
+        current_app.logger.info(f"Migration complete: Successfully migrated {update_count} photos to {target_service}")
+        if error_count > 0:
+            current_app.logger.warning(f"Failed to migrate {error_count} photos")
+        
+        return result
+
+    except Exception as e:
+        current_app.logger.error(f"Migration error: {str(e)}")
+        raise e
+
+def migrate_fivemerr_to_cloudinary(context=None):
+    """
+    Migration utility to move images from Fivemerr to Cloudinary.
+    """
+    return migrate_storage('fivemerr', 'cloudinary', context)
+
+def migrate_search_tags(context=None):
+    """
+    Migration utility to backfill the normalized search_tags shadow field
+    used by the case-insensitive tag search.
+    
+    Normalization collapses whitespace and casefolds, which MongoDB
+    operators cannot reproduce exactly, so values are computed here and
+    written back in bulk batches.
+    """
+    try:
+        result = bulk_update(
+            mongo.db.photos,
+            {SEARCH_TAGS_FIELD: {'$exists': False}},
+            lambda photo: {'$set': {SEARCH_TAGS_FIELD: build_search_tags(photo.get('tags'))}},
+            projection={'tags': 1},
+            label='Search tags migration'
+        )
+        
+        current_app.logger.info(f"Migration complete: Added search tags to {result['success_count']} photos")
+        return result
+        
+    except Exception as e:
+        current_app.logger.error(f"Migration error: {str(e)}")
+        raise e
+
+def migrate_photo_defaults(context=None):
+    """
+    Migration utility to store the defaults that Photo.from_dict used to
+    fill in on every read, so documents can be serialized as they are:
+    - a missing created_at becomes the creation time of the photo's ObjectId
+    - a missing date_uploaded tag is derived from created_at
+    - a date_clicked tag that is not YYYY-MM-DDTHH:mm falls back to date_uploaded
+    Runs as server-side pipeline updates.
+    """
+    try:
+        started = time.perf_counter()
+        date_format = '%Y-%m-%dT%H:%M'
+        
+        created = mongo.db.photos.update_many(
+            {'created_at': None},
+            [{
+                '$set': {
+                    'created_at': {
+                        '$convert': {
+                            'input': {'$convert': {'input': '$_id', 'to': 'objectId', 'onError': None}},
+                            'to': 'date',
+                            'onError': '$$NOW',
+                            'onNull': '$$NOW'
+                        }
+                    }
                 }
-            ]
-        })
-        
-        update_count = 0
-        error_count = 0
-        
-        for photo in fivemerr_photos:
-            try:
-                # Get the Fivemerr URL (either from storage or root level)
-                fivemerr_url = photo.get('storage', {}).get('url') or photo.get('url')
-                
-                if not fivemerr_url:
-                    current_app.logger.error(f"No URL found for photo {photo['_id']}")
-                    error_count += 1
-                    continue
-
-                # Download image from Fivemerr
-                response = requests.get(fivemerr_url)
-                if response.status_code != 200:
-                    current_app.logger.error(f"Failed to download image for photo {photo['_id']}")
-                    error_count += 1
-                    continue
-
-                # Upload to Cloudinary
-                file_data = BytesIO(response.content)
-                upload_response = CloudinaryService.upload_image(file_data)
-
-                # Prepare new storage object
-                new_storage = {
-                    'service': 'cloudinary',
-                    'url': upload_response['url'],
-                    'id': upload_response['id'],
-                    'size': upload_response['size'],
-                    'old_url': fivemerr_url  # Preserve the old Fivemerr URL
+            }]
+        )
+        
+        uploaded = mongo.db.photos.update_many(
+            {'tags.date_uploaded': {'$exists': False}},
+            [{
+                '$set': {
+                    'tags.date_uploaded': {'$dateToString': {'format': date_format, 'date': '$created_at'}}
                 }
+            }]
+        )
+        
+        clicked = mongo.db.photos.update_many(
+            {'tags.date_clicked': {'$type': 'string', '$not': re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}$')}},
+            [{'$set': {'tags.date_clicked': '$tags.date_uploaded'}}]
+        )
+        
+        update_count = created.modified_count + uploaded.modified_count + clicked.modified_count
+        _log_progress('Photo defaults migration', update_count, started)
+        
+        # Date tags are counted in the tag_stats view
+        if uploaded.modified_count or clicked.modified_count:
+            rebuild_tag_stats()
+        
+        current_app.logger.info(
+            f"Migration complete: Set created_at on {created.modified_count}, date_uploaded on "
+            f"{uploaded.modified_count} and date_clicked on {clicked.modified_count} photos"
+        )
+        return update_count
+        
+    except Exception as e:
+        current_app.logger.error(f"Migration error: {str(e)}")
+        raise e
 
-                # Update the document
-                result = mongo.db.photos.update_one(
-                    {'_id': photo['_id']},
-                    {
-                        '$set': {'storage': new_storage},
-                        # Remove old fields if they exist
-                        '$unset': {'url': "", 'fivemerr_id': "", 'size': ""}
+def migrate_search_terms(context=None):
+    """
+    Migration utility to backfill the search_terms words used by free-text queries
+    """
+    try:
+        result = bulk_update(
+            mongo.db.photos,
+            {SEARCH_TERMS_FIELD: {'$exists': False}},
+            lambda photo: {'$set': {SEARCH_TERMS_FIELD: build_search_terms(photo.get('tags'))}},
+            projection={'tags': 1},
+            label='Search terms migration'
+        )
+        
+        current_app.logger.info(f"Migration complete: Added search terms to {result['success_count']} photos")
+        return result
+        
+    except Exception as e:
+        current_app.logger.error(f"Migration error: {str(e)}")
+        raise e
+
+def _hash_photo(photo):
+    """
+    Compute the exact and perceptual hashes of one photo's original.
+    Returns the update storing them, or None on failure.
+    """
+    try:
+        storage = photo.get('storage', {})
+        source_url = storage.get('url') or photo.get('url')
+        if not source_url:
+            current_app.logger.error(f"No URL found for photo {photo['_id']}")
+            return None
+        
+        content = _read_original(get_backend(storage.get('service', 'fivemerr')), photo, source_url)
+        if content is None:
+            current_app.logger.error(f"Failed to download image for photo {photo['_id']}")
+            return None
+        
+        content_hash = bytes_sha256(content)
+        fields = {DHASH_FIELD: compute_dhash(content)}
+        # The content hash index is unique: a photo stored twice points to the other copy
+        duplicate = mongo.db.photos.find_one({CONTENT_HASH_FIELD: content_hash}, {'_id': 1})
+        if duplicate:
+            fields[DUPLICATE_OF_FIELD] = duplicate['_id']
+        else:
+            fields[CONTENT_HASH_FIELD] = content_hash
+        return UpdateOne({'_id': photo['_id']}, {'$set': fields})
+    
+    except Exception as e:
+        current_app.logger.error(f"Error hashing photo {photo['_id']}: {str(e)}")
+        return None
+
+def migrate_image_hashes(context=None):
+    """
+    Migration utility to backfill the SHA-256 and dHash of existing photos,
+    used for duplicate detection and similarity lookups.
+    Originals are downloaded in parallel (see parallel_update).
+    """
+    try:
+        result = parallel_update(
+            {CONTENT_HASH_FIELD: {'$exists': False}, DUPLICATE_OF_FIELD: {'$exists': False}},
+            _hash_photo,
+            projection={'storage': 1, 'url': 1},
+            label='Image hash migration',
+            context=context
+        )
+        
+        current_app.logger.info(f"Migration complete: Hashed {result['success_count']} photos")
+        if result['error_count'] > 0:
+            current_app.logger.warning(f"Failed to hash {result['error_count']} photos")
+        return result
+    
+    except Exception as e:
+        current_app.logger.error(f"Migration error: {str(e)}")
+        raise e
+
+def migrate_taken_at(context=None):
+    """
+    Migration utility to mirror well-formed date_clicked tags into the
+    taken_at datetime used by date range searches, as a server-side
+    pipeline update. Dates that do not exist (e.g. 2024-02-30) are skipped.
+    """
+    try:
+        started = time.perf_counter()
+        
+        result = mongo.db.photos.update_many(
+            {
+                TAKEN_AT_FIELD: {'$exists': False},
+                'tags.date_clicked': {'$type': 'string', '$regex': r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}$'}
+            },
+            [{
+                '$set': {
+                    TAKEN_AT_FIELD: {
+                        '$dateFromString': {
+                            'dateString': '$tags.date_clicked',
+                            'format': '%Y-%m-%dT%H:%M',
+                            'onError': '$$REMOVE'
+                        }
                     }
-                )
+                }
+            }]
+        )
+        
+        _log_progress('Taken at migration', result.modified_count, started)
+        current_app.logger.info(f"Migration complete: Set taken_at on {result.modified_count} photos")
+        return result.modified_count
+        
+    except Exception as e:
+        current_app.logger.error(f"Migration error: {str(e)}")
+        raise e
 
-                if result.modified_count > 0:
-                    update_count += 1
-                    current_app.logger.info(f"Migrated photo {photo['_id']} to Cloudinary")
+def _read_photo_exif(photo):
+    """
+    Read the EXIF of one photo's original.
+    Returns the update storing its capture metadata, UNCHANGED if it has
+    none, or None on failure.
+    """
+    try:
+        storage = photo.get('storage', {})
+        source_url = storage.get('url') or photo.get('url')
+        if not source_url:
+            current_app.logger.error(f"No URL found for photo {photo['_id']}")
+            return None
+        
+        content = _read_original(get_backend(storage.get('service', 'fivemerr')), photo, source_url)
+        if content is None:
+            current_app.logger.error(f"Failed to download image for photo {photo['_id']}")
+            return None
+        
+        metadata = read_exif(content)
+        fields = {
+            field: metadata[field]
+            for field in (LOCATION_FIELD, CAMERA_FIELD)
+            if field in metadata
+        }
+        
+        # Same rules as on upload: the camera's clock fills a missing
+        # date_clicked, and adds the seconds to one in the same minute
+        taken_at = metadata.get(TAKEN_AT_FIELD)
+        date_clicked = parse_date_tag((photo.get('tags') or {}).get('date_clicked'))
+        if taken_at and date_clicked is None:
+            fields[TAKEN_AT_FIELD] = taken_at
+            fields['tags.date_clicked'] = taken_at.strftime(DATE_TAG_FORMAT)
+        elif taken_at and taken_at.replace(second=0, microsecond=0) == date_clicked:
+            fields[TAKEN_AT_FIELD] = taken_at
+        
+        if not fields:
+            return UNCHANGED
+        return UpdateOne({'_id': photo['_id']}, {'$set': fields})
+    
+    except Exception as e:
+        current_app.logger.error(f"Error reading EXIF of photo {photo['_id']}: {str(e)}")
+        return None
 
-            except Exception as e:
-                current_app.logger.error(f"Error migrating photo {photo['_id']}: {str(e)}")
-                error_count += 1
-                continue
+def migrate_exif_metadata(context=None):
+    """
+    Migration utility to read the EXIF of existing photos: GPS location,
+    camera, and the capture time where date_clicked is missing.
+    Originals are downloaded in parallel (see parallel_update).
+    """
+    try:
+        result = parallel_update(
+            {LOCATION_FIELD: {'$exists': False}, CAMERA_FIELD: {'$exists': False}},
+            _read_photo_exif,
+            projection={'storage': 1, 'url': 1, 'tags.date_clicked': 1},
+            label='EXIF migration',
+            context=context
+        )
+        
+        # date_clicked tags filled from EXIF are counted in the tag_stats view
+        if result['success_count']:
+            rebuild_tag_stats()
+        
+        current_app.logger.info(f"Migration complete: Added EXIF metadata to {result['success_count']} photos")
+        if result['error_count'] > 0:
+            current_app.logger.warning(f"Failed to read EXIF of {result['error_count']} photos")
+        return result
+    
+    except Exception as e:
+        current_app.logger.error(f"Migration error: {str(e)}")
+        raise e
 
-        current_app.logger.info(f"Migration complete: Successfully migrated {update_count} photos to Cloudinary")
-        if error_count > 0:
-            current_app.logger.warning(f"Failed to migrate {error_count} photos")
+def migrate_tag_stats(context=None):
+    """
+    Migration utility to build the tag_stats view from existing photos.
+    """
+    return rebuild_tag_stats()
+
+def _variant_path(url):
+    """Path and query of an absolute derivative URL"""
+    parts = urlsplit(url)
+    return f'{parts.path}?{parts.query}' if parts.query else parts.path
+
+def migrate_variant_paths(context=None):
+    """
+    Migration utility to replace the absolute thumbnail URLs stored with
+    each variant by their path. URLs were built from the upload request,
+    so behind a TLS-terminating proxy they were stored as http://; they are
+    now built when the photo is served (see with_public_urls).
+    """
+    try:
+        result = bulk_update(
+            mongo.db.photos,
+            {'storage.variants.url': {'$exists': True}},
+            lambda photo: {'$set': {'storage.variants': [
+                {
+                    **{key: value for key, value in variant.items() if key != 'url'},
+                    'path': variant.get('path') or _variant_path(variant['url'])
+                }
+                for variant in photo['storage']['variants']
+            ]}},
+            projection={'storage.variants': 1},
+            label='Variant path migration'
+        )
         
+        current_app.logger.info(f"Migration complete: Stored variant paths of {result['success_count']} photos")
+        return result
+    
+    except Exception as e:
+        current_app.logger.error(f"Migration error: {str(e)}")
+        raise e
+
+def migrate_unique_content_hashes(context=None):
+    """
+    Migration utility to make the content hash index unique (see
+    create_content_hash_index). Photos stored more than once before it was,
+    by concurrent uploads of the same image, are all kept: the oldest keeps
+    the hash and the others point to it instead.
+    """
+    try:
+        groups = mongo.db.photos.aggregate([
+            {'$match': {CONTENT_HASH_FIELD: {'$type': 'string'}}},
+            {'$sort': {'created_at': 1, '_id': 1}},
+            {'$group': {'_id': f'${CONTENT_HASH_FIELD}', 'ids': {'$push': '$_id'}}},
+            {'$match': {'ids.1': {'$exists': True}}}
+        ], allowDiskUse=True)
+        operations = [
+            UpdateOne(
+                {'_id': photo_id},
+                {'$unset': {CONTENT_HASH_FIELD: ''}, '$set': {DUPLICATE_OF_FIELD: group['ids'][0]}}
+            )
+            for group in groups
+            for photo_id in group['ids'][1:]
+        ]
+        
+        modified, failed = _bulk_write(mongo.db.photos, operations, 'Content hash migration') if operations else (0, [])
+        if not failed:
+            create_content_hash_index()
+        
+        current_app.logger.info(f"Migration complete: Unlinked the content hash of {modified} duplicate photos")
         return {
-            'success_count': update_count,
-            'error_count': error_count
+            'success_count': modified,
+            'error_count': len(failed)
         }
+    
+    except Exception as e:
+        current_app.logger.error(f"Migration error: {str(e)}")
+        raise e
+
+def _local_storage_path(storage):
+    """Storage object of a local image, with its absolute URL replaced by the path"""
+    path = urlsplit(storage['url']).path
+    result = dict(storage, url=path)
+    # Derivative cache keys follow the source URL
+    if storage.get('variants'):
+        result['variants'] = [
+            dict(variant, key=ImageService.derivative_key(path, variant['width'], variant['format']))
+            for variant in storage['variants']
+        ]
+    return result
 
+def migrate_local_storage_paths(context=None):
+    """
+    Migration utility to replace the absolute URLs of images kept by the
+    local backend, built from LOCAL_STORAGE_BASE_URL, by their path on this
+    API. They are now made absolute when the photo is served (see
+    with_public_urls).
+    """
+    try:
+        result = bulk_update(
+            mongo.db.photos,
+            {'storage.service': 'local', 'storage.url': {'$regex': '^https?://'}},
+            lambda photo: {'$set': {'storage': _local_storage_path(photo['storage'])}},
+            projection={'storage': 1},
+            label='Local storage path migration'
+        )
+        
+        current_app.logger.info(f"Migration complete: Stored local image paths of {result['success_count']} photos")
+        return result
+    
     except Exception as e:
         current_app.logger.error(f"Migration error: {str(e)}")
         raise e
 
+class MigrationContext:
+    """
+    Progress record of one migration in the schema_migrations collection.
+    Long migrations save a checkpoint so a crashed run can resume from it;
+    each save also extends the run's claim on the migration.
+    """
+
+    def __init__(self, version, record=None, owner=None):
+        self.version = version
+        self.owner = owner
+        self.checkpoint = (record or {}).get('checkpoint')
+        # Documents that failed before the checkpoint, across interrupted runs
+        self.failed_ids = list((record or {}).get('failed_ids', []))
+
+    def save_checkpoint(self, value, processed_ids=(), failed_ids=()):
+        """
+        Save the checkpoint after a batch, together with the failures so
+        far: the batch's failed documents are added and its other documents
+        (including retried ones that now succeeded) removed
+        """
+        self.checkpoint = value
+        self.forget_failures(processed_ids, save=False)
+        self.failed_ids.extend(failed_id for failed_id in failed_ids if failed_id not in self.failed_ids)
+        self._save()
+
+    def forget_failures(self, ids, save=True):
+        ids = set(ids)
+        self.failed_ids = [failed_id for failed_id in self.failed_ids if failed_id not in ids]
+        if save:
+            self._save()
+
+    def _save(self):
+        mongo.db.schema_migrations.update_one(
+            {'_id': self.version, 'owner': self.owner},
+            {'$set': {
+                'checkpoint': self.checkpoint,
+                'failed_ids': self.failed_ids,
+                'claimed_until': _claim_expiry(),
+                'updated_at': datetime.utcnow()
+            }}
+        )
+
+# Versioned migrations, applied in order and recorded in schema_migrations.
+# Never renumber or remove entries; add new migrations at the end.
+MIGRATIONS = [
+    (1, migrate_photo_storage_format),
+    (2, migrate_fivemerr_to_cloudinary),
+    (3, migrate_search_tags),
+    (4, migrate_tag_stats),
+    (5, migrate_photo_defaults),
+    (6, migrate_search_terms),
+    (7, migrate_image_hashes),
+    (8, migrate_taken_at),
+    (9, migrate_exif_metadata),
+    (10, migrate_variant_paths),
+    (11, migrate_unique_content_hashes),
+    (12, migrate_local_storage_paths),
+]
+
+def _claim_expiry():
+    return datetime.utcnow() + timedelta(seconds=current_app.config['MIGRATION_CLAIM_TTL'])
+
+def _claim_migration(version, name, owner):
+    """
+    Mark a migration as running for this run, unless it is applied or
+    another run holds an unexpired claim on it. The update only matches a
+    claimable record; otherwise the upsert tries to insert a second record
+    with the same _id and fails, so of two concurrent runs only one wins.
+    Returns (claimed, record before the claim).
+    """
+    now = datetime.utcnow()
+    try:
+        record = mongo.db.schema_migrations.find_one_and_update(
+            {
+                '_id': version,
+                '$or': [
+                    {'status': {'$nin': ['applied', 'running']}},
+                    {'status': 'running', 'claimed_until': {'$lt': now}}
+                ]
+            },
+            {
+                '$set': {
+                    'name': name,
+                    'status': 'running',
+                    'owner': owner,
+                    'claimed_until': _claim_expiry(),
+                    'started_at': now
+                }
+            },
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        return False, mongo.db.schema_migrations.find_one({'_id': version})
+    return True, record
+
 def run_migrations():
     """
-    Run all database migrations
+    Run all database migrations that have not been applied yet.
+    Each migration is claimed before it runs, so concurrent deploys never
+    apply one twice; a run that finds a migration claimed by another stops
+    there, as later migrations depend on it.
     """
     current_app.logger.info("Starting database migrations...")
     
-    # Migration 1: Update photo storage format
-    migrate_count = migrate_photo_storage_format()
-    current_app.logger.info(f"Migration 1: Updated {migrate_count} photos to new storage format")
-    
-    # Migration 2: Move images from Fivemerr to Cloudinary
-    migrate_result = migrate_fivemerr_to_cloudinary()
-    current_app.logger.info(f"Migration 2: Successfully migrated {migrate_result['success_count']} photos to Cloudinary with {migrate_result['error_count']} errors")
+    owner = uuid.uuid4().hex
+    records = {record['_id']: record for record in mongo.db.schema_migrations.find()}
     
-    # Add future migrations here
+    for version, migration in MIGRATIONS:
+        record = records.get(version)
+        if record and record.get('status') == 'applied':
+            continue
+        
+        claimed, record = _claim_migration(version, migration.__name__, owner)
+        if not claimed:
+            if record and record.get('status') == 'applied':
+                continue
+            current_app.logger.warning(f"Migration {version}: being applied by another run, stopping")
+            return
+        
+        current_app.logger.info(f"Migration {version}: running {migration.__name__}")
+        context = MigrationContext(version, record, owner)
+        try:
+            result = migration(context)
+        except Exception as e:
+            # Keep the checkpoint so the next run resumes where this one stopped
+            mongo.db.schema_migrations.update_one(
+                {'_id': version, 'owner': owner},
+                {'$set': {'status': 'failed', 'error': str(e), 'updated_at': datetime.utcnow()}}
+            )
+            raise e
+        
+        # Migrations that skipped documents, in this run or in an interrupted
+        # earlier one, stay pending and are retried in full next time
+        incomplete = bool(isinstance(result, dict) and result.get('error_count')) or bool(context.failed_ids)
+        mongo.db.schema_migrations.update_one(
+            {'_id': version, 'owner': owner},
+            {
+                '$set': {
+                    'status': 'failed' if incomplete else 'applied',
+                    'result': result,
+                    'applied_at': None if incomplete else datetime.utcnow(),
+                    'updated_at': datetime.utcnow()
+                },
+                '$unset': {'checkpoint': '', 'failed_ids': '', 'error': '', 'claimed_until': ''}
+            }
+        )
+        
+        if incomplete:
+            current_app.logger.warning(f"Migration {version}: finished with errors, it will be retried on the next run")
+        else:
+            current_app.logger.info(f"Migration {version}: applied, result {result}")
     
-    current_app.logger.info("All database migrations completed successfully")
\ No newline at end of file
+    # Migrations rewrite photo documents behind the routes' backs
+    bump_version('photos')
+    current_app.logger.info("All database migrations completed successfully")
@@ -0,0 +1,28 @@
+from flask import current_app
+from pymongo.read_preferences import ReadPreference
+from app import mongo
+from app.utils.collection_version import written_within
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST
+}
+
+def public_collection(name, depends_on=None):
+    """
+    Collection handle for public reads, using MONGO_PUBLIC_READ_PREFERENCE.
+
+    Responses are tagged with collection versions, so right after a write to
+    any collection in depends_on (default: the collection itself) reads go
+    to the primary; a lagging secondary would otherwise pair the new
+    version with old data.
+    """
+    preference = current_app.config['MONGO_PUBLIC_READ_PREFERENCE']
+    if preference != 'primary' and written_within(
+        depends_on or (name,), current_app.config['MONGO_REPLICATION_GRACE']
+    ):
+        preference = 'primary'
+    return mongo.db.get_collection(name, read_preference=READ_PREFERENCES[preference])
@@ -0,0 +1,95 @@
+from datetime import datetime
+from io import BytesIO
+from PIL import Image, ExifTags
+
+# Fields holding the metadata read from a photo's EXIF
+TAKEN_AT_FIELD = 'taken_at'
+LOCATION_FIELD = 'location'
+CAMERA_FIELD = 'camera'
+
+_EXIF_DATE_FORMAT = '%Y:%m:%d %H:%M:%S'
+
+def _text(value):
+    """EXIF strings are often NUL padded; return None for empty ones"""
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'ignore')
+    if not isinstance(value, str):
+        return None
+    value = value.strip('\x00 ')
+    return value or None
+
+def _parse_date(value):
+    """Parse an EXIF timestamp, e.g. "2024:02:20 07:41:09", or return None"""
+    value = _text(value)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value[:19], _EXIF_DATE_FORMAT)
+    except ValueError:
+        # Cameras without a set clock write "0000:00:00 00:00:00"
+        return None
+
+def _degrees(dms, ref):
+    """Convert (degrees, minutes, seconds) rationals to signed decimal degrees"""
+    degrees, minutes, seconds = (float(part) for part in dms)
+    value = degrees + minutes / 60 + seconds / 3600
+    return -value if _text(ref) in ('S', 'W') else value
+
+def _location(gps):
+    """GeoJSON point of the GPS IFD, or None without a usable fix"""
+    try:
+        latitude = _degrees(gps[ExifTags.GPS.GPSLatitude], gps.get(ExifTags.GPS.GPSLatitudeRef))
+        longitude = _degrees(gps[ExifTags.GPS.GPSLongitude], gps.get(ExifTags.GPS.GPSLongitudeRef))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+
+    # (0, 0) is what receivers without a fix write
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or (latitude == 0 and longitude == 0):
+        return None
+    # GeoJSON orders coordinates longitude first
+    return {'type': 'Point', 'coordinates': [round(longitude, 7), round(latitude, 7)]}
+
+def read_exif(source):
+    """
+    Read capture metadata from an image (bytes or a file path).
+
+    Only the headers are parsed; the pixel data is never decoded. Returns a
+    dict with any of:
+        taken_at - DateTimeOriginal as a naive datetime, in the camera's
+                   wall-clock time like the date_clicked tag
+        location - GPS position as a GeoJSON Point
+        camera   - {"make", "model", "lens"}
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+
+    with Image.open(source) as image:
+        exif = image.getexif()
+        details = exif.get_ifd(ExifTags.IFD.Exif)
+        gps = exif.get_ifd(ExifTags.IFD.GPSInfo)
+
+    metadata = {}
+
+    taken_at = _parse_date(details.get(ExifTags.Base.DateTimeOriginal)) or _parse_date(
+        exif.get(ExifTags.Base.DateTime)
+    )
+    if taken_at:
+        metadata[TAKEN_AT_FIELD] = taken_at
+
+    location = _location(gps) if gps else None
+    if location:
+        metadata[LOCATION_FIELD] = location
+
+    camera = {
+        key: value
+        for key, value in (
+            ('make', _text(exif.get(ExifTags.Base.Make))),
+            ('model', _text(exif.get(ExifTags.Base.Model))),
+            ('lens', _text(details.get(ExifTags.Base.LensModel)))
+        )
+        if value
+    }
+    if camera:
+        metadata[CAMERA_FIELD] = camera
+
+    return metadata
@@ -1,5 +1,62 @@
-from flask import current_app
+import os
+import uuid
+import tempfile
+from flask import current_app, Request
 
 def allowed_file(filename):
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS'] 
\ No newline at end of file
+           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def spool_upload(file):
+    """
+    Copy an uploaded file to the local spool directory and rewind it, so the
+    same upload can still be sent to the storage service afterwards.
+    Returns the path of the spooled copy; the caller is responsible for removing it.
+    """
+    spool_dir = current_app.config['UPLOAD_SPOOL_DIR']
+    os.makedirs(spool_dir, exist_ok=True)
+
+    extension = os.path.splitext(file.filename)[1].lower()
+    path = os.path.join(spool_dir, f'{uuid.uuid4().hex}{extension}')
+
+    # Files parsed by UploadRequest already sit in the spool directory:
+    # hard-link them instead of copying
+    stream_path = getattr(file.stream, 'name', None)
+    if isinstance(stream_path, str) and os.path.dirname(stream_path) == spool_dir:
+        file.stream.flush()
+        try:
+            os.link(stream_path, path)
+            file.stream.seek(0)
+            return path
+        except OSError:
+            pass
+
+    file.save(path)
+    file.stream.seek(0)
+    return path
+
+def remove_spooled(path):
+    """Delete a spooled upload, ignoring files that are already gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class UploadRequest(Request):
+    """
+    Request class for uploads: file parts are streamed from the request body
+    straight into the spool directory in chunks (never buffered in memory),
+    and the batch upload endpoint may send larger bodies than MAX_CONTENT_LENGTH
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool_dir = current_app.config['UPLOAD_SPOOL_DIR']
+        os.makedirs(spool_dir, exist_ok=True)
+        # Deleted on close; spool_upload() hard-links the files it keeps
+        return tempfile.NamedTemporaryFile('wb+', dir=spool_dir, suffix='.part')
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'photos.upload_batch':
+            return current_app.config['BATCH_MAX_CONTENT_LENGTH']
+        return super().max_content_length
@@ -0,0 +1,113 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+# Only these methods are retried; repeating them cannot duplicate side effects
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# One session per process: pools must not be shared across gunicorn forks
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# Per (method, host) call counters and latencies
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+def get_session():
+    """
+    Return this process's shared requests.Session with keep-alive connection pools
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            pool_size = current_app.config['HTTP_POOL_SIZE']
+            session = requests.Session()
+            # Retries are handled in request() so they can be jittered and measured
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff"""
+    cap = current_app.config['HTTP_BACKOFF_MAX']
+    base = current_app.config['HTTP_BACKOFF_BASE']
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def _record(method, url, elapsed, error=False, retry=False):
+    key = f'{method} {urlsplit(url).netloc}'
+    elapsed_ms = elapsed * 1000
+    with _metrics_lock:
+        metric = _metrics.setdefault(key, {
+            'calls': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0, 'max_ms': 0.0
+        })
+        metric['calls'] += 1
+        metric['errors'] += int(error)
+        metric['retries'] += int(retry)
+        metric['total_ms'] += elapsed_ms
+        metric['max_ms'] = max(metric['max_ms'], elapsed_ms)
+
+def request(method, url, timeout=None, retries=None, **kwargs):
+    """
+    Send a request through the shared session with connect/read timeouts.
+    Idempotent methods are retried on connection errors, timeouts and
+    retryable statuses with jittered exponential backoff.
+    """
+    method = method.upper()
+    if timeout is None:
+        timeout = (current_app.config['HTTP_CONNECT_TIMEOUT'], current_app.config['HTTP_READ_TIMEOUT'])
+    if retries is None:
+        retries = current_app.config['HTTP_MAX_RETRIES'] if method in IDEMPOTENT_METHODS else 0
+
+    session = get_session()
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            will_retry = attempt < retries
+            _record(method, url, time.perf_counter() - start, error=True, retry=will_retry)
+            if not will_retry:
+                raise
+        else:
+            will_retry = response.status_code in RETRY_STATUSES and attempt < retries
+            _record(method, url, time.perf_counter() - start,
+                    error=response.status_code >= 500, retry=will_retry)
+            if not will_retry:
+                return response
+            response.close()
+
+        time.sleep(_backoff(attempt))
+        attempt += 1
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
+
+def get_http_metrics():
+    """
+    Return per (method, host) call counts, errors, retries and latencies in ms
+    """
+    with _metrics_lock:
+        return {
+            key: dict(
+                metric,
+                avg_ms=metric['total_ms'] / metric['calls'] if metric['calls'] else 0.0
+            )
+            for key, metric in _metrics.items()
+        }
@@ -0,0 +1,155 @@
+import hashlib
+from io import BytesIO
+import numpy as np
+from PIL import Image, ImageOps
+from flask import current_app
+from app import mongo
+from app.utils.collection_version import get_versions
+from app.utils.cooperative import run_cpu_bound
+from app.utils.lru_cache import RefreshingValue
+from app.utils.response_cache import skip_response_cache
+
+# Fields holding the exact and the perceptual hash of a photo's original
+CONTENT_HASH_FIELD = 'content_hash'
+DHASH_FIELD = 'dhash'
+CONTENT_HASH_INDEX = 'content_hash_unique'
+# Non-unique index of earlier deploys, replaced by CONTENT_HASH_INDEX
+LEGACY_CONTENT_HASH_INDEX = 'content_hash_1'
+# Set instead of the content hash on photos stored twice before the index was unique
+DUPLICATE_OF_FIELD = 'duplicate_of'
+DHASH_INDEX = 'dhash_1'
+
+# dHash compares neighbouring pixels of a HASH_SIZE x HASH_SIZE grid: 64 bits
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+# Beyond a quarter of the bits, matches are mostly unrelated images
+MAX_SIMILAR_DISTANCE = HASH_BITS // 4
+
+_CHUNK_SIZE = 1024 * 1024
+
+# Per-process index, rebuilt in the background after photo writes
+_index = RefreshingValue('similarity-index')
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def bytes_sha256(data):
+    """SHA-256 hex digest of in-memory bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def compute_dhash(source):
+    """
+    Difference hash of an image (bytes or a file path) as 16 hex characters.
+
+    The image is decoded in grayscale at a reduced scale where the decoder
+    allows it, shrunk to a (HASH_SIZE + 1) x HASH_SIZE grid, and each bit
+    records whether a pixel is brighter than its right neighbour. Re-encodes,
+    resizes and small edits flip few bits, so near-duplicates have a small
+    Hamming distance.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+
+    with Image.open(source) as image:
+        # Let the JPEG decoder downscale and drop colour while decoding
+        image.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+        image = ImageOps.exif_transpose(image)
+        grid = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX)
+        pixels = np.asarray(grid, dtype=np.int16)
+
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return np.packbits(bits).tobytes().hex()
+
+def hamming_distance(a, b):
+    """Number of differing bits of two integer hashes"""
+    return bin(a ^ b).count('1')
+
+class BKTree:
+    """
+    Burkhard-Keller tree of 64-bit hashes under the Hamming distance.
+
+    Every child sits under the edge labelled with its distance to the parent,
+    so by the triangle inequality a search for radius r only descends into
+    edges within [d - r, d + r] of the distance d to the current node. Small
+    radii visit a tiny fraction of the tree.
+    """
+
+    def __init__(self):
+        # Nodes are [hash, ids, {distance: child}]
+        self._root = None
+        self.size = 0
+
+    def add(self, hash_value, item):
+        self.size += 1
+        if self._root is None:
+            self._root = [hash_value, [item], {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, [item], {}]
+                return
+            node = child
+
+    def search(self, hash_value, max_distance):
+        """Return [(distance, item), ...] of every item within max_distance"""
+        matches = []
+        if self._root is None:
+            return matches
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(hash_value, node[0])
+            if distance <= max_distance:
+                matches.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return matches
+
+def _build_tree(hashes):
+    """BKTree of (hex dHash, photo id) pairs"""
+    tree = BKTree()
+    for dhash, photo_id in hashes:
+        tree.add(int(dhash, 16), photo_id)
+    return tree
+
+def get_similarity_index():
+    """
+    Return the BKTree of all photos' dHashes. After the photos version
+    changes it is rebuilt in the background, at most once per
+    INDEX_REFRESH_INTERVAL, and the previous tree is served meanwhile;
+    responses built from it are not cached under the new version.
+    """
+    app = current_app._get_current_object()
+
+    def build():
+        with app.app_context():
+            try:
+                hashes = [
+                    (photo[DHASH_FIELD], photo['_id'])
+                    for photo in mongo.db.photos.find({DHASH_FIELD: {'$type': 'string'}}, {DHASH_FIELD: 1})
+                ]
+                return run_cpu_bound(_build_tree, hashes)
+            except Exception as e:
+                current_app.logger.error(f"Similarity index build error: {str(e)}")
+                raise
+
+    version = get_versions(('photos',))[0]
+    tree, current = _index.get(version, build, current_app.config['INDEX_REFRESH_INTERVAL'])
+    if not current:
+        skip_response_cache()
+    return tree
@@ -0,0 +1,239 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into a single execution.
+    The first caller runs the function; the others wait and share its result
+    (or its exception). If the first caller is interrupted by a
+    BaseException (e.g. a gevent Timeout or GreenletExit), the others get a
+    RuntimeError instead, since the interruption was aimed at it alone.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event()}
+
+        if not leader:
+            call['done'].wait()
+            error = call.get('error')
+            if error is None:
+                return call['result']
+            if isinstance(error, Exception):
+                raise error
+            raise RuntimeError(f'Shared call for {key!r} was interrupted') from error
+
+        try:
+            call['result'] = fn()
+            return call['result']
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+class RefreshingValue:
+    """
+    A value derived from a collection version, such as an in-process index.
+
+    The first get() builds it inline (once, however many callers arrive).
+    After that a version change starts at most one rebuild per min_interval
+    seconds, on a background thread, and callers keep getting the previous
+    value until it is done, so no request ever waits for a rebuild.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._current = None  # (version, value, built_at)
+        self._lock = threading.Lock()
+        self._first_build = SingleFlight()
+        self._refreshing = False
+        self.refresh_thread = None
+
+    def get(self, version, build, min_interval=0):
+        """
+        Return (value, current): the value for version, or the previous one
+        while a rebuild is pending, and whether it was built for version.
+        build() must be safe to run on another thread.
+        """
+        with self._lock:
+            current = self._current
+            refresh = (
+                current is not None
+                and current[0] != version
+                and not self._refreshing
+                and time.monotonic() - current[2] >= min_interval
+            )
+            if refresh:
+                self._refreshing = True
+
+        if current is None:
+            return self._first_build.do(version, lambda: self._store(version, build())), True
+
+        if refresh:
+            self.refresh_thread = threading.Thread(
+                target=self._refresh, args=(version, build), name=f'{self.name}-refresh', daemon=True
+            )
+            self.refresh_thread.start()
+        return current[1], current[0] == version
+
+    def _store(self, version, value):
+        with self._lock:
+            self._current = (version, value, time.monotonic())
+        return value
+
+    def _refresh(self, version, build):
+        try:
+            self._store(version, build())
+        except Exception:
+            # build() logs its own errors; keep the old value and retry after min_interval
+            with self._lock:
+                old_version, value, _ = self._current
+                self._current = (old_version, value, time.monotonic())
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+def _default_sizeof(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    return sys.getsizeof(value)
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the total size of its
+    values in bytes, with optional per-entry TTL.
+
+    Lookups, inserts and evictions are O(1): entries live in an OrderedDict
+    kept in recency order, so the eviction victim is always the first item.
+    get_or_load() loads missing keys through a SingleFlight, so concurrent
+    misses for the same key trigger a single load.
+    """
+
+    def __init__(self, max_bytes, default_ttl=None, sizeof=_default_sizeof):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self._loads = SingleFlight()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.load_count = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, _, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        """Return the cached value for key without counting a lookup or refreshing its recency"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (entry[2] is not None and entry[2] <= time.monotonic()):
+            return default
+        return entry[0]
+
+    def set(self, key, value, ttl=None):
+        size = self._sizeof(value)
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            # Values larger than the whole budget are never cached
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        Return the cached value for key, calling loader() to fill a miss
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        def load():
+            # Another flight may have filled the key while we were waiting
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and (entry[2] is None or entry[2] > time.monotonic()):
+                return entry[0]
+
+            loaded = loader()
+            with self._lock:
+                self.load_count += 1
+            self.set(key, loaded, ttl)
+            return loaded
+
+        return self._loads.do(key, load)
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'loads': self.load_count
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
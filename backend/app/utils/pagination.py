@@ -0,0 +1,129 @@
+import base64
+import json
+import re
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Only plain dotted field paths may be projected (no operators)
+_FIELD_PATTERN = re.compile(r'^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$')
+_PROJECTABLE_ROOTS = {'filename', 'tags', 'storage', 'created_at', 'taken_at', 'location', 'camera'}
+
+def parse_limit(raw_limit):
+    """
+    Parse the `limit` query parameter, clamped to MAX_PAGE_SIZE
+    """
+    try:
+        limit = int(raw_limit)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(photo):
+    """
+    Encode the (created_at, _id) sort key of the last photo on a page
+    """
+    created_at = photo.get('created_at')
+    payload = {
+        'c': created_at.isoformat() if isinstance(created_at, datetime) else None,
+        'i': str(photo['_id'])
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor into (created_at, _id)
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        created_at = datetime.fromisoformat(payload['c']) if payload.get('c') else None
+        return created_at, payload['i']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def encode_offset_cursor(offset):
+    """
+    Encode the position of the next page of a ranked result, where no
+    keyset exists
+    """
+    raw = json.dumps({'o': offset}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_offset_cursor(cursor):
+    """
+    Decode a cursor produced by encode_offset_cursor into an offset
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        offset = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))['o']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError('Invalid cursor')
+    return offset
+
+def encode_score_cursor(photo):
+    """
+    Encode the (_score, _id) sort key of the last photo of a ranked page
+    """
+    raw = json.dumps({'s': photo['_score'], 'i': str(photo['_id'])}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_score_cursor(cursor):
+    """
+    Decode a cursor produced by encode_score_cursor into (score, _id)
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        score, photo_id = payload['s'], payload['i']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(score, int) or isinstance(score, bool) or not isinstance(photo_id, str):
+        raise ValueError('Invalid cursor')
+    return score, photo_id
+
+def cursor_filter(cursor):
+    """
+    Build the keyset condition selecting photos that sort after the cursor
+    when ordering by created_at DESC, _id DESC
+    """
+    created_at, photo_id = decode_cursor(cursor)
+    if created_at is None:
+        # Photos without created_at sort last, so only the _id tie-break remains
+        return {'created_at': None, '_id': {'$lt': photo_id}}
+
+    return {
+        '$or': [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': photo_id}},
+            {'created_at': None}
+        ]
+    }
+
+def parse_projection(raw_fields):
+    """
+    Parse a comma separated `fields` parameter, e.g. "storage.url,tags.bird_name",
+    into a MongoDB projection. Returns None when no projection was requested.
+    """
+    if not raw_fields:
+        return None
+
+    projection = {}
+    for field in raw_fields.split(','):
+        field = field.strip()
+        if not field or field == '_id':
+            continue
+        if not _FIELD_PATTERN.match(field) or field.split('.')[0] not in _PROJECTABLE_ROOTS:
+            raise ValueError(f'Field "{field}" cannot be projected')
+        projection[field] = 1
+
+    # The sort key is always needed to build the next cursor
+    projection['created_at'] = 1
+    return projection
@@ -0,0 +1,82 @@
+import hashlib
+from functools import wraps
+from flask import request, current_app, g, has_request_context
+from app.utils.collection_version import get_versions
+from app.utils.lru_cache import LRUCache
+
+# Rendered bodies of read endpoints keyed by ETag (created on first use)
+_response_cache = None
+
+def _get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = LRUCache(
+            max_bytes=current_app.config['RESPONSE_CACHE_BYTES'],
+            sizeof=lambda entry: len(entry[0])
+        )
+    return _response_cache
+
+def build_etag(collections):
+    """
+    Strong ETag of a read: the hash of the endpoint, its arguments and body,
+    and the versions of the collections it reads
+    """
+    body_hash = hashlib.sha256(request.get_data()).hexdigest()
+    versions = get_versions(collections)
+    identity = f'{request.endpoint}|{request.full_path}|{body_hash}|{versions}'
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+def skip_response_cache():
+    """
+    Send the current response without an ETag and keep it out of the
+    response cache, e.g. when it was built from an in-process index older
+    than the collection versions the ETag would name
+    """
+    if has_request_context():
+        g.skip_response_cache = True
+
+def _set_cache_headers(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = (
+        f"public, max-age={current_app.config['READ_CACHE_MAX_AGE']}, must-revalidate"
+    )
+    return response
+
+def conditional_response(*collections, store=True):
+    """
+    Make a read endpoint cache aware. Its ETag changes only when one of the
+    given collections is written, so:
+    - GET requests with a matching If-None-Match get a 304 before the view runs
+    - with store=True, 200 responses are kept in an in-process LRU cache
+      (RESPONSE_CACHE_BYTES, 0 disables it); streamed responses never are
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # g outlives the request when an app context was already pushed
+            g.pop('skip_response_cache', None)
+            etag = build_etag(collections)
+
+            # Conditional POSTs would need a 412, so only safe methods get a 304
+            if request.method in ('GET', 'HEAD') and request.if_none_match.contains(etag):
+                return _set_cache_headers(current_app.response_class(status=304), etag)
+
+            cache = _get_response_cache() if store and current_app.config['RESPONSE_CACHE_BYTES'] else None
+            cached = cache.get(etag) if cache is not None else None
+            if cached:
+                body, mimetype = cached
+                return _set_cache_headers(current_app.response_class(body, mimetype=mimetype), etag)
+
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code != 200 or g.get('skip_response_cache'):
+                return response
+
+            if cache is not None and not response.is_streamed:
+                cache.set(etag, (response.get_data(), response.mimetype))
+            return _set_cache_headers(response, etag)
+        return decorated_function
+    return decorator
+
+def response_cache_stats():
+    """Hit/miss/eviction counters of the response cache"""
+    return _get_response_cache().stats()
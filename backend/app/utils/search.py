@@ -0,0 +1,229 @@
+import re
+from datetime import datetime, timedelta
+
+# Lowercased copies of the tag values live under this field so that
+# case-insensitive filters can be answered with exact index lookups
+SEARCH_TAGS_FIELD = 'search_tags'
+
+# Normalized words of all tag values, for free-text queries across tags
+SEARCH_TERMS_FIELD = 'search_terms'
+
+# Index names, so queries can hint the index matching their shape
+SEARCH_TAGS_INDEX = 'search_tags_wildcard'
+TAGS_INDEX = 'tags_wildcard'
+CREATED_AT_INDEX = 'created_at_-1__id_-1'
+SEARCH_TERMS_INDEX = 'search_terms_1_created_at_-1__id_-1'
+TAKEN_AT_INDEX = 'taken_at_-1__id_-1'
+LOCATION_INDEX = 'location_2dsphere'
+
+# Date tags are filtered by range on the raw value, never by normalized match
+DATE_TAGS = ('date_clicked', 'date_uploaded')
+DATE_TAG_FORMAT = '%Y-%m-%dT%H:%M'
+
+# Date tags mirrored as BSON datetimes, so their ranges are index range scans
+DATE_FIELDS = {'date_clicked': 'taken_at'}
+
+_TAG_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_]+$')
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+def normalize_tag_value(value):
+    """
+    Normalize a tag value for matching: collapse whitespace and casefold
+    """
+    return ' '.join(str(value).split()).casefold()
+
+def build_search_tags(tags):
+    """
+    Build the normalized shadow copy of a photo's tags
+    """
+    return {
+        name: normalize_tag_value(value)
+        for name, value in (tags or {}).items()
+        if name not in DATE_TAGS and isinstance(value, str) and value.strip()
+    }
+
+def parse_date_tag(value):
+    """
+    Parse a YYYY-MM-DDTHH:mm date tag into a datetime, or None if it is malformed
+    """
+    try:
+        return datetime.strptime(value, DATE_TAG_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+def _parse_date_bound(value, end):
+    """
+    Parse the start or end of a date range, either YYYY-MM-DD or
+    YYYY-MM-DDTHH:mm. Ends are returned exclusive: a day includes all of its
+    minutes, and a minute all of its seconds.
+    """
+    if not isinstance(value, str):
+        raise ValueError(f'Invalid date "{value}"')
+    try:
+        if 'T' in value:
+            return datetime.strptime(value, DATE_TAG_FORMAT) + (timedelta(minutes=1) if end else timedelta())
+        return datetime.strptime(value, '%Y-%m-%d') + (timedelta(days=1) if end else timedelta())
+    except ValueError:
+        raise ValueError(f'Invalid date "{value}", expected YYYY-MM-DD or YYYY-MM-DDTHH:mm')
+
+def tokenize(text):
+    """
+    Split text into normalized words, e.g. "Red-vented  Bulbul" -> ["red", "vented", "bulbul"]
+    """
+    return _TOKEN_PATTERN.findall(normalize_tag_value(text))
+
+def build_search_terms(tags):
+    """
+    Build the multikey list of distinct words across a photo's tag values
+    """
+    return sorted({
+        token
+        for name, value in (tags or {}).items()
+        if name not in DATE_TAGS and isinstance(value, str)
+        for token in tokenize(value)
+    })
+
+def _validate_tag_name(tag_name):
+    if not isinstance(tag_name, str) or not _TAG_NAME_PATTERN.match(tag_name):
+        raise ValueError(f'Invalid tag name "{tag_name}"')
+
+def build_search_conditions(search_criteria):
+    """
+    Translate a search request body into a list of MongoDB match conditions.
+
+    Values of the same tag are OR-ed ($in) and different tags are AND-ed.
+    With "match": "prefix" each value matches as an anchored, escaped prefix,
+    which can still be answered from the index.
+    date_clicked ranges compare the taken_at datetime; other date tags
+    compare their raw string values.
+    """
+    match_mode = search_criteria.get('match', 'exact')
+    if match_mode not in ('exact', 'prefix'):
+        raise ValueError('match must be "exact" or "prefix"')
+
+    conditions = []
+
+    for tag_name, values in (search_criteria.get('filters') or {}).items():
+        _validate_tag_name(tag_name)
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise ValueError(f'Values of "{tag_name}" must be a string or a list of strings')
+
+        normalized = [normalize_tag_value(v) for v in values if v.strip()]
+        if not normalized:
+            continue
+
+        if match_mode == 'prefix':
+            normalized = [re.compile('^' + re.escape(v)) for v in normalized]
+
+        conditions.append({f'{SEARCH_TAGS_FIELD}.{tag_name}': {'$in': normalized}})
+
+    for field, date_range in (search_criteria.get('date_ranges') or {}).items():
+        _validate_tag_name(field)
+        if not isinstance(date_range, dict):
+            raise ValueError(f'Date range of "{field}" must be an object with "start" and/or "end"')
+        date_conditions = {}
+        
+        if field in DATE_FIELDS:
+            if date_range.get('start'):
+                date_conditions['$gte'] = _parse_date_bound(date_range['start'], end=False)
+            if date_range.get('end'):
+                date_conditions['$lt'] = _parse_date_bound(date_range['end'], end=True)
+            if date_conditions:
+                conditions.append({DATE_FIELDS[field]: date_conditions})
+            continue
+
+        if date_range.get('start'):
+            date_conditions['$gte'] = date_range['start']
+        if date_range.get('end'):
+            date_conditions['$lte'] = date_range['end']
+
+        if date_conditions:
+            conditions.append({f'tags.{field}': date_conditions})
+
+    return conditions
+
+def build_match_stage(conditions):
+    """Combine conditions into a single $match filter document"""
+    if not conditions:
+        return {}
+    if len(conditions) == 1:
+        return conditions[0]
+    return {'$and': conditions}
+
+def choose_index(conditions):
+    """
+    Pick the index for a query shape.
+
+    Tag filters are usually the most selective predicate, so they go to the
+    shadow-field wildcard index; date_clicked ranges scan the taken_at index
+    and other date ranges the tags wildcard index; unfiltered listings walk
+    the created_at index in sort order.
+    Hinting avoids the planner preferring the sort index and scanning it whole.
+    """
+    fields = [field for condition in conditions for field in condition]
+
+    if any(field.startswith(f'{SEARCH_TAGS_FIELD}.') for field in fields):
+        return SEARCH_TAGS_INDEX
+    if any(field.startswith('tags.') for field in fields):
+        return TAGS_INDEX
+    if any(field in DATE_FIELDS.values() for field in fields):
+        return TAKEN_AT_INDEX
+    return CREATED_AT_INDEX
+
+def build_search_pipeline(search_criteria):
+    """
+    Build the aggregation pipeline and index hint for a search request
+    """
+    conditions = build_search_conditions(search_criteria)
+
+    pipeline = []
+    if conditions:
+        pipeline.append({'$match': build_match_stage(conditions)})
+    pipeline.append({'$sort': {'created_at': -1, '_id': -1}})
+
+    return pipeline, choose_index(conditions)
+
+def _winning_plan(explain):
+    """Winning plan of an aggregate explain, with or without a $cursor stage"""
+    if 'queryPlanner' in explain:
+        return explain['queryPlanner']['winningPlan']
+    for stage in explain.get('stages', []):
+        if '$cursor' in stage:
+            return stage['$cursor']['queryPlanner']['winningPlan']
+    return {}
+
+def summarize_plan(explain):
+    """
+    Reduce explain output to the stages of its winning plan, outermost
+    first, and the indexes they scan
+    """
+    stages = []
+    indexes = []
+    pending = [_winning_plan(explain)]
+    while pending:
+        stage = pending.pop(0)
+        # Slot-based engine plans nest the classic plan under queryPlan
+        stage = stage.get('queryPlan', stage)
+        if 'stage' in stage:
+            stages.append(stage['stage'])
+        if 'indexName' in stage:
+            indexes.append(stage['indexName'])
+        if 'inputStage' in stage:
+            pending.append(stage['inputStage'])
+        pending.extend(stage.get('inputStages', []))
+    return {'stages': stages, 'indexes': indexes}
+
+def explain_search(collection, search_criteria):
+    """
+    Return the index hint and winning plan summary (see summarize_plan) of
+    a search, to confirm it is served by an IXSCAN
+    """
+    pipeline, hint = build_search_pipeline(search_criteria)
+    explain = collection.database.command(
+        'explain',
+        {'aggregate': collection.name, 'pipeline': pipeline, 'cursor': {}, 'hint': hint},
+        verbosity='queryPlanner'
+    )
+    return dict(summarize_plan(explain), hint=hint)
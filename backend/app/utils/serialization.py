@@ -0,0 +1,102 @@
+from datetime import date, datetime, timezone
+import orjson
+from bson import ObjectId
+from flask import current_app, request
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+# Fields of a photo document that are part of the API; everything else
+# (search_tags and other derived fields) stays internal
+PHOTO_FIELDS = ('filename', 'tags', 'created_at', 'taken_at', 'location', 'camera')
+
+_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+def _http_datetime(value):
+    """Same output as werkzeug's http_date for a datetime, several times faster"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return (
+        f'{_WEEKDAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} {value.year:04d} '
+        f'{value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT'
+    )
+
+def _default(value):
+    # Datetimes are passed through so they keep Flask's HTTP date format
+    if isinstance(value, datetime):
+        return _http_datetime(value)
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def dumps(obj):
+    """
+    Serialize to JSON bytes with orjson. Like the standard library encoder,
+    int, float and bool keys (e.g. tag values in /stats) become strings.
+    """
+    return orjson.dumps(
+        obj,
+        default=_default,
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    )
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson. Output matches the default
+    provider's types: HTTP dates for datetimes and strings for ObjectIds.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype='application/json')
+
+def public_url(path):
+    """
+    Absolute URL of an API path, on PUBLIC_BASE_URL if configured,
+    otherwise on the current request's host
+    """
+    base_url = current_app.config['PUBLIC_BASE_URL'] or request.host_url
+    return f"{base_url.rstrip('/')}{path}"
+
+def with_public_urls(storage):
+    """
+    Copy of a photo's storage object with absolute URLs. Images served by
+    this API (the local backend) and thumbnail variants store only their
+    path, so documents never pin the scheme or host of the request that
+    created them.
+    """
+    url = storage.get('url')
+    relative = isinstance(url, str) and url.startswith('/')
+    if not relative and not storage.get('variants'):
+        return storage
+
+    result = dict(storage)
+    if relative:
+        result['url'] = public_url(url)
+    if storage.get('variants'):
+        result['variants'] = [
+            dict(variant, url=public_url(variant['path'])) if 'path' in variant else variant
+            for variant in storage['variants']
+        ]
+    return result
+
+def serialize_photo(document):
+    """
+    Convert a raw photo document to its API representation without building
+    a Photo; documents are kept in the current format by the migrations
+    """
+    result = {'_id': str(document['_id'])}
+    for field in PHOTO_FIELDS:
+        if field in document:
+            result[field] = document[field]
+    if document.get('storage'):
+        result['storage'] = with_public_urls(document['storage'])
+    return result
@@ -0,0 +1,30 @@
+import time
+
+class StartupTimer:
+    """
+    Measure the phases of app construction and report them against a budget
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+        self._last = self.started
+
+    def mark(self, phase):
+        """Close the current phase, which started at the previous mark"""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def total_ms(self):
+        return (self._last - self.started) * 1000
+
+    def report(self, logger, budget_ms):
+        breakdown = ', '.join(f'{phase} {elapsed:.0f}ms' for phase, elapsed in self.phases)
+        total = self.total_ms()
+        message = f"App startup took {total:.0f}ms (budget {budget_ms}ms): {breakdown}"
+        if total > budget_ms:
+            logger.warning(message)
+        else:
+            logger.info(message)
+        return total
@@ -0,0 +1,110 @@
+from itertools import combinations
+from flask import current_app
+from app import mongo
+from app.utils.collection_version import get_versions
+from app.utils.lru_cache import LRUCache, SingleFlight
+
+# Values with more parents than this are not expanded into every parent
+# subset; tags holding such values fall back to a scan
+MAX_INDEXED_PARENTS = 6
+
+# Per-process indexes of existing tags: tag name -> (tags version, TagValueIndex),
+# bounded to TAG_INDEX_CACHE_SIZE tags (created on first use)
+_indexes = None
+_builds = SingleFlight()
+
+def _get_index_cache():
+    global _indexes
+    if _indexes is None:
+        # Every entry counts as 1, so the byte budget is a number of tags
+        _indexes = LRUCache(max_bytes=current_app.config['TAG_INDEX_CACHE_SIZE'], sizeof=lambda entry: 1)
+    return _indexes
+
+def _value_of(value):
+    return value['value'] if isinstance(value, dict) else value
+
+def _hashable(value):
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+class TagValueIndex:
+    """
+    Lookup structure over the values of one tag.
+
+    Each value is registered under every non-empty subset of its parent_info
+    items, so the values matching a parent filter (all of whose pairs appear
+    in the value's parent_info) are a single dict lookup, e.g. a city is
+    found under {country}, {state} and {country, state}.
+    """
+
+    def __init__(self, values):
+        self.values = [_value_of(v) for v in values]
+        self._value_set = {v for v in self.values if _hashable(v)}
+        self._unhashable = [v for v in self.values if not _hashable(v)]
+        # Values with parents, in document order, for filters the index cannot answer
+        self._parented = []
+        self._children = {}
+        self._complete = True
+
+        for value in values:
+            parent_info = value.get('parent_info') if isinstance(value, dict) else None
+            if not parent_info:
+                continue
+            self._parented.append(value)
+
+            items = list(parent_info.items())
+            if len(items) > MAX_INDEXED_PARENTS or not all(_hashable(item) for item in items):
+                self._complete = False
+                continue
+
+            for size in range(1, len(items) + 1):
+                for subset in combinations(items, size):
+                    self._children.setdefault(frozenset(subset), []).append(value['value'])
+
+    def contains(self, value):
+        if _hashable(value):
+            return value in self._value_set
+        return value in self._unhashable
+
+    def children(self, parent_filters):
+        """
+        Values whose parent_info matches every (tag, value) pair of the filter,
+        in the order they were added
+        """
+        if not parent_filters:
+            return self.values
+
+        items = parent_filters.items()
+        if self._complete and all(_hashable(item) for item in items):
+            return self._children.get(frozenset(items), [])
+
+        return [
+            value['value'] for value in self._parented
+            if all(value['parent_info'].get(tag) == parent for tag, parent in items)
+        ]
+
+def get_tag_index(tag_name):
+    """
+    Return the TagValueIndex of a tag, or None if the tag does not exist.
+    Indexes are rebuilt on their next use after the tags version changes,
+    i.e. after any tag write. Missing tags are never cached, so lookups of
+    arbitrary names cannot fill the cache.
+    """
+    version = get_versions(('tags',))[0]
+    indexes = _get_index_cache()
+    cached = indexes.get(tag_name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    def build():
+        tag = mongo.db.tags.find_one({'name': tag_name}, {'values': 1})
+        if not tag:
+            return None
+        index = TagValueIndex(tag.get('values', []))
+        indexes.set(tag_name, (version, index))
+        return index
+
+    return _builds.do((tag_name, version), build)
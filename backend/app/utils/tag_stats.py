@@ -0,0 +1,133 @@
+from collections import Counter
+from flask import current_app
+from pymongo import UpdateOne
+from app import mongo
+from app.utils.search import build_match_stage
+from app.utils.collection_version import bump_version
+
+# Materialized view of photo counts per tag value, one small document each:
+# {'_id': {'tag': name, 'value': value}, 'count': n}
+TAG_STATS_COLLECTION = 'tag_stats'
+
+def build_stats_pipeline(tag_names=None, conditions=None):
+    """
+    Build a single-pass aggregation counting photos per tag value.
+
+    Each photo's tags object is unwound into (name, value) pairs once, so the
+    cost is one scan regardless of how many tags exist. Optional search
+    conditions restrict the counts to a result set (faceted counts).
+    """
+    pipeline = []
+    if conditions:
+        pipeline.append({'$match': build_match_stage(conditions)})
+
+    pipeline.extend([
+        {'$project': {'_id': 0, 'tag': {'$objectToArray': '$tags'}}},
+        {'$unwind': '$tag'},
+        {'$match': _tag_value_filter(tag_names)},
+        {
+            '$group': {
+                '_id': {'tag': '$tag.k', 'value': '$tag.v'},
+                'count': {'$sum': 1}
+            }
+        }
+    ])
+    return pipeline
+
+def _tag_value_filter(tag_names):
+    value_filter = {'tag.v': {'$ne': None}}
+    if tag_names is not None:
+        value_filter['tag.k'] = {'$in': list(tag_names)}
+    return value_filter
+
+def group_stats(tag_names, value_counts):
+    """
+    Shape aggregation output as {tag: {value: count}}, including tags without photos
+    """
+    stats = {tag_name: {} for tag_name in tag_names}
+    for item in value_counts:
+        stats[item['_id']['tag']][item['_id']['value']] = item['count']
+    return stats
+
+def _tag_value_counts(tags):
+    """Count the (tag, value) pairs of a photo that the view tracks"""
+    return Counter(
+        (name, value)
+        for name, value in (tags or {}).items()
+        if isinstance(value, (str, int, float, bool))
+    )
+
+def apply_tag_stats_delta(old_tags=None, new_tags=None):
+    """
+    Update the tag_stats view for a photo whose tags changed from old_tags to
+    new_tags (None for an upload or a delete). Only the difference is applied.
+
+    Failures are logged rather than raised so the photo write itself still
+    succeeds; rebuild_tag_stats() reconciles any drift.
+    """
+    apply_tag_stats_deltas([(old_tags, new_tags)])
+
+def apply_tag_stats_deltas(changes):
+    """
+    Apply several (old_tags, new_tags) changes to the tag_stats view in one
+    bulk write, e.g. for a batch upload
+    """
+    delta = Counter()
+    for old_tags, new_tags in changes:
+        delta.update(_tag_value_counts(new_tags))
+        delta.subtract(_tag_value_counts(old_tags))
+
+    operations = [
+        UpdateOne(
+            {'_id': {'tag': name, 'value': value}},
+            {'$inc': {'count': count}},
+            upsert=True
+        )
+        for (name, value), count in delta.items()
+        if count
+    ]
+    if not operations:
+        return
+
+    try:
+        mongo.db[TAG_STATS_COLLECTION].bulk_write(operations, ordered=False)
+    except Exception as e:
+        current_app.logger.error(f"Tag stats update error: {str(e)}")
+
+def read_tag_stats(tag_names, max_time_ms=None):
+    """
+    Read {tag: {value: count}} from the tag_stats view
+    """
+    value_counts = mongo.db[TAG_STATS_COLLECTION].find(
+        {
+            '_id.tag': {'$in': list(tag_names)},
+            'count': {'$gt': 0}
+        },
+        max_time_ms=max_time_ms
+    )
+    return group_stats(tag_names, value_counts)
+
+def rebuild_tag_stats():
+    """
+    Recompute the tag_stats view from the photos collection.
+
+    The counts are written to a scratch collection and swapped in with a
+    rename, so readers never see a partially built view. The photos version
+    is bumped afterwards so cached stats and the term index are rebuilt.
+    """
+    scratch_collection = f'{TAG_STATS_COLLECTION}_rebuild'
+    pipeline = build_stats_pipeline()
+    pipeline.append({'$out': scratch_collection})
+
+    mongo.db.photos.aggregate(pipeline)
+
+    if scratch_collection in mongo.db.list_collection_names():
+        mongo.db[scratch_collection].rename(TAG_STATS_COLLECTION, dropTarget=True)
+    else:
+        # No photos at all, so no output collection was created
+        mongo.db[TAG_STATS_COLLECTION].delete_many({})
+    bump_version('photos')
+
+    value_count = mongo.db[TAG_STATS_COLLECTION].count_documents({})
+    current_app.logger.info(f"Rebuilt tag stats: {value_count} tag values")
+    return value_count
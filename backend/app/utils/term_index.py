@@ -0,0 +1,209 @@
+import heapq
+from bisect import bisect_left
+from flask import current_app
+from app import mongo
+from app.utils.collection_version import get_versions
+from app.utils.cooperative import run_cpu_bound
+from app.utils.lru_cache import RefreshingValue
+from app.utils.response_cache import skip_response_cache
+from app.utils.search import (
+    DATE_TAGS, SEARCH_TERMS_FIELD, SEARCH_TERMS_INDEX, tokenize
+)
+from app.utils.tag_stats import TAG_STATS_COLLECTION
+
+# Words shorter than this are never fuzzy matched
+FUZZY_MIN_LENGTH = 4
+
+# Each query word expands to at most this many vocabulary words per match kind
+MAX_EXPANSIONS = 50
+
+# Query words beyond this are ignored
+MAX_QUERY_TERMS = 8
+
+# Ranking weight of a query word by how it matched
+MATCH_WEIGHTS = {'exact': 3, 'prefix': 2, 'fuzzy': 1}
+
+# Per-process index, rebuilt in the background after photo writes
+_index = RefreshingValue('term-index')
+
+def _deletes(word):
+    """Every variant of word with one character removed"""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def _edit_distance(a, b, limit):
+    """Levenshtein distance of a and b, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class TermIndex:
+    """
+    Vocabulary of the words in all tag values, built from the tag_stats view.
+
+    - prefix completion: binary search over the sorted words
+    - fuzzy matching: a map from each word's one-character deletions back to
+      the word (symmetric delete), so typos are found without scanning
+    - suggestions: the full tag values each word occurs in, with photo counts
+    """
+
+    def __init__(self, value_counts):
+        self.counts = {}
+        self._values = {}
+        for item in value_counts:
+            tag, value = item['_id']['tag'], item['_id']['value']
+            if tag in DATE_TAGS or not isinstance(value, str) or item['count'] <= 0:
+                continue
+            for word in set(tokenize(value)):
+                self.counts[word] = self.counts.get(word, 0) + item['count']
+                self._values.setdefault(word, []).append((item['count'], tag, value))
+
+        self.words = sorted(self.counts)
+        self._deleted = {}
+        for word in self.words:
+            if len(word) >= FUZZY_MIN_LENGTH:
+                for variant in _deletes(word):
+                    self._deleted.setdefault(variant, []).append(word)
+
+    def complete(self, prefix, limit=MAX_EXPANSIONS):
+        """The most frequent words starting with prefix"""
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + '\U0010ffff', start)
+        return heapq.nlargest(limit, self.words[start:end], key=self.counts.get)
+
+    def fuzzy(self, word, limit=MAX_EXPANSIONS):
+        """The most frequent words within 1 edit (2 for long words) of word"""
+        if len(word) < FUZZY_MIN_LENGTH:
+            return []
+        max_distance = 1 if len(word) < 8 else 2
+
+        candidates = set(self._deleted.get(word, ()))
+        for variant in _deletes(word):
+            if variant in self.counts:
+                candidates.add(variant)
+            candidates.update(self._deleted.get(variant, ()))
+        candidates.discard(word)
+
+        matches = [c for c in candidates if _edit_distance(word, c, max_distance) <= max_distance]
+        return heapq.nlargest(limit, matches, key=self.counts.get)
+
+    def expand(self, word):
+        """
+        Vocabulary words a query word may stand for, by match kind.
+        Every word is listed under its best kind only.
+        """
+        exact = [word] if word in self.counts else []
+        prefix = [w for w in self.complete(word) if w != word]
+        seen = set(exact) | set(prefix)
+        fuzzy = [w for w in self.fuzzy(word) if w not in seen]
+        return {'exact': exact, 'prefix': prefix, 'fuzzy': fuzzy}
+
+    def suggest(self, text, limit=10):
+        """
+        Autocomplete: the most common tag values completing the last word of
+        text, preferring values that also contain the earlier words
+        """
+        words = tokenize(text)[:MAX_QUERY_TERMS]
+        if not words:
+            return []
+
+        *complete_words, last = words
+        seen = set()
+        suggestions = []
+        for word in self.complete(last):
+            for count, tag, value in self._values.get(word, ()):
+                if (tag, value) in seen:
+                    continue
+                seen.add((tag, value))
+                value_words = set(tokenize(value))
+                contains_all = all(w in value_words for w in complete_words)
+                suggestions.append((contains_all, count, tag, value))
+
+        return [
+            {'tag': tag, 'value': value, 'count': count}
+            for _, count, tag, value in heapq.nlargest(limit, suggestions)
+        ]
+
+def get_term_index():
+    """
+    Return the TermIndex. After the photos version changes it is rebuilt in
+    the background, at most once per INDEX_REFRESH_INTERVAL, and the
+    previous index is served meanwhile; responses built from it are not
+    cached under the new version.
+    """
+    app = current_app._get_current_object()
+
+    def build():
+        with app.app_context():
+            try:
+                value_counts = list(mongo.db[TAG_STATS_COLLECTION].find({'count': {'$gt': 0}}))
+                return run_cpu_bound(TermIndex, value_counts)
+            except Exception as e:
+                current_app.logger.error(f"Term index build error: {str(e)}")
+                raise
+
+    version = get_versions(('photos',))[0]
+    index, current = _index.get(version, build, current_app.config['INDEX_REFRESH_INTERVAL'])
+    if not current:
+        skip_response_cache()
+    return index
+
+def build_query_pipeline(expansions, limit, max_candidates, after=None):
+    """
+    Build the aggregation for a free-text query and its index hint.
+
+    expansions holds one expand() result per query word. A photo must match
+    every word (AND); its score sums the weight of each word's best match
+    kind, and ties go to the newest photo (photo ids are ObjectIds).
+
+    Only the max_candidates newest matches are scored. They are read in
+    index order, so the scan stops there and the cost of a page does not grow
+    with the number of matches. Pages continue after the (score, _id) of
+    the previous page's last photo (after) instead of skipping.
+    """
+    match = {'$and': [
+        {SEARCH_TERMS_FIELD: {'$in': [w for words in expansion.values() for w in words]}}
+        for expansion in expansions
+    ]}
+
+    scores = []
+    for expansion in expansions:
+        branches = [
+            {
+                'case': {'$gt': [{'$size': {'$setIntersection': [f'${SEARCH_TERMS_FIELD}', words]}}, 0]},
+                'then': MATCH_WEIGHTS[kind]
+            }
+            for kind, words in expansion.items()
+            if words
+        ]
+        scores.append({'$switch': {'branches': branches, 'default': 0}})
+
+    pipeline = [
+        {'$match': match},
+        {'$sort': {'created_at': -1, '_id': -1}},
+        {'$limit': max_candidates},
+        {'$addFields': {'_score': {'$add': scores}}}
+    ]
+    if after:
+        score, photo_id = after
+        pipeline.append({'$match': {'$or': [
+            {'_score': {'$lt': score}},
+            {'_score': score, '_id': {'$lt': photo_id}}
+        ]}})
+    # Mongo keeps only the top `limit` documents while sorting
+    pipeline.extend([
+        {'$sort': {'_score': -1, '_id': -1}},
+        {'$limit': limit}
+    ])
+    return pipeline, SEARCH_TERMS_INDEX
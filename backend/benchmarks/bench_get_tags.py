@@ -0,0 +1,63 @@
+"""
+Compare the get_tags serialization paths on a synthetic vocabulary:
+the Tag/TagValue object round trip against the raw-dict fast path.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_get_tags [value_count]
+"""
+import sys
+import time
+import tracemalloc
+from app.models.tag import Tag
+from app.utils.serialization import dumps
+
+def build_tags(value_count):
+    """A species list with parent_info hierarchies plus a few plain tags"""
+    families = [f'Family {i}' for i in range(50)]
+    species = {
+        'name': 'bird_name',
+        'values': [
+            {'value': f'Species {i}', 'parent_info': {'family': families[i % len(families)]}}
+            for i in range(value_count)
+        ]
+    }
+    family = {'name': 'family', 'values': [{'value': name} for name in families]}
+    legacy = {'name': 'city', 'values': [f'City {i}' for i in range(100)]}
+    return [species, family, legacy]
+
+def measure(label, serialize, tags, repeat):
+    serialize(tags)  # warm up
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        serialize(tags)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    tracemalloc.start()
+    serialize(tags)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{label:<12} {elapsed_ms:8.2f} ms/request   peak {peak / 1024:8.0f} KiB')
+    return elapsed_ms, peak
+
+def main():
+    value_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    tags = build_tags(value_count)
+    repeat = 20
+
+    def objects(docs):
+        return dumps([Tag.from_dict(tag).to_dict() for tag in docs])
+
+    def raw(docs):
+        return dumps([Tag.serialize(tag) for tag in docs])
+
+    assert objects(tags) == raw(tags)
+
+    print(f'get_tags serialization, {value_count} values')
+    old_ms, old_peak = measure('objects', objects, tags, repeat)
+    new_ms, new_peak = measure('raw dicts', raw, tags, repeat)
+    print(f'speedup {old_ms / new_ms:.1f}x, peak allocation {new_peak / old_peak:.0%} of before')
+
+if __name__ == '__main__':
+    main()
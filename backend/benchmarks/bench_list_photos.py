@@ -0,0 +1,106 @@
+"""
+Compare the GET /api/photos serialization paths on synthetic documents:
+the previous Photo round trip through jsonify (the standard library
+encoder) against the orjson stream of PHOTO_FIELDS (serialize_photo).
+The stream is consumed chunk by chunk, as the response sends it. Its body
+is larger since it also carries the EXIF fields and the variant URLs.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_list_photos [photo_count]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app.models.photo import Photo
+from app.routes.photo_routes import _stream_json_array
+from app.utils.search import build_search_tags, build_search_terms
+
+WIDTHS = (320, 640, 1024)
+
+def build_photos(photo_count):
+    """Documents as stored by uploads: tags, derived search fields, hashes, EXIF and variants"""
+    started = datetime(2020, 1, 1)
+    photos = []
+    for i in range(photo_count):
+        photo_id = str(ObjectId())
+        tags = {
+            'bird_name': f'Species {i % 800}',
+            'city': f'City {i % 200}',
+            'location': f'Wetland {i % 2000}',
+            'date_clicked': (started + timedelta(hours=i)).strftime('%Y-%m-%d %H:%M:%S'),
+            'date_uploaded': (started + timedelta(hours=i, minutes=5)).strftime('%Y-%m-%d %H:%M:%S')
+        }
+        photos.append({
+            '_id': photo_id,
+            'filename': f'IMG_{i:05d}.jpg',
+            'tags': tags,
+            'search_tags': build_search_tags(tags),
+            'search_terms': build_search_terms(tags),
+            'created_at': started + timedelta(hours=i, minutes=5),
+            'taken_at': started + timedelta(hours=i),
+            'location': {'type': 'Point', 'coordinates': [-122.4 + i % 100 / 1000, 37.7]},
+            'camera': {'make': 'Canon', 'model': 'EOS R5', 'lens': 'RF100-500mm'},
+            'content_hash': f'{i:064x}',
+            'dhash': f'{i:016x}',
+            'storage': {
+                'service': 'cloudinary',
+                'url': f'https://res.cloudinary.com/demo/image/upload/bird_gallery/{photo_id}.jpg',
+                'id': f'bird_gallery/{photo_id}',
+                'size': 2_400_000 + i,
+                'variants': [
+                    {
+                        'width': width,
+                        'format': 'webp',
+                        'key': f'{i:040x}{width}',
+                        'path': f'/api/photos/{photo_id}/image?w={width}&fmt=webp'
+                    }
+                    for width in WIDTHS
+                ]
+            }
+        })
+    return photos
+
+def measure(label, serialize, photos, repeat):
+    serialize(photos)  # warm up
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        serialize(photos)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    tracemalloc.start()
+    size = serialize(photos)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{label:<16} {elapsed_ms:8.2f} ms/request   peak {peak / 1024:8.0f} KiB   body {size / 1024:8.0f} KiB')
+    return elapsed_ms, peak
+
+def main():
+    photo_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    photos = build_photos(photo_count)
+    repeat = 5
+
+    app = Flask(__name__)
+    app.config['PUBLIC_BASE_URL'] = 'https://api.example.com'
+    provider = DefaultJSONProvider(app)
+
+    # Both return the body size in bytes
+    def jsonify_photos(docs):
+        return len(provider.response([Photo.from_dict(photo).to_dict() for photo in docs]).get_data())
+
+    def orjson_photos(docs):
+        return sum(len(chunk) for chunk in _stream_json_array(docs, False))
+
+    with app.test_request_context():
+        print(f'GET /api/photos serialization, {photo_count} photos')
+        old_ms, old_peak = measure('jsonify', jsonify_photos, photos, repeat)
+        new_ms, new_peak = measure('orjson fields', orjson_photos, photos, repeat)
+    print(f'speedup {old_ms / new_ms:.1f}x, peak allocation {new_peak / old_peak:.2%} of before')
+
+if __name__ == '__main__':
+    main()
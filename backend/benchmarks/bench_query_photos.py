@@ -0,0 +1,132 @@
+"""
+Measure /api/photos/query end to end against MongoDB: the term index lookup
+plus the ranked aggregation, on the first and on later pages, compared with
+the previous pipeline that scored every match and skipped to the page.
+
+Needs a running MongoDB; photos are written to a scratch database that is
+dropped afterwards (default mongodb://localhost:27017/bird_gallery_bench).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_query_photos [photo_count] [mongo_uri]
+"""
+import random
+import string
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import MongoClient
+from app.utils.search import SEARCH_TERMS_FIELD, SEARCH_TERMS_INDEX, tokenize
+from app.utils.term_index import TermIndex, build_query_pipeline
+
+TARGET_P95_MS = 20
+PAGE_SIZE = 50
+MAX_CANDIDATES = 1000
+
+def build_photos(photo_count):
+    """Synthetic photos: a bird, a city and a place out of Zipf-like vocabularies"""
+    random.seed(7)
+
+    def words(count):
+        return [''.join(random.choices(string.ascii_lowercase, k=random.randint(4, 10))) for _ in range(count)]
+
+    birds, cities, places = words(800), words(200), words(2000)
+    weights = [1 / (rank + 1) for rank in range(2000)]
+    started = datetime(2020, 1, 1)
+
+    photos = []
+    for i in range(photo_count):
+        tags = {
+            'bird_name': ' '.join(random.choices(birds, weights=weights[:len(birds)], k=2)),
+            'city': random.choices(cities, weights=weights[:len(cities)])[0],
+            'location': random.choices(places, weights=weights)[0]
+        }
+        photos.append({
+            '_id': str(ObjectId()),
+            'tags': tags,
+            SEARCH_TERMS_FIELD: sorted({token for value in tags.values() for token in tokenize(value)}),
+            'created_at': started + timedelta(minutes=i)
+        })
+    return photos
+
+def value_counts(photos):
+    """The tag_stats documents the term index is built from"""
+    counts = Counter((name, value) for photo in photos for name, value in photo['tags'].items())
+    return [{'_id': {'tag': tag, 'value': value}, 'count': count} for (tag, value), count in counts.items()]
+
+def skip_pipeline(pipeline, skip, limit):
+    """The previous pipeline: score every match, sort them all, then skip"""
+    match, _, _, add_fields = pipeline[:4]
+    return [
+        match,
+        add_fields,
+        {'$sort': {'_score': -1, 'created_at': -1, '_id': -1}},
+        {'$skip': skip},
+        {'$limit': limit}
+    ]
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+
+def main():
+    photo_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    uri = sys.argv[2] if len(sys.argv) > 2 else 'mongodb://localhost:27017/bird_gallery_bench'
+
+    client = MongoClient(uri)
+    db = client.get_default_database()
+    photos = build_photos(photo_count)
+    db.photos.drop()
+    db.photos.insert_many(photos, ordered=False)
+    db.photos.create_index(
+        [(SEARCH_TERMS_FIELD, 1), ('created_at', -1), ('_id', -1)],
+        name=SEARCH_TERMS_INDEX
+    )
+    index = TermIndex(value_counts(photos))
+
+    # Frequent words match tens of thousands of photos: the worst case for ranking
+    frequent = [word for word, _ in Counter(w for p in photos for w in p[SEARCH_TERMS_FIELD]).most_common(200)]
+    queries = []
+    for word in random.sample(frequent, 100):
+        typo = list(word)
+        typo[random.randrange(len(typo))] = random.choice(string.ascii_lowercase)
+        queries.extend([[word], [word[:3]], [''.join(typo)], [word, random.choice(frequent)]])
+
+    try:
+        timings = {'page 1': [], 'page 3': [], 'page 3 with $skip': []}
+        for words in queries:
+            start = time.perf_counter()
+            expansions = [index.expand(word) for word in words]
+            if not all(any(expansion.values()) for expansion in expansions):
+                continue
+            expand_ms = (time.perf_counter() - start) * 1000
+
+            after = None
+            for page in range(1, 4):
+                pipeline, hint = build_query_pipeline(expansions, PAGE_SIZE + 1, MAX_CANDIDATES, after)
+                start = time.perf_counter()
+                results = list(db.photos.aggregate(pipeline, hint=hint))
+                elapsed_ms = expand_ms + (time.perf_counter() - start) * 1000
+                if page in (1, 3):
+                    timings[f'page {page}'].append(elapsed_ms)
+                if len(results) <= PAGE_SIZE:
+                    break
+                last = results[PAGE_SIZE - 1]
+                after = (last['_score'], last['_id'])
+
+            pipeline, hint = build_query_pipeline(expansions, PAGE_SIZE + 1, MAX_CANDIDATES)
+            start = time.perf_counter()
+            list(db.photos.aggregate(skip_pipeline(pipeline, 2 * PAGE_SIZE, PAGE_SIZE + 1), hint=hint))
+            timings['page 3 with $skip'].append(expand_ms + (time.perf_counter() - start) * 1000)
+
+        print(f'/query over {photo_count} photos, {len(queries)} queries, target p95 < {TARGET_P95_MS} ms')
+        for label, values in timings.items():
+            if values:
+                p50, p95 = percentiles(values)
+                print(f'{label:<18} p50 {p50:7.2f} ms   p95 {p95:7.2f} ms')
+    finally:
+        client.drop_database(db.name)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Measure the in-process part of /api/photos/query: building the term index
+from tag_stats and expanding query words (exact, prefix and fuzzy).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_query_terms [value_count]
+"""
+import random
+import string
+import sys
+import time
+from app.utils.term_index import TermIndex
+
+def build_value_counts(value_count):
+    """Synthetic tag_stats documents: multi-word values over a large vocabulary"""
+    random.seed(7)
+    vocabulary = [
+        ''.join(random.choices(string.ascii_lowercase, k=random.randint(4, 11)))
+        for _ in range(value_count)
+    ]
+    return [
+        {
+            '_id': {'tag': random.choice(('bird_name', 'city', 'location')), 'value': ' '.join(random.sample(vocabulary, 2))},
+            'count': random.randint(1, 50)
+        }
+        for _ in range(value_count)
+    ], vocabulary
+
+def main():
+    value_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    value_counts, vocabulary = build_value_counts(value_count)
+
+    start = time.perf_counter()
+    index = TermIndex(value_counts)
+    print(f'built index of {len(index.words)} words in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+    queries = []
+    for word in random.sample(vocabulary, 1000):
+        typo = list(word)
+        typo[random.randrange(len(typo))] = random.choice(string.ascii_lowercase)
+        queries.extend([word, word[:3], ''.join(typo)])
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.expand(query)
+        index.suggest(query)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f'expand + suggest over {len(queries)} words: p50 {p50:.3f} ms, p95 {p95:.3f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+from app import create_app
+from app.utils.bootstrap import bootstrap
+
+def main():
+    app = create_app()
+    with app.app_context():
+        bootstrap()
+
+if __name__ == "__main__":
+    main()
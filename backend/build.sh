@@ -2,4 +2,4 @@
 # exit on error
 set -o errexit
 
-pip install -r requirements.txt 
\ No newline at end of file
+pip install -r "${REQUIREMENTS_FILE:-requirements.txt}" 
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+Cooperative entry point: every request runs as a greenlet on gevent's event
+loop, so MongoDB, Firebase and storage calls yield instead of blocking the
+worker, and one process can hold many slow uploads and image fetches.
+
+    gunicorn -k gevent --worker-connections 1000 gevent_run:app
+
+Requires the packages in requirements-async.txt.
+"""
+from gevent import monkey
+
+# Patch sockets, ssl and threading before anything else imports them
+monkey.patch_all()
+
+import os
+from app import create_app
+
+app = create_app()
+
+if __name__ == '__main__':
+    from gevent.pywsgi import WSGIServer
+    WSGIServer(('0.0.0.0', int(os.getenv('PORT', 5000))), app).serve_forever()
@@ -0,0 +1,11 @@
+from app import create_app
+from app.utils.tag_stats import rebuild_tag_stats
+
+def main():
+    app = create_app()
+    with app.app_context():
+        value_count = rebuild_tag_stats()
+        print(f"Rebuilt tag stats: {value_count} tag values")
+
+if __name__ == "__main__":
+    main()
@@ -4,4 +4,8 @@ app = create_app()
 app.debug = True
 
 if __name__ == '__main__':
+    # The dev server sets up indexes and default tags itself
+    from app.utils.bootstrap import bootstrap
+    with app.app_context():
+        bootstrap()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,19 @@
+import sys
+from app import create_app
+from app.services.user_service import UserService
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python set_user_role.py <email> <admin|viewer>")
+        sys.exit(1)
+    
+    email, role = sys.argv[1], sys.argv[2]
+    app = create_app()
+    with app.app_context():
+        if not UserService.set_role(email, role):
+            print(f"No user with email {email}; they are created on their first sign-in")
+            sys.exit(1)
+        print(f"{email} is now {role}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import json
+import os
+import time
+import pytest
+
+# Config reads these at import time
+os.environ.setdefault('FIREBASE_CONFIG', json.dumps({}))
+os.environ.setdefault('MONGO_URI', 'mongodb://localhost:27017/bird_gallery_test')
+
+import flask_pymongo
+import mongomock
+import app.middleware.auth as auth_middleware
+import app.utils.collection_version as collection_version
+import app.utils.image_hash as image_hash
+import app.services.image_service as image_service
+import app.utils.response_cache as response_cache
+import app.utils.term_index as term_index
+import app.utils.tag_index as tag_index
+from app import create_app, mongo
+from app.utils.lru_cache import RefreshingValue
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    """App backed by an in-memory MongoDB, with an active app context"""
+    monkeypatch.setattr(flask_pymongo, 'MongoClient', mongomock.MongoClient)
+    # create_app writes its log file to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    # Per-process caches must not leak between tests
+    monkeypatch.setattr(collection_version, '_versions', {})
+    monkeypatch.setattr(response_cache, '_response_cache', None)
+    monkeypatch.setattr(auth_middleware, '_token_cache', None)
+    monkeypatch.setattr(term_index, '_index', RefreshingValue('term-index'))
+    monkeypatch.setattr(tag_index, '_indexes', None)
+    monkeypatch.setattr(image_hash, '_index', RefreshingValue('similarity-index'))
+    # Derivatives are rendered into a per-test disk cache
+    monkeypatch.setattr(image_service, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(image_service, '_disk_usage', None)
+
+    application = create_app()
+    application.config.update(
+        TESTING=True,
+        UPLOAD_SPOOL_DIR=str(tmp_path / 'spool'),
+        LOCAL_STORAGE_DIR=str(tmp_path / 'storage')
+    )
+
+    with application.app_context():
+        yield application
+        mongo.cx.drop_database(mongo.db.name)
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def admin_headers(app, monkeypatch):
+    """Authorization headers of an admin, without calling Firebase"""
+    monkeypatch.setattr(auth_middleware, 'init_firebase', lambda app: None)
+    monkeypatch.setattr(
+        auth_middleware.auth, 'verify_id_token',
+        lambda token: {'email': 'admin@example.com', 'uid': 'admin', 'exp': time.time() + 3600}
+    )
+    mongo.db.users.insert_one({'email': 'admin@example.com', 'role': 'admin', 'user_id': 'admin'})
+    return {'Authorization': 'Bearer admin-token'}
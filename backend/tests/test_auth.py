@@ -0,0 +1,56 @@
+import mongomock
+from app import mongo
+import app.middleware.auth as auth_middleware
+import app.middleware.token_cache as token_cache
+from app.services.user_service import UserService
+
+def test_verified_tokens_are_cached(client, admin_headers, monkeypatch):
+    calls = []
+    verify = auth_middleware.auth.verify_id_token
+    monkeypatch.setattr(auth_middleware.auth, 'verify_id_token', lambda token: calls.append(token) or verify(token))
+
+    assert client.get('/api/auth/me', headers=admin_headers).status_code == 200
+    assert client.get('/api/auth/me', headers=admin_headers).status_code == 200
+    assert len(calls) == 1
+
+def test_role_change_applies_to_cached_tokens(client, admin_headers):
+    assert client.get('/api/auth/cache-stats', headers=admin_headers).status_code == 200
+
+    UserService.set_role('admin@example.com', 'viewer')
+
+    response = client.get('/api/auth/cache-stats', headers=admin_headers)
+    assert response.status_code == 403
+    assert client.get('/api/auth/me', headers=admin_headers).get_json()['isAdmin'] is False
+
+def test_users_are_cached_with_their_token(client, admin_headers, monkeypatch):
+    lookups = []
+    find_one = mongomock.collection.Collection.find_one
+
+    def counting_find_one(self, *args, **kwargs):
+        if self.name == 'users':
+            lookups.append(args)
+        return find_one(self, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'find_one', counting_find_one)
+
+    for _ in range(3):
+        assert client.get('/api/auth/me', headers=admin_headers).status_code == 200
+    assert len(lookups) == 1
+
+def test_direct_user_edits_apply_once_the_cached_user_expires(client, admin_headers, monkeypatch):
+    assert client.get('/api/auth/me', headers=admin_headers).get_json()['isAdmin'] is True
+
+    mongo.db.users.update_one({'email': 'admin@example.com'}, {'$set': {'role': 'viewer'}})
+    assert client.get('/api/auth/me', headers=admin_headers).get_json()['isAdmin'] is True
+
+    later = token_cache.time.monotonic() + client.application.config['AUTH_USER_CACHE_TTL']
+    monkeypatch.setattr(token_cache.time, 'monotonic', lambda: later)
+    assert client.get('/api/auth/me', headers=admin_headers).get_json()['isAdmin'] is False
+
+def test_unknown_users_are_created_as_viewers(client, admin_headers):
+    mongo.db.users.delete_many({})
+
+    response = client.get('/api/auth/me', headers=admin_headers)
+
+    assert response.get_json() == {'email': 'admin@example.com', 'role': 'viewer', 'isAdmin': False}
+    assert mongo.db.users.count_documents({'email': 'admin@example.com'}) == 1
@@ -0,0 +1,88 @@
+import os
+import mongomock
+import pytest
+from pymongo.errors import AutoReconnect
+from app import mongo
+from app.services.upload_service import UploadService
+from app.utils.bootstrap import create_content_hash_index
+from app.utils.image_hash import CONTENT_HASH_FIELD
+
+@pytest.fixture
+def items(tmp_path):
+    items = []
+    for name in ('first', 'second'):
+        path = tmp_path / f'{name}.jpg'
+        path.write_bytes(name.encode())
+        items.append({
+            'original_path': str(path),
+            'filename': f'{name}.jpg',
+            'tags': {'bird_name': name},
+            'photo_id': name,
+            'image_path': f'/api/photos/{name}/image'
+        })
+    return items
+
+@pytest.fixture
+def no_thumbnails(monkeypatch):
+    monkeypatch.setattr(
+        'app.services.image_service.ImageService.pregenerate_variants',
+        staticmethod(lambda original_path, source_url, variants: None)
+    )
+
+def store_batch(app, items):
+    with app.test_request_context():
+        return UploadService.store_batch(items, 'local', 2)
+
+def stored_files(app):
+    return [name for _, _, names in os.walk(app.config['LOCAL_STORAGE_DIR']) for name in names]
+
+def fail_photo_inserts(monkeypatch, save_first=False):
+    insert_many = mongomock.collection.Collection.insert_many
+
+    def failing_insert_many(self, documents, *args, **kwargs):
+        if self.name != 'photos':
+            return insert_many(self, documents, *args, **kwargs)
+        if save_first:
+            insert_many(self, documents[:1], *args, **kwargs)
+        raise AutoReconnect('connection reset')
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'insert_many', failing_insert_many)
+
+def test_insert_errors_fail_the_batch_and_delete_the_uploads(app, items, no_thumbnails, monkeypatch):
+    fail_photo_inserts(monkeypatch)
+
+    results = store_batch(app, items)
+
+    assert [result['status'] for result in results] == ['failed', 'failed']
+    assert stored_files(app) == []
+    assert mongo.db.photos.count_documents({}) == 0
+
+def test_photos_saved_before_an_insert_error_are_kept(app, items, no_thumbnails, monkeypatch):
+    fail_photo_inserts(monkeypatch, save_first=True)
+
+    results = store_batch(app, items)
+
+    assert [result['status'] for result in results] == ['created', 'failed']
+    assert len(stored_files(app)) == 1
+    assert mongo.db.photos.find_one({'_id': 'first'})
+
+def test_rejected_documents_delete_their_uploads(app, items, no_thumbnails):
+    mongo.db.photos.insert_one({'_id': 'second'})
+
+    results = store_batch(app, items)
+
+    assert [result['status'] for result in results] == ['created', 'failed']
+    assert len(stored_files(app)) == 1
+
+def test_images_saved_concurrently_are_reported_as_duplicates(app, items, no_thumbnails):
+    create_content_hash_index()
+    for item in items:
+        item['content_hash'] = item['photo_id']
+    # Saved by another upload after the batch was checked for duplicates
+    mongo.db.photos.insert_one({'_id': 'earlier', CONTENT_HASH_FIELD: 'second'})
+
+    results = store_batch(app, items)
+
+    assert [result['status'] for result in results] == ['created', 'duplicate']
+    assert results[1]['duplicate_of'] == 'earlier'
+    assert len(stored_files(app)) == 1
@@ -0,0 +1,76 @@
+import os
+import threading
+from datetime import datetime
+import pytest
+from app import mongo
+from app.services.upload_service import UploadService, DuplicatePhoto
+from app.utils.bootstrap import create_content_hash_index
+from app.utils.db_migrate import migrate_unique_content_hashes
+from app.utils.image_hash import CONTENT_HASH_FIELD, CONTENT_HASH_INDEX, DUPLICATE_OF_FIELD, file_sha256
+
+@pytest.fixture
+def no_thumbnails(monkeypatch):
+    monkeypatch.setattr(
+        'app.services.image_service.ImageService.pregenerate_variants',
+        staticmethod(lambda original_path, source_url, variants: None)
+    )
+
+def stored_files(app):
+    return [name for _, _, names in os.walk(app.config['LOCAL_STORAGE_DIR']) for name in names]
+
+def test_concurrent_uploads_of_the_same_image_store_one_photo(app, tmp_path, no_thumbnails, monkeypatch):
+    create_content_hash_index()
+    paths = []
+    for name in ('first', 'second'):
+        path = tmp_path / f'{name}.jpg'
+        path.write_bytes(b'same image')
+        paths.append(path)
+    content_hash = file_sha256(str(paths[0]))
+
+    # Both uploads pass the duplicate check before either is saved
+    arrived = threading.Barrier(2, timeout=5)
+
+    def perceptual_hash(original_path, filename):
+        arrived.wait()
+        return None
+
+    monkeypatch.setattr(UploadService, 'perceptual_hash', staticmethod(perceptual_hash))
+    outcomes = {}
+
+    def store(path, photo_id):
+        with app.app_context():
+            try:
+                outcomes[photo_id] = UploadService.store_photo(
+                    str(path), path.name, {}, 'local', photo_id, f'/api/photos/{photo_id}/image', content_hash
+                )
+            except DuplicatePhoto as e:
+                outcomes[photo_id] = e
+
+    threads = [threading.Thread(target=store, args=(path, path.stem)) for path in paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    rejected = [photo_id for photo_id, outcome in outcomes.items() if isinstance(outcome, DuplicatePhoto)]
+    assert len(rejected) == 1
+    saved = mongo.db.photos.find_one({CONTENT_HASH_FIELD: content_hash})
+    assert outcomes[rejected[0]].photo_id == saved['_id'] != rejected[0]
+    assert mongo.db.photos.count_documents({}) == 1
+    assert len(stored_files(app)) == 1
+
+def test_migration_keeps_the_hash_on_the_oldest_copy(app):
+    mongo.db.photos.insert_many([
+        {'_id': 'copy', CONTENT_HASH_FIELD: 'a', 'created_at': datetime(2024, 2, 1)},
+        {'_id': 'original', CONTENT_HASH_FIELD: 'a', 'created_at': datetime(2024, 1, 1)},
+        {'_id': 'other', CONTENT_HASH_FIELD: 'b', 'created_at': datetime(2024, 3, 1)}
+    ])
+
+    result = migrate_unique_content_hashes()
+
+    assert result == {'success_count': 1, 'error_count': 0}
+    copy = mongo.db.photos.find_one({'_id': 'copy'})
+    assert CONTENT_HASH_FIELD not in copy
+    assert copy[DUPLICATE_OF_FIELD] == 'original'
+    assert mongo.db.photos.find_one({'_id': 'original'})[CONTENT_HASH_FIELD] == 'a'
+    assert mongo.db.photos.index_information()[CONTENT_HASH_INDEX]['unique']
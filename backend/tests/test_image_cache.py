@@ -0,0 +1,75 @@
+import os
+from io import BytesIO
+import pytest
+from PIL import Image
+import app.services.image_service as image_service
+from app import mongo
+from app.services.image_service import ImageService
+
+@pytest.fixture
+def original(tmp_path):
+    path = tmp_path / 'original.jpg'
+    Image.new('RGB', (1200, 800), 'green').save(path, 'JPEG')
+    return str(path)
+
+def cache_file(name, size, mtime):
+    path = os.path.join(image_service.CACHE_DIR, name[:2], name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+@pytest.mark.parametrize('requested, served', [(1, 320), (320, 320), (321, 640), (1000, 1024), (100000, 1024)])
+def test_widths_are_snapped_to_the_thumbnail_widths(app, requested, served):
+    app.config['THUMBNAIL_WIDTHS'] = [1024, 320, 640]
+
+    assert ImageService.snap_width(requested) == served
+
+def test_image_endpoint_serves_only_thumbnail_widths(app, client, original, monkeypatch):
+    app.config['THUMBNAIL_WIDTHS'] = [320, 640]
+    mongo.db.photos.insert_one({
+        '_id': 'p1',
+        'storage': {'service': 'local', 'id': 'original.jpg', 'url': 'http://x/original.jpg'}
+    })
+    monkeypatch.setattr(
+        'app.services.local_storage_service.LocalStorageService.local_path',
+        staticmethod(lambda image_id: original)
+    )
+
+    response = client.get('/api/photos/p1/image?w=5000&fmt=jpeg')
+
+    assert response.status_code == 200
+    assert Image.open(BytesIO(response.data)).width == 640
+
+def test_prune_deletes_least_recently_used_files(app):
+    oldest = cache_file('aa1.webp', 400, 1000)
+    middle = cache_file('bb2.webp', 400, 2000)
+    newest = cache_file('cc3.webp', 400, 3000)
+
+    # Under 90% of 500 bytes, only the newest file fits
+    assert ImageService.prune_disk_cache(500) == 2
+
+    assert not os.path.exists(oldest)
+    assert not os.path.exists(middle)
+    assert os.path.exists(newest)
+    assert image_service._disk_usage == 400
+
+def test_cache_hits_count_as_recent_use(app, original):
+    path, _ = ImageService.get_derivative('http://x/original.jpg', 320, 'jpeg', original)
+    os.utime(path, (1000, 1000))
+
+    ImageService.get_derivative('http://x/original.jpg', 320, 'jpeg', original)
+
+    assert os.path.getmtime(path) > 1000
+
+def test_renders_past_the_cap_start_a_prune(app, original):
+    old = cache_file('aa1.webp', 4000, 1000)
+    app.config['IMAGE_DISK_CACHE_BYTES'] = 4000
+
+    path, _ = ImageService.get_derivative('http://x/original.jpg', 320, 'jpeg', original)
+    # Prunes run on the thumbnail pool; an empty task queued after it waits for it
+    image_service._get_thumbnail_executor().submit(lambda: None).result(5)
+
+    assert not os.path.exists(old)
+    assert os.path.exists(path)
@@ -0,0 +1,82 @@
+import threading
+import time
+import pytest
+from app.utils.lru_cache import LRUCache, SingleFlight
+
+class Interrupted(BaseException):
+    """Stands in for gevent's Timeout and GreenletExit"""
+
+def run_with_waiter(flight, error):
+    """Let a second caller join the flight, then fail the leader with error"""
+    outcome = {}
+
+    def wait():
+        try:
+            outcome['result'] = flight.do('key', lambda: 'not the leader')
+        except BaseException as e:
+            outcome['error'] = e
+
+    waiter = threading.Thread(target=wait)
+
+    def lead():
+        waiter.start()
+        # Give the waiter time to join the running call
+        time.sleep(0.2)
+        raise error
+
+    with pytest.raises(type(error)):
+        flight.do('key', lead)
+    waiter.join(5)
+    return outcome
+
+def test_waiters_share_the_leaders_exception():
+    error = ValueError('download failed')
+
+    outcome = run_with_waiter(SingleFlight(), error)
+
+    assert outcome['error'] is error
+
+def test_waiters_of_an_interrupted_leader_get_an_error():
+    flight = SingleFlight()
+    error = Interrupted()
+
+    outcome = run_with_waiter(flight, error)
+
+    assert isinstance(outcome['error'], RuntimeError)
+    assert outcome['error'].__cause__ is error
+    # The key is released for later calls
+    assert flight.do('key', lambda: 'done') == 'done'
+
+def test_waiters_share_the_leaders_result():
+    flight = SingleFlight()
+    results = []
+    release = threading.Event()
+
+    def lead():
+        release.wait(5)
+        return 'value'
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', lead))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['value'] * 4
+
+def test_expired_entries_found_while_loading_are_reloaded():
+    cache = LRUCache(max_bytes=1024)
+    cache.set('key', b'old', ttl=-1)
+    # Simulate an entry that expired between the lookup and the load
+    cache.get = lambda key, default=None: default
+
+    assert cache.get_or_load('key', lambda: b'new') == b'new'
+    assert cache.load_count == 1
+
+def test_fresh_entries_found_while_loading_are_reused():
+    cache = LRUCache(max_bytes=1024)
+    cache.set('key', b'cached', ttl=60)
+    cache.get = lambda key, default=None: default
+
+    assert cache.get_or_load('key', lambda: pytest.fail('loaded again')) == b'cached'
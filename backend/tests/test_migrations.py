@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+import pytest
+from pymongo import UpdateOne
+from app import mongo
+import app.utils.db_migrate as db_migrate
+from app.utils.image_hash import CONTENT_HASH_FIELD
+
+HASH_VERSION = 7
+
+@pytest.fixture
+def pending_hash_migration(app):
+    # Every migration but the image hash backfill is already applied
+    mongo.db.schema_migrations.insert_many([
+        {'_id': version, 'status': 'applied'}
+        for version, _ in db_migrate.MIGRATIONS
+        if version != HASH_VERSION
+    ])
+    mongo.db.photos.insert_many([{'_id': f'p{i:02d}', 'storage': {}} for i in range(10)])
+    # One worker, so batches are four photos long
+    app.config['MIGRATION_CONCURRENCY'] = 1
+
+def hash_with(monkeypatch, failing=(), crash_on=None):
+    def hash_photo(photo):
+        if photo['_id'] == crash_on:
+            raise RuntimeError('worker killed')
+        if photo['_id'] in failing:
+            return None
+        return UpdateOne({'_id': photo['_id']}, {'$set': {CONTENT_HASH_FIELD: photo['_id']}})
+
+    monkeypatch.setattr(db_migrate, '_hash_photo', hash_photo)
+
+def hash_record():
+    return mongo.db.schema_migrations.find_one({'_id': HASH_VERSION})
+
+def test_resume_retries_failures_from_before_the_crash(pending_hash_migration, monkeypatch):
+    hash_with(monkeypatch, failing={'p01'}, crash_on='p06')
+    with pytest.raises(RuntimeError):
+        db_migrate.run_migrations()
+    assert hash_record()['checkpoint'] == 'p03'
+    assert hash_record()['failed_ids'] == ['p01']
+
+    # p01 still fails after the resume, so the migration must stay pending
+    hash_with(monkeypatch, failing={'p01'})
+    db_migrate.run_migrations()
+    assert hash_record()['status'] == 'failed'
+    assert mongo.db.photos.count_documents({CONTENT_HASH_FIELD: {'$exists': False}}) == 1
+
+    hash_with(monkeypatch)
+    db_migrate.run_migrations()
+    assert hash_record()['status'] == 'applied'
+    assert 'failed_ids' not in hash_record()
+    assert mongo.db.photos.count_documents({CONTENT_HASH_FIELD: {'$exists': False}}) == 0
+
+def test_retried_photos_that_succeed_are_no_longer_failed(pending_hash_migration, monkeypatch):
+    hash_with(monkeypatch, failing={'p01'}, crash_on='p06')
+    with pytest.raises(RuntimeError):
+        db_migrate.run_migrations()
+
+    hash_with(monkeypatch)
+    db_migrate.run_migrations()
+
+    assert hash_record()['status'] == 'applied'
+    assert mongo.db.photos.count_documents({CONTENT_HASH_FIELD: {'$exists': False}}) == 0
+
+@pytest.fixture
+def recorded_migrations(app, monkeypatch):
+    """Two migrations that only record that they ran"""
+    ran = []
+
+    def first(context=None):
+        ran.append(1)
+
+    def second(context=None):
+        ran.append(2)
+
+    monkeypatch.setattr(db_migrate, 'MIGRATIONS', [(1, first), (2, second)])
+    return ran
+
+def test_migrations_claimed_by_another_run_are_not_applied(recorded_migrations):
+    mongo.db.schema_migrations.insert_one({
+        '_id': 1, 'status': 'running', 'owner': 'other-deploy',
+        'claimed_until': datetime.utcnow() + timedelta(minutes=5)
+    })
+
+    db_migrate.run_migrations()
+
+    # Later migrations depend on the claimed one, so they wait too
+    assert recorded_migrations == []
+    assert mongo.db.schema_migrations.find_one({'_id': 1})['owner'] == 'other-deploy'
+    assert mongo.db.schema_migrations.find_one({'_id': 2}) is None
+
+def test_expired_claims_are_taken_over(recorded_migrations):
+    mongo.db.schema_migrations.insert_one({
+        '_id': 1, 'status': 'running', 'owner': 'crashed-deploy', 'checkpoint': 'p03',
+        'claimed_until': datetime.utcnow() - timedelta(minutes=5)
+    })
+
+    db_migrate.run_migrations()
+
+    assert recorded_migrations == [1, 2]
+    assert [record['status'] for record in mongo.db.schema_migrations.find()] == ['applied', 'applied']
+
+def test_storage_migration_uploads_a_named_file(app, tmp_path, monkeypatch):
+    uploads = []
+
+    class Target:
+        @staticmethod
+        def upload_image(file_data):
+            uploads.append((file_data.filename, file_data.read()))
+            return {'url': 'https://cdn.example.com/bird.jpg', 'id': 'bird', 'size': 5}
+
+    original = tmp_path / 'ab12.jpg'
+    original.write_bytes(b'image')
+
+    class Source:
+        @staticmethod
+        def local_path(image_id):
+            return str(original)
+
+    monkeypatch.setattr(db_migrate, 'get_backend', lambda name: Source if name == 'local' else Target)
+    photo = {'_id': 'p1', 'filename': 'bird.jpg', 'storage': {'service': 'local', 'url': '/api/photos/files/ab12.jpg', 'id': 'ab12.jpg'}}
+
+    assert db_migrate._migrate_photo_storage(photo, 'local', 'fivemerr')
+    assert uploads == [('bird.jpg', b'image')]
@@ -0,0 +1,80 @@
+import re
+import pytest
+from datetime import datetime
+from app.utils.search import build_search_conditions, summarize_plan
+
+def test_values_of_a_tag_are_ored():
+    conditions = build_search_conditions({'filters': {'bird_name': ['Sparrow', '  Bald   EAGLE ']}})
+
+    assert conditions == [{'search_tags.bird_name': {'$in': ['sparrow', 'bald eagle']}}]
+
+def test_a_single_string_value_is_accepted():
+    conditions = build_search_conditions({'filters': {'city': 'New York'}})
+
+    assert conditions == [{'search_tags.city': {'$in': ['new york']}}]
+
+def test_blank_values_are_skipped():
+    assert build_search_conditions({'filters': {'city': ['', '  '], 'motion': []}}) == []
+
+def test_prefix_values_are_anchored_and_escaped():
+    conditions = build_search_conditions({'filters': {'bird_name': ['Red (ve']}, 'match': 'prefix'})
+
+    [pattern] = conditions[0]['search_tags.bird_name']['$in']
+    assert pattern.pattern == '^' + re.escape('red (ve')
+
+@pytest.mark.parametrize('values', [5, 1.5, True, {'name': 'Eagle'}, None, ['Eagle', 5], [['Eagle']]])
+def test_non_string_values_are_rejected(values):
+    with pytest.raises(ValueError):
+        build_search_conditions({'filters': {'bird_name': values}})
+
+@pytest.mark.parametrize('criteria', [
+    {'filters': {'bird name': ['Eagle']}},
+    {'filters': {'$where': ['1']}},
+    {'match': 'regex'},
+    {'date_ranges': {'date_clicked': '2024-01-01'}},
+    {'date_ranges': {'date_clicked': {'start': '01/01/2024'}}}
+])
+def test_invalid_criteria_are_rejected(criteria):
+    with pytest.raises(ValueError):
+        build_search_conditions(criteria)
+
+def test_date_clicked_ranges_use_taken_at_with_an_exclusive_end():
+    conditions = build_search_conditions({
+        'date_ranges': {'date_clicked': {'start': '2024-01-01', 'end': '2024-01-31T18:30'}}
+    })
+
+    assert conditions == [{'taken_at': {
+        '$gte': datetime(2024, 1, 1),
+        '$lt': datetime(2024, 1, 31, 18, 31)
+    }}]
+
+def test_other_date_ranges_compare_raw_tags():
+    conditions = build_search_conditions({'date_ranges': {'date_uploaded': {'end': '2024-12-31'}}})
+
+    assert conditions == [{'tags.date_uploaded': {'$lte': '2024-12-31'}}]
+
+def test_search_with_a_scalar_value_is_a_bad_request(client):
+    response = client.post('/api/photos/search', json={'filters': {'bird_name': 5}})
+
+    assert response.status_code == 400
+
+def test_plan_summary_lists_stages_and_indexes():
+    explain = {'stages': [
+        {'$cursor': {'queryPlanner': {'winningPlan': {
+            'stage': 'FETCH',
+            'inputStage': {'stage': 'IXSCAN', 'indexName': 'search_tags_wildcard'}
+        }}}},
+        {'$sort': {'sortKey': {'created_at': -1}}}
+    ]}
+
+    assert summarize_plan(explain) == {'stages': ['FETCH', 'IXSCAN'], 'indexes': ['search_tags_wildcard']}
+
+def test_explain_requires_an_admin(client):
+    response = client.post('/api/photos/search/explain', json={'filters': {'bird_name': ['Eagle']}})
+
+    assert response.status_code == 401
+
+def test_explain_rejects_invalid_criteria(client, admin_headers):
+    response = client.post('/api/photos/search/explain', json={'filters': {'bird_name': 5}}, headers=admin_headers)
+
+    assert response.status_code == 400
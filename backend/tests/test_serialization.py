@@ -0,0 +1,29 @@
+import json
+from datetime import datetime
+from bson import ObjectId
+from app.utils.serialization import dumps, serialize_photo
+from app.utils.tag_stats import apply_tag_stats_delta
+from app import mongo
+
+def test_non_string_keys_match_the_standard_library():
+    data = {5: 'int', 1.5: 'float', True: 'bool', 'name': 'str'}
+    assert json.loads(dumps(data)) == json.loads(json.dumps(data))
+
+def test_provider_handles_datetimes_and_object_ids(app):
+    photo_id = ObjectId()
+    body = app.json.dumps({'_id': photo_id, 'created_at': datetime(2024, 2, 20, 7, 41, 9)})
+    assert json.loads(body) == {'_id': str(photo_id), 'created_at': 'Tue, 20 Feb 2024 07:41:09 GMT'}
+
+def test_serialize_photo_drops_internal_fields():
+    document = {'_id': 'p1', 'filename': 'a.jpg', 'tags': {}, 'search_tags': {}, 'dhash': '00'}
+    assert serialize_photo(document) == {'_id': 'p1', 'filename': 'a.jpg', 'tags': {}}
+
+def test_stats_with_numeric_tag_values(client):
+    mongo.db.tags.insert_one({'name': 'count', 'display_name': 'Count', 'values': []})
+    mongo.db.photos.insert_one({'_id': 'p1', 'tags': {'count': 5}})
+    apply_tag_stats_delta(new_tags={'count': 5})
+
+    response = client.get('/api/photos/stats')
+
+    assert response.status_code == 200
+    assert response.get_json() == {'count': {'5': 1}}
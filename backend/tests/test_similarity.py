@@ -0,0 +1,43 @@
+import app.utils.image_hash as image_hash
+from app import mongo
+from app.utils.collection_version import bump_version
+
+def add_photo(photo_id, dhash):
+    mongo.db.photos.insert_one({'_id': photo_id, 'filename': f'{photo_id}.jpg', 'dhash': dhash})
+    bump_version('photos')
+
+def similar_ids(client, photo_id):
+    response = client.get(f'/api/photos/{photo_id}/similar?distance=4')
+    assert response.status_code == 200
+    return [photo['_id'] for photo in response.get_json()], response
+
+def test_bk_tree_finds_hashes_within_the_distance():
+    tree = image_hash._build_tree([('ff00ff00ff00ff00', 'a'), ('ff00ff00ff00ff01', 'b'), ('00ff00ff00ff00ff', 'c')])
+
+    assert sorted(tree.search(int('ff00ff00ff00ff00', 16), 2)) == [(0, 'a'), (1, 'b')]
+
+def test_new_photos_are_added_by_a_background_rebuild(client, app):
+    app.config['INDEX_REFRESH_INTERVAL'] = 0
+    add_photo('a', 'ff00ff00ff00ff00')
+    assert similar_ids(client, 'a')[0] == []
+
+    add_photo('b', 'ff00ff00ff00ff01')
+    # The previous tree answers while the new one is built
+    ids, response = similar_ids(client, 'a')
+    assert ids == []
+    assert 'ETag' not in response.headers
+
+    image_hash._index.refresh_thread.join(5)
+    ids, response = similar_ids(client, 'a')
+    assert ids == ['b']
+    assert response.headers.get('ETag')
+
+def test_rebuilds_wait_for_the_refresh_interval(client, app):
+    app.config['INDEX_REFRESH_INTERVAL'] = 3600
+    add_photo('a', 'ff00ff00ff00ff00')
+    similar_ids(client, 'a')
+
+    add_photo('b', 'ff00ff00ff00ff01')
+
+    assert similar_ids(client, 'a')[0] == []
+    assert image_hash._index.refresh_thread is None
@@ -0,0 +1,48 @@
+from io import BytesIO
+import pytest
+from werkzeug.datastructures import FileStorage
+from app import mongo
+from app.services.image_service import ImageService
+from app.services.storage_backend import StorageBackend, register_backend, get_backend
+from app.utils.db_migrate import migrate_local_storage_paths
+
+def test_backends_missing_a_method_are_rejected():
+    class UploadOnly(StorageBackend):
+        name = 'upload-only'
+
+        @staticmethod
+        def upload_image(file_data):
+            return {'url': 'https://cdn.example.com/a.jpg', 'id': 'a', 'size': 1}
+
+    with pytest.raises(TypeError, match='delete_image'):
+        register_backend(UploadOnly)
+    with pytest.raises(ValueError):
+        get_backend('upload-only')
+
+def test_local_images_store_a_path_and_are_served_with_a_url(client, app):
+    app.config['PUBLIC_BASE_URL'] = 'https://api.example.com'
+    upload = get_backend('local').upload_image(FileStorage(stream=BytesIO(b'image'), filename='bird.jpg'))
+    assert upload['url'] == f"/api/photos/files/{upload['id']}"
+    mongo.db.photos.insert_one({'_id': 'p1', 'filename': 'bird.jpg', 'storage': dict(upload, service='local')})
+
+    photos = client.get('/api/photos/').get_json()
+
+    assert photos[0]['storage']['url'] == f"https://api.example.com/api/photos/files/{upload['id']}"
+    assert client.get(photos[0]['storage']['url']).data == b'image'
+
+def test_migration_replaces_local_urls_with_paths(app):
+    old_url = 'http://localhost:5000/api/photos/files/ab12.jpg'
+    mongo.db.photos.insert_many([
+        {'_id': 'p1', 'storage': {
+            'service': 'local', 'url': old_url, 'id': 'ab12.jpg',
+            'variants': [{'width': 320, 'format': 'webp', 'key': ImageService.derivative_key(old_url, 320, 'webp')}]
+        }},
+        {'_id': 'p2', 'storage': {'service': 'cloudinary', 'url': 'https://cdn.example.com/b.jpg', 'id': 'b'}}
+    ])
+
+    migrate_local_storage_paths()
+
+    storage = mongo.db.photos.find_one({'_id': 'p1'})['storage']
+    assert storage['url'] == '/api/photos/files/ab12.jpg'
+    assert storage['variants'][0]['key'] == ImageService.derivative_key('/api/photos/files/ab12.jpg', 320, 'webp')
+    assert mongo.db.photos.find_one({'_id': 'p2'})['storage']['url'] == 'https://cdn.example.com/b.jpg'
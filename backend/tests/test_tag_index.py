@@ -0,0 +1,40 @@
+import app.utils.tag_index as tag_index
+from app import mongo
+from app.utils.collection_version import bump_version
+from app.utils.tag_index import get_tag_index
+
+def add_tag(name, values):
+    mongo.db.tags.insert_one({'name': name, 'values': values})
+    bump_version('tags')
+
+def test_missing_tags_are_not_cached(client):
+    for i in range(20):
+        response = client.post(f'/api/tags/missing{i}/values/filtered', json={'parent_filters': {}})
+        assert response.status_code == 404
+
+    assert len(tag_index._get_index_cache()) == 0
+
+def test_cache_is_bounded(app):
+    app.config['TAG_INDEX_CACHE_SIZE'] = 2
+    for name in ('city', 'state', 'country'):
+        add_tag(name, [{'value': f'{name} 1'}])
+    for name in ('city', 'state', 'country'):
+        assert get_tag_index(name).contains(f'{name} 1')
+
+    assert len(tag_index._get_index_cache()) == 2
+
+def test_indexes_follow_tag_writes(app):
+    add_tag('city', [{'value': 'Pune', 'parent_info': {'state': 'Maharashtra'}}])
+    assert get_tag_index('city').children({'state': 'Maharashtra'}) == ['Pune']
+
+    mongo.db.tags.update_one({'name': 'city'}, {'$push': {'values': {'value': 'Nagpur', 'parent_info': {'state': 'Maharashtra'}}}})
+    bump_version('tags')
+
+    assert get_tag_index('city').children({'state': 'Maharashtra'}) == ['Pune', 'Nagpur']
+
+def test_tags_created_after_a_miss_are_found(app):
+    assert get_tag_index('city') is None
+
+    add_tag('city', [{'value': 'Pune'}])
+
+    assert get_tag_index('city').contains('Pune')
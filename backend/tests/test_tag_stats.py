@@ -0,0 +1,22 @@
+from app import mongo
+from app.utils.collection_version import VERSIONS_COLLECTION
+from app.utils.tag_stats import TAG_STATS_COLLECTION, rebuild_tag_stats
+
+def photos_version():
+    return (mongo.db[VERSIONS_COLLECTION].find_one({'_id': 'photos'}) or {}).get('version', 0)
+
+def test_rebuild_bumps_the_photos_version(app):
+    mongo.db.photos.insert_one({'_id': 'p1', 'tags': {'bird_name': 'Eagle'}})
+    before = photos_version()
+
+    assert rebuild_tag_stats() == 1
+
+    assert photos_version() == before + 1
+    assert mongo.db[TAG_STATS_COLLECTION].find_one()['count'] == 1
+
+def test_rebuild_of_an_empty_gallery_bumps_the_photos_version(app):
+    before = photos_version()
+
+    assert rebuild_tag_stats() == 0
+
+    assert photos_version() == before + 1
@@ -0,0 +1,99 @@
+import threading
+import pytest
+from app.utils.collection_version import bump_version
+from app.utils.lru_cache import RefreshingValue
+from app.utils.pagination import decode_score_cursor, encode_score_cursor
+from app.utils.term_index import TermIndex, build_query_pipeline
+
+def test_first_get_builds_inline():
+    value = RefreshingValue('test')
+
+    assert value.get(1, lambda: 'v1') == ('v1', True)
+    assert value.refresh_thread is None
+
+def test_new_versions_are_built_in_the_background():
+    value = RefreshingValue('test')
+    value.get(1, lambda: 'v1')
+    release = threading.Event()
+
+    def slow_build():
+        release.wait(5)
+        return 'v2'
+
+    # The previous value is served while the rebuild runs
+    assert value.get(2, slow_build) == ('v1', False)
+    assert value.get(2, slow_build) == ('v1', False)
+    release.set()
+    value.refresh_thread.join(5)
+
+    assert value.get(2, lambda: pytest.fail('rebuilt twice')) == ('v2', True)
+
+def test_rebuilds_wait_for_the_interval():
+    value = RefreshingValue('test')
+    value.get(1, lambda: 'v1')
+
+    assert value.get(2, lambda: 'v2', min_interval=60) == ('v1', False)
+    assert value.refresh_thread is None
+
+def test_failed_rebuilds_keep_the_previous_value():
+    value = RefreshingValue('test')
+    value.get(1, lambda: 'v1')
+
+    def failing_build():
+        raise RuntimeError('database unavailable')
+
+    value.get(2, failing_build)
+    value.refresh_thread.join(5)
+
+    assert value.get(2, lambda: 'v2', min_interval=60) == ('v1', False)
+
+def expansions():
+    index = TermIndex([
+        {'_id': {'tag': 'bird_name', 'value': 'Black Kite'}, 'count': 3},
+        {'_id': {'tag': 'city', 'value': 'Pune'}, 'count': 2}
+    ])
+    return [index.expand('kite'), index.expand('pun')]
+
+def test_candidates_are_bounded_before_scoring():
+    pipeline, hint = build_query_pipeline(expansions(), 51, 1000)
+
+    stages = [next(iter(stage)) for stage in pipeline]
+    assert stages == ['$match', '$sort', '$limit', '$addFields', '$sort', '$limit']
+    assert pipeline[1]['$sort'] == {'created_at': -1, '_id': -1}
+    assert pipeline[2]['$limit'] == 1000
+    assert pipeline[-1]['$limit'] == 51
+    assert hint == 'search_terms_1_created_at_-1__id_-1'
+
+def test_later_pages_continue_after_the_cursor():
+    pipeline, _ = build_query_pipeline(expansions(), 51, 1000, after=(5, 'p9'))
+
+    assert {'$skip'}.isdisjoint(key for stage in pipeline for key in stage)
+    assert pipeline[4] == {'$match': {'$or': [
+        {'_score': {'$lt': 5}},
+        {'_score': 5, '_id': {'$lt': 'p9'}}
+    ]}}
+
+def test_score_cursors_round_trip():
+    cursor = encode_score_cursor({'_score': 5, '_id': 'p9', 'created_at': None})
+
+    assert decode_score_cursor(cursor) == (5, 'p9')
+
+@pytest.mark.parametrize('cursor', ['nonsense', encode_score_cursor({'_score': '5', '_id': 'p9'})])
+def test_invalid_score_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_score_cursor(cursor)
+
+def test_query_with_an_invalid_cursor_is_a_bad_request(client):
+    response = client.get('/api/photos/query?q=kite&cursor=nonsense')
+
+    assert response.status_code == 400
+
+def test_responses_from_a_stale_index_are_not_cached(client, app):
+    app.config['INDEX_REFRESH_INTERVAL'] = 3600
+    assert client.get('/api/photos/query/suggest?q=ki').headers.get('ETag')
+
+    bump_version('photos')
+    response = client.get('/api/photos/query/suggest?q=ki')
+
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
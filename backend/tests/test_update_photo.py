@@ -0,0 +1,24 @@
+import pytest
+from app import mongo
+
+@pytest.fixture
+def photo(app):
+    mongo.db.photos.insert_one({'_id': 'p1', 'filename': 'bird.jpg', 'tags': {'bird_name': 'Robin'}})
+
+@pytest.mark.parametrize('body', [['bird_name', 'Wren'], 'Wren', 5])
+def test_non_object_bodies_are_rejected(client, admin_headers, photo, body):
+    response = client.put('/api/photos/p1', json=body, headers=admin_headers)
+
+    assert response.status_code == 400
+    assert mongo.db.photos.find_one({'_id': 'p1'})['tags'] == {'bird_name': 'Robin'}
+
+def test_invalid_json_is_rejected(client, admin_headers, photo):
+    response = client.put('/api/photos/p1', data='{', content_type='application/json', headers=admin_headers)
+
+    assert response.status_code == 400
+
+def test_tags_are_replaced(client, admin_headers, photo):
+    response = client.put('/api/photos/p1', json={'bird_name': 'Wren'}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert mongo.db.photos.find_one({'_id': 'p1'})['tags'] == {'bird_name': 'Wren'}
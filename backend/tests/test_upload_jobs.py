@@ -0,0 +1,145 @@
+import os
+import threading
+import pytest
+import mongomock
+from pymongo.errors import AutoReconnect
+import app.services.upload_service as upload_service
+from app import mongo
+from app.services.upload_service import UploadService, UploadQueueFull
+
+@pytest.fixture
+def spooled(tmp_path):
+    path = tmp_path / 'upload.jpg'
+    path.write_bytes(b'image')
+    return path
+
+@pytest.fixture
+def one_slot(app, monkeypatch):
+    """An upload pool with a single slot, created fresh for the test"""
+    monkeypatch.setattr(upload_service, '_upload_executor', None)
+    monkeypatch.setattr(upload_service, '_upload_slots', None)
+    app.config.update(UPLOAD_WORKERS=1, UPLOAD_QUEUE_SIZE=0)
+    executor, slots = upload_service._get_upload_executor()
+    yield executor, slots
+    executor.shutdown(wait=True)
+
+def submit(path):
+    return UploadService.submit_job(str(path), 'upload.jpg', {}, 'local', 'photo-1', 'http://x/image')
+
+def assert_slot_free(slots):
+    assert slots.acquire(blocking=False)
+    slots.release()
+
+def test_failed_job_insert_frees_the_slot(one_slot, spooled, monkeypatch):
+    _, slots = one_slot
+    insert_one = mongomock.collection.Collection.insert_one
+
+    def failing_insert(self, document, *args, **kwargs):
+        if self.name == 'upload_jobs':
+            raise RuntimeError('database unavailable')
+        return insert_one(self, document, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'insert_one', failing_insert)
+
+    with pytest.raises(RuntimeError):
+        submit(spooled)
+
+    assert_slot_free(slots)
+    assert not spooled.exists()
+
+def test_failed_submit_frees_the_slot(one_slot, spooled, monkeypatch):
+    executor, slots = one_slot
+
+    def failing_submit(fn):
+        raise RuntimeError('cannot schedule new futures after shutdown')
+
+    monkeypatch.setattr(executor, 'submit', failing_submit)
+
+    with pytest.raises(RuntimeError):
+        submit(spooled)
+
+    assert_slot_free(slots)
+    assert not spooled.exists()
+
+def test_full_queue_keeps_the_spooled_file(one_slot, spooled):
+    _, slots = one_slot
+    assert slots.acquire(blocking=False)
+
+    with pytest.raises(UploadQueueFull):
+        submit(spooled)
+
+    assert spooled.exists()
+    slots.release()
+
+def test_failed_status_update_removes_the_spooled_file(app, spooled, monkeypatch):
+    update_job = UploadService._update_job
+    stored = []
+
+    def failing_update(job_id, **fields):
+        if fields['status'] == 'processing':
+            raise RuntimeError('database unavailable')
+        update_job(job_id, **fields)
+
+    monkeypatch.setattr(UploadService, '_update_job', staticmethod(failing_update))
+    monkeypatch.setattr(UploadService, 'store_photo', staticmethod(lambda *args: stored.append(args)))
+    mongo.db.upload_jobs.insert_one({'_id': 'job-1', 'status': 'queued'})
+
+    UploadService._run_job('job-1', str(spooled), 'upload.jpg', {}, 'local', 'photo-1', 'http://x/image')
+
+    assert not stored
+    assert not spooled.exists()
+    assert mongo.db.upload_jobs.find_one({'_id': 'job-1'})['status'] == 'failed'
+
+def test_finished_jobs_free_their_slot(one_slot, spooled, monkeypatch):
+    executor, slots = one_slot
+    done = threading.Event()
+    monkeypatch.setattr(UploadService, '_run_job', staticmethod(lambda *args: done.set()))
+
+    submit(spooled)
+    executor.shutdown(wait=True)
+
+    assert done.is_set()
+    assert_slot_free(slots)
+
+def fail_photo_insert(monkeypatch, save_first=False):
+    insert_one = mongomock.collection.Collection.insert_one
+
+    def failing_insert_one(self, document, *args, **kwargs):
+        if self.name != 'photos':
+            return insert_one(self, document, *args, **kwargs)
+        if save_first:
+            insert_one(self, document, *args, **kwargs)
+        raise AutoReconnect('connection reset')
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'insert_one', failing_insert_one)
+
+def run_job(app, spooled, monkeypatch):
+    monkeypatch.setattr(
+        'app.services.image_service.ImageService.pregenerate_variants',
+        staticmethod(lambda original_path, source_url, variants: None)
+    )
+    mongo.db.upload_jobs.insert_one({'_id': 'job-1', 'status': 'queued'})
+    UploadService._run_job('job-1', str(spooled), 'upload.jpg', {}, 'local', 'photo-1', '/api/photos/photo-1/image')
+    return mongo.db.upload_jobs.find_one({'_id': 'job-1'})
+
+def stored_files(app):
+    return [name for _, _, names in os.walk(app.config['LOCAL_STORAGE_DIR']) for name in names]
+
+def test_insert_errors_fail_the_job_and_delete_the_upload(app, spooled, monkeypatch):
+    fail_photo_insert(monkeypatch)
+
+    job = run_job(app, spooled, monkeypatch)
+
+    assert job['status'] == 'failed'
+    assert stored_files(app) == []
+    assert mongo.db.photos.count_documents({}) == 0
+    assert not spooled.exists()
+
+def test_photos_saved_before_an_insert_error_are_kept(app, spooled, monkeypatch):
+    fail_photo_insert(monkeypatch, save_first=True)
+
+    job = run_job(app, spooled, monkeypatch)
+
+    assert job['status'] == 'done'
+    assert len(stored_files(app)) == 1
+    assert mongo.db.photos.find_one({'_id': 'photo-1'})
@@ -0,0 +1,58 @@
+from app import mongo
+from app.services.upload_service import UploadService
+from app.utils.db_migrate import migrate_variant_paths
+
+UPLOAD_RESPONSE = {'url': 'https://cdn.example.com/bird.jpg', 'id': 'bird', 'size': 10}
+
+def test_variants_store_paths_not_urls(app):
+    with app.test_request_context(base_url='http://internal:10000'):
+        photo = UploadService.build_photo(
+            'bird.jpg', {}, 'p1', '/api/photos/p1/image', 'local', UPLOAD_RESPONSE
+        )
+
+    variants = photo.storage['variants']
+    assert variants
+    for variant in variants:
+        assert 'url' not in variant
+        assert variant['path'] == f"/api/photos/p1/image?w={variant['width']}&fmt={variant['format']}"
+
+def test_variant_urls_use_the_public_base_url(client, app):
+    app.config['PUBLIC_BASE_URL'] = 'https://api.example.com/'
+    mongo.db.photos.insert_one({
+        '_id': 'p1',
+        'filename': 'bird.jpg',
+        'storage': {
+            'url': UPLOAD_RESPONSE['url'],
+            'variants': [{'width': 320, 'format': 'webp', 'key': 'k', 'path': '/api/photos/p1/image?w=320&fmt=webp'}]
+        }
+    })
+
+    photos = client.get('/api/photos/', base_url='http://internal:10000').get_json()
+
+    assert photos[0]['storage']['variants'][0]['url'] == 'https://api.example.com/api/photos/p1/image?w=320&fmt=webp'
+    # The stored document is left untouched
+    assert 'url' not in mongo.db.photos.find_one({'_id': 'p1'})['storage']['variants'][0]
+
+def test_variant_urls_default_to_the_request_host(client):
+    mongo.db.photos.insert_one({
+        '_id': 'p1',
+        'filename': 'bird.jpg',
+        'storage': {'variants': [{'width': 320, 'format': 'webp', 'key': 'k', 'path': '/api/photos/p1/image?w=320&fmt=webp'}]}
+    })
+
+    photos = client.get('/api/photos/', base_url='https://gallery.example.com').get_json()
+
+    assert photos[0]['storage']['variants'][0]['url'] == 'https://gallery.example.com/api/photos/p1/image?w=320&fmt=webp'
+
+def test_migration_replaces_stored_urls_with_paths(app):
+    mongo.db.photos.insert_one({
+        '_id': 'p1',
+        'storage': {'variants': [
+            {'width': 320, 'format': 'webp', 'key': 'k', 'url': 'http://api.example.com/api/photos/p1/image?w=320&fmt=webp'}
+        ]}
+    })
+
+    migrate_variant_paths()
+
+    variant = mongo.db.photos.find_one({'_id': 'p1'})['storage']['variants'][0]
+    assert variant == {'width': 320, 'format': 'webp', 'key': 'k', 'path': '/api/photos/p1/image?w=320&fmt=webp'}
@@ -247,7 +247,7 @@ function ImageGallery() {
               }}
             >
               <OptimizedImage
-                src={photo.storage?.url || photo.url}
+                src={photo.storage?.variants?.find(v => v.width === 640)?.url || photo.storage?.url || photo.url}
                 alt={photo.tags?.species || photo.filename}
                 objectFit="cover"
                 width="100%"